@@ -0,0 +1,11 @@
+"""
+Benchmarks da biblioteca em escala.
+
+Cada execução cria uma biblioteca temporária (nunca toca o banco real),
+a povoa com dados sintéticos do tamanho escolhido e cronometra as operações
+principais da API. Os resultados são gravados em JSON e podem ser comparados
+com os de uma execução anterior para detectar regressões:
+
+    python -m benchmarks --tier 1k --output base.json
+    python -m benchmarks --tier 1k --output novo.json --compare base.json
+"""
@@ -0,0 +1,65 @@
+import argparse
+import contextlib
+import io
+import json
+import sys
+from pathlib import Path
+
+# Permite rodar a partir da raiz do repositório: python -m benchmarks, dentro de scholar-core
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks import data, suite
+from core import database
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Benchmarks do Scholar-Core em uma biblioteca temporária.")
+    parser.add_argument('--tier', choices=data.TIERS, default='1k', help="tamanho da biblioteca (padrão: 1k)")
+    parser.add_argument('--items', type=int, help="número de itens, no lugar de --tier")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json', help="arquivo JSON com os resultados")
+    parser.add_argument('--compare', metavar='BASELINE', help="resultados anteriores para detectar regressões")
+    parser.add_argument('--threshold', type=float, default=suite.DEFAULT_THRESHOLD,
+                        help="piora relativa da mediana considerada regressão (padrão: 0.25)")
+    parser.add_argument('--import-workers', type=int, help="processos de leitura na importação de PDFs")
+    parser.add_argument('--trace-sql', action='store_true',
+                        help="inclui nos resultados as consultas SQL que mais consumiram tempo")
+    parser.add_argument('--keep', action='store_true', help="mantém a biblioteca temporária ao final")
+    parser.add_argument('--verbose', action='store_true', help="mostra as mensagens do core e dos plugins")
+    args = parser.parse_args(argv)
+
+    item_count = args.items or data.TIERS[args.tier]
+
+    def progress(stage):
+        print(f"[benchmark] {stage}...", file=sys.stderr, flush=True)
+
+    # As mensagens dos hooks de plugins são descartadas, a menos que --verbose
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        results = suite.run_benchmarks(item_count, args.seed, args.import_workers, args.keep, progress, args.trace_sql)
+    results['tier'] = args.tier if args.items is None else None
+
+    Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(suite.format_summary(results))
+    if args.trace_sql:
+        print()
+        print(database.tracer.format_stats())
+    print(f"\nResultados gravados em {args.output}")
+
+    if not args.compare:
+        return 0
+    baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+    if baseline['sizes'] != results['sizes']:
+        print("\nAviso: a execução de referência usou outro tamanho de biblioteca.")
+    rows = suite.compare(baseline, results, args.threshold)
+    print()
+    print(suite.format_comparison(rows))
+    regressions = [row['operation'] for row in rows if row['regressed']]
+    if regressions:
+        print(f"\n{len(regressions)} operação(ões) mais lenta(s) que a referência: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+# benchmarks/data.py
+"""
+Geradores de dados sintéticos para os benchmarks.
+
+Todos são determinísticos para uma mesma semente, então duas execuções com
+o mesmo tamanho medem exatamente a mesma biblioteca. Os nomes dos autores
+saem de um espaço grande o bastante para a faixa de 1M itens, com autores
+frequentes (muitos itens por autor), variações de grafia que a resolução de
+criadores precisa unificar e, de tempos em tempos, listas enormes de autores
+como as de grandes colaborações.
+"""
+
+import random
+import unicodedata
+from pathlib import Path
+
+from core.models import Creator, Item
+
+TIERS = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+FIRST_NAMES = [
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Fábio", "Gabriela", "Heitor", "Isabel", "João",
+    "Karina", "Lucas", "Mariana", "Nicolas", "Olívia", "Paulo", "Quitéria", "Rafael", "Sofia", "Tiago",
+    "Úrsula", "Vitor", "Wanda", "Xavier", "Yara", "Zeca", "Ada", "Alan", "Grace", "Marie",
+]
+SURNAME_SYLLABLES = [
+    "al", "ber", "ca", "do", "fer", "gon", "lo", "mar", "nei", "pe", "ra", "san", "tos", "vi", "za",
+    "mül", "schu", "ster", "ko", "wal", "ski", "né", "son", "bra", "ga", "li", "ro", "ta", "mo", "chen",
+]
+TITLE_WORDS = [
+    "quantum", "graphene", "protein", "folding", "neural", "network", "lattice", "dynamics", "entropy",
+    "climate", "model", "sparse", "inference", "bayesian", "catalysis", "genome", "spectral", "theory",
+    "topological", "phase", "transition", "learning", "reinforcement", "membrane", "transport", "galaxy",
+    "dark", "matter", "optical", "cavity", "polymer", "synthesis", "soil", "carbon", "urban", "mobility",
+]
+JOURNALS = ["Physical Review Letters", "Nature", "Science", "Cell", "Revista Brasileira de Física", "PLOS ONE"]
+ITEM_TYPES = ["journalArticle"] * 8 + ["book", "conferencePaper"]
+
+# A cada HUGE_AUTHOR_EVERY itens, um tem entre HUGE_AUTHOR_MIN e HUGE_AUTHOR_MAX autores
+HUGE_AUTHOR_EVERY = 1000
+HUGE_AUTHOR_MIN = 1000
+HUGE_AUTHOR_MAX = 3000
+
+
+def creator_name(index: int) -> tuple[str, str]:
+    """Nome (primeiro, último) do autor de índice `index`, sempre o mesmo para o mesmo índice."""
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    index //= len(FIRST_NAMES)
+    syllables = []
+    for _ in range(3):
+        syllables.append(SURNAME_SYLLABLES[index % len(SURNAME_SYLLABLES)])
+        index //= len(SURNAME_SYLLABLES)
+    last = "".join(syllables).capitalize()
+    if index:
+        last = f"{last}-{index}"
+    return first, last
+
+
+def creators(rng: random.Random, count: int, pool_size: int) -> list[Creator]:
+    """
+    `count` autores sorteados de um universo de `pool_size` nomes, com
+    preferência pelos primeiros (autores prolíficos). Alguns vêm escritos de
+    outra forma (caixa, acentos, ponto final), como chegam de fontes
+    diferentes.
+    """
+    result = []
+    for _ in range(count):
+        first, last = creator_name(int(pool_size * rng.random() ** 2))
+        variant = rng.random()
+        if variant < 0.05:
+            last = last.upper()
+        elif variant < 0.08:
+            first = f"{first[0]}."
+        elif variant < 0.11:
+            last = "".join(c for c in unicodedata.normalize('NFKD', last) if not unicodedata.combining(c))
+        result.append(Creator(first_name=first, last_name=last))
+    return result
+
+
+def title(rng: random.Random) -> str:
+    words = rng.sample(TITLE_WORDS, rng.randint(4, 9))
+    return " ".join(words).capitalize()
+
+
+def items(count: int, seed: int = 0, huge_author_lists: bool = True):
+    """Gera `count` itens com título, metadados e autores (sem ID)."""
+    rng = random.Random(seed)
+    pool_size = max(count // 2, 100)
+    for index in range(count):
+        if huge_author_lists and index % HUGE_AUTHOR_EVERY == HUGE_AUTHOR_EVERY - 1:
+            author_count = rng.randint(HUGE_AUTHOR_MIN, HUGE_AUTHOR_MAX)
+        else:
+            author_count = rng.randint(1, 8)
+        metadata = {'date': str(rng.randint(1950, 2025)), 'publicationTitle': rng.choice(JOURNALS)}
+        if rng.random() < 0.7:
+            metadata['doi'] = f"10.{rng.randint(1000, 9999)}/bench.{seed}.{index}"
+        yield Item(item_type=rng.choice(ITEM_TYPES), title=title(rng), metadata=metadata,
+                   creators=creators(rng, author_count, pool_size))
+
+
+def batches(iterable, size: int):
+    """Agrupa um iterável em listas de até `size` elementos."""
+    batch = []
+    for element in iterable:
+        batch.append(element)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def tag_names(count: int) -> list[str]:
+    return [f"tag-{index:05d}" for index in range(count)]
+
+
+def collection_tree(count: int, seed: int = 0, max_depth: int = 6) -> list[tuple[str, int | None]]:
+    """
+    Coleções aninhadas como (nome, índice do pai ou None), sempre com o pai
+    antes dos filhos. Cerca de um décimo são raízes.
+    """
+    rng = random.Random(seed)
+    tree, depths = [], []
+    for index in range(count):
+        candidates = [i for i in rng.sample(range(index), min(index, 5)) if depths[i] < max_depth - 1]
+        if index < 3 or rng.random() < 0.1 or not candidates:
+            tree.append((f"Coleção {index}", None))
+            depths.append(0)
+        else:
+            parent = candidates[0]
+            tree.append((f"Coleção {index}", parent))
+            depths.append(depths[parent] + 1)
+    return tree
+
+
+def memberships(item_ids: list[int], target_ids: list[int], seed: int = 0, max_per_item: int = 3):
+    """Pares (item, alvo) sem repetição, com 0 a `max_per_item` alvos por item."""
+    rng = random.Random(seed)
+    for item_id in item_ids:
+        for target_id in rng.sample(target_ids, rng.randint(0, min(max_per_item, len(target_ids)))):
+            yield item_id, target_id
+
+
+def pdf_bytes(*page_texts: str) -> bytes:
+    """Um PDF mínimo e válido, com uma página (e um texto simples) por argumento."""
+    page_numbers = [4 + 2 * index for index in range(len(page_texts))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % n for n in page_numbers), len(page_texts)),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for number, text in zip(page_numbers, page_texts):
+        content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode('latin-1', 'replace')
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R /Resources << /Font << /F1 3 0 R >> >> >>" % (number + 1))
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return data
+
+
+def write_pdfs(directory, count: int, seed: int = 0, pages: int = 3) -> list[str]:
+    """
+    Grava `count` PDFs distintos (sem DOI, para que a importação não consulte
+    o Crossref) e retorna os caminhos.
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = directory / f"paper_{index:06d}.pdf"
+        path.write_bytes(pdf_bytes(*(f"{title(rng)} {seed} {index} {page}" for page in range(pages))))
+        paths.append(str(path))
+    return paths
@@ -0,0 +1,288 @@
+# benchmarks/suite.py
+"""
+Execução dos benchmarks e comparação de resultados.
+
+`run_benchmarks` povoa uma biblioteca temporária e cronometra cada chamada
+da API separadamente; `compare` confronta dois resultados operação a
+operação. Cargas auxiliares que a API só oferece item a item (tags e
+coleções dos itens) são gravadas direto no banco, em lote, e não entram
+nas medições.
+"""
+
+import contextlib
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from core import api, database
+from core.services import item_cache
+from . import data
+
+BULK_BATCH_SIZE = 10_000
+LIST_PAGE_SIZE = 200
+SORTS = ('date_added', 'title', 'author', 'year')
+
+# Uma operação regride quando a mediana piora mais que o limiar e mais que o
+# piso absoluto (abaixo dele, a diferença é ruído de medição)
+DEFAULT_THRESHOLD = 0.25
+MIN_DELTA_MS = 0.05
+
+
+class Timings:
+    """Tempos de cada chamada, agrupados por operação."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.rows: dict[str, int] = {}
+
+    def measure(self, name: str, fn, *args, rows: int = 1, **kwargs):
+        """Chama `fn` e registra o tempo da chamada; `rows` é quantas linhas ela processou."""
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples.setdefault(name, []).append(time.perf_counter() - start)
+        self.rows[name] = self.rows.get(name, 0) + rows
+        return result
+
+    def summary(self) -> dict:
+        operations = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            total = sum(ordered)
+            operations[name] = {
+                'calls': len(ordered),
+                'rows': self.rows[name],
+                'total_s': round(total, 6),
+                'mean_ms': round(total / len(ordered) * 1000, 4),
+                'median_ms': round(statistics.median(ordered) * 1000, 4),
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+                'max_ms': round(ordered[-1] * 1000, 4),
+                'rows_per_s': round(self.rows[name] / total, 1) if total else None,
+            }
+        return operations
+
+
+@contextlib.contextmanager
+def temporary_library(keep: bool = False):
+    """Aponta o core para uma biblioteca nova em um diretório temporário, restaurando a original ao sair."""
+    original = database.DATA_DIR, database.DB_FILE
+    data_dir = tempfile.mkdtemp(prefix='scholar-bench-')
+    database.close_connection()
+    database.DATA_DIR = data_dir
+    database.DB_FILE = os.path.join(data_dir, 'library.duckdb')
+    try:
+        database.initialize_database()
+        yield data_dir
+    finally:
+        database.close_connection()
+        database.DATA_DIR, database.DB_FILE = original
+        if not keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def plan(item_count: int) -> dict:
+    """Tamanho de cada etapa para uma biblioteca de `item_count` itens."""
+    return {
+        'items': item_count,
+        'collections': min(max(item_count // 100, 20), 2000),
+        'tags': min(max(item_count // 50, 20), 5000),
+        'single_adds': min(200, item_count),
+        'gets': min(500, item_count),
+        'searches': 50,
+        'list_pages': 20,
+        'collection_samples': 20,
+        'deletes': min(200, item_count // 4),
+        'collection_deletes': 5,
+        'pdfs': min(100, max(20, item_count // 1000)),
+    }
+
+
+def run_benchmarks(item_count: int, seed: int = 0, import_workers: int | None = None,
+                   keep: bool = False, progress=None, trace_sql: bool = False) -> dict:
+    """
+    Povoa uma biblioteca temporária com `item_count` itens e cronometra as
+    operações principais. `progress(etapa)` é chamado no início de cada
+    etapa. Com `trace_sql`, os resultados incluem as estatísticas do
+    rastreador de SQL (o que também deixa as medições um pouco mais lentas).
+    Retorna os resultados prontos para gravar em JSON.
+    """
+    sizes = plan(item_count)
+    rng = random.Random(seed)
+    timings = Timings()
+    report = progress or (lambda stage: None)
+    started = datetime.now(timezone.utc)
+
+    tracing = database.tracer.enabled
+    if trace_sql:
+        database.tracer.reset()
+        database.tracer.configure(enabled=True)
+    try:
+        with temporary_library(keep) as data_dir:
+            operations, failed, library_mb = _run(item_count, sizes, seed, rng, timings, report, import_workers)
+    finally:
+        database.tracer.configure(enabled=tracing)
+
+    results = {
+        'format': 1,
+        'started': started.isoformat(timespec='seconds'),
+        'seed': seed,
+        'sizes': sizes,
+        'environment': _environment(),
+        'library_mb': library_mb,
+        'import_failures': failed,
+        'data_dir': data_dir if keep else None,
+        'operations': operations,
+    }
+    if trace_sql:
+        results['queries'] = [dict(entry, total_ms=round(entry['total_ms'], 3), mean_ms=round(entry['mean_ms'], 3),
+                                   max_ms=round(entry['max_ms'], 3))
+                              for entry in database.tracer.stats()[:50]]
+    return results
+
+
+def _run(item_count, sizes, seed, rng, timings, report, import_workers):
+    """Etapas medidas, na biblioteca temporária já aberta."""
+    report(f"inserindo {item_count} itens em lotes de {BULK_BATCH_SIZE}")
+    item_ids = []
+    for batch in data.batches(data.items(item_count, seed), BULK_BATCH_SIZE):
+        added = timings.measure('add_items_bulk', api.add_items, batch, rows=len(batch))
+        item_ids.extend(item.id for item in added)
+
+    report(f"criando {sizes['collections']} coleções e {sizes['tags']} tags")
+    collection_ids = []
+    for name, parent in data.collection_tree(sizes['collections'], seed):
+        parent_id = collection_ids[parent] if parent is not None else None
+        collection_ids.append(timings.measure('add_collection', api.add_collection, name, parent_id))
+    tag_ids = [api.add_tag(name) for name in data.tag_names(sizes['tags'])]
+    _load_memberships('item_collections', 'collection_id', data.memberships(item_ids, collection_ids, seed, 2))
+    _load_memberships('item_tags', 'tag_id', data.memberships(item_ids, tag_ids, seed + 1, 4))
+
+    report("inserções individuais")
+    for item in data.items(sizes['single_adds'], seed + 1, huge_author_lists=False):
+        item_ids.append(timings.measure('add_item', api.add_item, item).id)
+
+    report("leituras")
+    sample = rng.sample(item_ids, sizes['gets'])
+    item_cache.cache.clear()
+    for item_id in sample:
+        timings.measure('get_item', api.get_item, item_id)
+    for item_id in sample:
+        timings.measure('get_item_cached', api.get_item, item_id)
+    item_cache.cache.clear()
+    for offset in range(0, len(sample), 100):
+        timings.measure('get_items_batch', api.get_items, sample[offset:offset + 100], rows=len(sample[offset:offset + 100]))
+
+    report("buscas")
+    for query in _queries(rng, sizes['searches'], item_count):
+        timings.measure('search_items', api.search_items, query, limit=50)
+
+    report("listagens")
+    for sort in SORTS:
+        cursor = None
+        for _ in range(sizes['list_pages']):
+            page = timings.measure('list_items', api.list_items, sort, after=cursor, limit=LIST_PAGE_SIZE)
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+    timings.measure('get_all_items_summary', api.get_all_items_summary, rows=len(item_ids))
+
+    report("coleções")
+    timings.measure('get_all_collections', api.get_all_collections, rows=len(collection_ids))
+    timings.measure('get_root_collections', api.get_child_collections, None)
+    timings.measure('get_collection_item_counts', api.get_collection_item_counts, rows=len(collection_ids))
+    for collection_id in rng.sample(collection_ids, min(sizes['collection_samples'], len(collection_ids))):
+        timings.measure('get_child_collections', api.get_child_collections, collection_id)
+        timings.measure('get_items_in_collection', api.get_items_in_collection, collection_id)
+        timings.measure('get_items_in_collection_recursive', api.get_items_in_collection, collection_id, True)
+        timings.measure('list_items_in_collection', api.list_items, limit=LIST_PAGE_SIZE, collection_id=collection_id)
+
+    report("exclusões")
+    for item_id in rng.sample(item_ids, sizes['deletes']):
+        timings.measure('delete_item', api.delete_item, item_id)
+    for collection_id in rng.sample(collection_ids, sizes['collection_deletes']):
+        timings.measure('delete_collection', api.delete_collection, collection_id)
+
+    report(f"importando {sizes['pdfs']} PDFs")
+    pdf_dir = tempfile.mkdtemp(prefix='scholar-bench-pdfs-')
+    try:
+        paths = data.write_pdfs(pdf_dir, sizes['pdfs'], seed)
+        result = timings.measure('import_pdfs', api.import_pdfs, pdf_dir, workers=import_workers, rows=len(paths))
+        failed = len(result['failed'])
+    finally:
+        shutil.rmtree(pdf_dir, ignore_errors=True)
+
+    library_mb = round(os.path.getsize(database.DB_FILE) / 2**20, 1)
+    return timings.summary(), failed, library_mb
+
+
+def _load_memberships(table: str, column: str, pairs) -> None:
+    """Associa itens a coleções ou tags em uma única inserção (preparação, fora das medições)."""
+    with database.transaction() as con:
+        database.stage_rows(con, '_bench_pairs', {'item_id': 'BIGINT', 'target_id': 'BIGINT'}, pairs)
+        con.execute(f"INSERT INTO {table} (item_id, {column}) SELECT item_id, target_id FROM _bench_pairs")
+        con.execute("DROP TABLE _bench_pairs")
+
+
+def _queries(rng: random.Random, count: int, item_count: int) -> list[str]:
+    """Buscas por palavras do título (uma ou duas) e por sobrenomes de autores."""
+    queries = []
+    for index in range(count):
+        kind = index % 3
+        if kind == 0:
+            queries.append(rng.choice(data.TITLE_WORDS))
+        elif kind == 1:
+            queries.append(" ".join(rng.sample(data.TITLE_WORDS, 2)))
+        else:
+            queries.append(data.creator_name(rng.randrange(max(item_count // 2, 100)))[1])
+    return queries
+
+
+def _environment() -> dict:
+    import duckdb
+    return {
+        'python': platform.python_version(),
+        'duckdb': duckdb.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD,
+            min_delta_ms: float = MIN_DELTA_MS) -> list[dict]:
+    """
+    Compara a mediana de cada operação presente nos dois resultados.
+    Retorna {'operation', 'baseline_ms', 'current_ms', 'ratio', 'regressed'}
+    por operação.
+    """
+    rows = []
+    for name, result in current['operations'].items():
+        base = baseline['operations'].get(name)
+        if base is None:
+            continue
+        before, after = base['median_ms'], result['median_ms']
+        ratio = after / before if before else None
+        regressed = after - before > min_delta_ms and (ratio is None or ratio > 1 + threshold)
+        rows.append({'operation': name, 'baseline_ms': before, 'current_ms': after,
+                     'ratio': round(ratio, 3) if ratio is not None else None, 'regressed': regressed})
+    return rows
+
+
+def format_summary(results: dict) -> str:
+    lines = [f"{'operação':<36}{'chamadas':>9}{'mediana ms':>12}{'p95 ms':>11}{'linhas/s':>13}"]
+    for name, result in results['operations'].items():
+        rate = f"{result['rows_per_s']:.0f}" if result['rows_per_s'] else '-'
+        lines.append(f"{name:<36}{result['calls']:>9}{result['median_ms']:>12.3f}{result['p95_ms']:>11.3f}{rate:>13}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: list[dict]) -> str:
+    lines = [f"{'operação':<36}{'base ms':>12}{'atual ms':>12}{'razão':>8}"]
+    for row in rows:
+        ratio = f"{row['ratio']:.2f}" if row['ratio'] is not None else '-'
+        flag = "  REGRESSÃO" if row['regressed'] else ""
+        lines.append(f"{row['operation']:<36}{row['baseline_ms']:>12.3f}{row['current_ms']:>12.3f}{ratio:>8}{flag}")
+    return "\n".join(lines)
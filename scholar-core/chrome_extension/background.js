@@ -1,10 +1,71 @@
 /**
  * background.js
  * O service worker da extensão. Lida com a comunicação com o host nativo.
+ *
+ * Uma única porta com o host nativo fica aberta enquanto o service worker
+ * estiver vivo, então o host (e o banco de dados) não é reiniciado a cada
+ * clique. Cada requisição leva um `id`, e as respostas, que podem chegar
+ * em qualquer ordem, são entregues a quem fez a requisição.
  */
 
 const nativeHostName = "com.my_company.scholarcore";
 
+let port = null;
+let nextRequestId = 1;
+const pendingRequests = new Map();
+
+function getPort() {
+    if (port) {
+        return port;
+    }
+    port = chrome.runtime.connectNative(nativeHostName);
+
+    port.onMessage.addListener((message) => {
+        const pending = pendingRequests.get(message.id);
+        if (!pending) {
+            console.log("Resposta sem requisição correspondente:", message);
+            return;
+        }
+        pendingRequests.delete(message.id);
+        if (message.status === "success") {
+            pending.resolve(message);
+        } else {
+            pending.reject(new Error(message.message));
+        }
+    });
+
+    port.onDisconnect.addListener(() => {
+        const reason = chrome.runtime.lastError ? chrome.runtime.lastError.message : "Desconectado do host nativo.";
+        console.log(reason);
+        // As requisições sem resposta falham; a próxima abre uma nova porta
+        for (const pending of pendingRequests.values()) {
+            pending.reject(new Error(reason));
+        }
+        pendingRequests.clear();
+        port = null;
+    });
+
+    return port;
+}
+
+function sendRequest(request) {
+    return new Promise((resolve, reject) => {
+        const id = nextRequestId++;
+        pendingRequests.set(id, { resolve, reject });
+        getPort().postMessage({ ...request, id });
+    });
+}
+
+// Salva uma única referência
+function saveItem(item) {
+    return sendRequest({ type: "save", item });
+}
+
+// Salva várias referências (ex: uma página de resultados) em uma única gravação
+function saveItems(items) {
+    return sendRequest({ type: "save_many", items });
+}
+
 // Ouve por cliques no ícone da extensão
 chrome.action.onClicked.addListener((tab) => {
     console.log("Ícone da extensão clicado. Solicitando dados da página...");
@@ -17,34 +78,29 @@ chrome.action.onClicked.addListener((tab) => {
             return;
         }
 
-        if (response) {
-            console.log("Dados recebidos do content script:", response);
-
-            // Verifica se algum dado útil foi extraído
-            if (response.metadata && response.metadata.title) {
-                console.log("Enviando dados para o host nativo...");
-
-                // Conecta e envia a mensagem para o host nativo
-                const port = chrome.runtime.connectNative(nativeHostName);
-                port.postMessage(response);
-
-                port.onMessage.addListener((message) => {
-                    console.log("Resposta recebida do host nativo:", message);
-                    // Aqui você poderia atualizar o popup da extensão com o status
-                });
-
-                port.onDisconnect.addListener(() => {
-                    if (chrome.runtime.lastError) {
-                        console.error("Desconectado com erro:", chrome.runtime.lastError.message);
-                    } else {
-                        console.log("Desconectado do host nativo.");
-                    }
-                });
-
-            } else {
-                console.log("Nenhum dado útil encontrado na página.");
-                // Poderia atualizar o popup para mostrar que nada foi encontrado
-            }
+        if (!response) {
+            return;
         }
+        console.log("Dados recebidos do content script:", response);
+
+        let request;
+        if (response.items && response.items.length > 0) {
+            console.log(`Enviando ${response.items.length} referências para o host nativo...`);
+            request = saveItems(response.items);
+        } else if (response.metadata && response.metadata.title) {
+            console.log("Enviando dados para o host nativo...");
+            request = saveItem(response);
+        } else {
+            console.log("Nenhum dado útil encontrado na página.");
+            // Poderia atualizar o popup para mostrar que nada foi encontrado
+            return;
+        }
+
+        request
+            .then((message) => {
+                console.log("Resposta recebida do host nativo:", message);
+                // Aqui você poderia atualizar o popup da extensão com o status
+            })
+            .catch((error) => console.error("Erro ao salvar no host nativo:", error.message));
     });
 });
@@ -57,11 +57,47 @@ function scrapePage() {
     };
 }
 
+// Páginas de resultados (catálogos, bases de dados) costumam descrever cada
+// referência com COinS: um <span class="Z3988"> com um OpenURL no título
+function scrapeResultsPage() {
+    const items = [];
+    for (const span of document.querySelectorAll('span.Z3988')) {
+        const params = new URLSearchParams(span.getAttribute('title') || '');
+        const metadata = {};
+        const title = params.get('rft.atitle') || params.get('rft.title') || params.get('rft.btitle');
+        if (!title) continue;
+        metadata.title = title;
+
+        for (const id of params.getAll('rft_id')) {
+            if (id.startsWith('info:doi/')) {
+                metadata.doi = id.slice('info:doi/'.length);
+            } else if (id.startsWith('http')) {
+                metadata.url = id;
+            }
+        }
+        if (params.get('rft.jtitle')) metadata.publicationTitle = params.get('rft.jtitle');
+        if (params.get('rft.date')) metadata.date = params.get('rft.date');
+
+        const creators = params.getAll('rft.au').map((author) => {
+            const names = author.split(' ');
+            return {
+                first_name: names.slice(0, -1).join(' '),
+                last_name: names.slice(-1)[0] || '',
+                creator_type: 'author'
+            };
+        });
+
+        items.push({ item_type: 'journalArticle', metadata: metadata, creators: creators });
+    }
+    return items;
+}
+
 // Ouve por mensagens do background script
 chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
     if (request.action === "get_page_data") {
-        const pageData = scrapePage();
-        sendResponse(pageData);
+        const results = scrapeResultsPage();
+        // Com mais de uma referência, a página inteira é salva de uma vez
+        sendResponse(results.length > 1 ? { items: results } : scrapePage());
     }
     // Retorna true para indicar que a resposta será enviada de forma assíncrona.
     return true;
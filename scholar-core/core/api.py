@@ -6,16 +6,50 @@ mantendo uma API pública estável para a GUI e outros consumidores.
 """
 
 from .models import Item
-from .services import item_service, collection_service, tag_service, attachment_service
+from .services import item_service, collection_service, tag_service, attachment_service, import_service, plugin_state_service, fulltext_service, duplicate_service
 
 def add_item(item: Item) -> Item:
     """Adiciona um novo item à biblioteca."""
     return item_service.add_item(item)
 
+def add_items(items: list[Item]) -> list[Item]:
+    """Adiciona um lote de itens à biblioteca em uma única transação."""
+    return item_service.add_items(items)
+
+def item_from_capture(data: dict) -> Item:
+    """
+    Converte uma captura da extensão do navegador em um item, sem gravá-lo.
+    Levanta ValueError se a captura não tiver o formato esperado.
+    """
+    return item_service.item_from_capture(data)
+
+def save_captured_items(captures: list[dict | Item]) -> list[dict]:
+    """
+    Salva capturas da extensão do navegador (ou itens já convertidos por
+    `item_from_capture`) em um único lote, ignorando as que já existem pelo
+    DOI ou pela URL. Retorna {'item_id', 'duplicate'} para cada captura.
+    """
+    return item_service.save_captured_items(captures)
+
 def get_item(item_id: int) -> Item | None:
     """Recupera todos os dados de um item."""
     return item_service.get_item(item_id)
 
+def get_items(item_ids: list[int]) -> list[Item]:
+    """Recupera todos os dados de vários itens de uma vez, na ordem dos IDs."""
+    return item_service.get_items(item_ids)
+
+def prefetch_items(item_ids: list[int]) -> None:
+    """
+    Carrega no cache de itens, com uma única busca, itens que devem ser lidos
+    em breve (como as linhas vizinhas à seleção na lista).
+    """
+    return item_service.prefetch_items(item_ids)
+
+def get_item_cache_stats() -> dict:
+    """Retorna as estatísticas do cache de itens: 'hits', 'misses', 'evictions', 'size' e 'capacity'."""
+    return item_service.get_item_cache_stats()
+
 def delete_item(item_id: int) -> bool:
     """Exclui um item e todos os seus dados associados."""
     return item_service.delete_item(item_id)
@@ -32,14 +66,52 @@ def add_item_to_collection(item_id: int, collection_id: int) -> bool:
     """Adiciona um item a uma coleção."""
     return collection_service.add_item_to_collection(item_id, collection_id)
 
-def get_items_in_collection(collection_id: int) -> list:
-    """Retorna uma lista de resumos de itens em uma coleção."""
-    return collection_service.get_items_in_collection(collection_id)
+def get_items_in_collection(collection_id: int, recursive: bool = False) -> list:
+    """
+    Retorna uma lista de resumos de itens em uma coleção. Com `recursive`,
+    inclui os itens das subcoleções, sem repetições.
+    """
+    return collection_service.get_items_in_collection(collection_id, recursive)
 
 def get_all_collections():
     """Retorna uma lista de todas as coleções."""
     return collection_service.get_all_collections()
 
+def get_collection(collection_id: int):
+    """Retorna uma coleção (com o pai vigente e o número de subcoleções), ou None."""
+    return collection_service.get_collection(collection_id)
+
+def get_child_collections(parent_id: int | None = None):
+    """
+    Retorna as subcoleções diretas de uma coleção, ou as coleções raiz com
+    None, para carregar a árvore de coleções sob demanda.
+    """
+    return collection_service.get_child_collections(parent_id)
+
+def rename_collection(collection_id: int, name: str) -> bool:
+    """Renomeia uma coleção."""
+    return collection_service.rename_collection(collection_id, name)
+
+def delete_collection(collection_id: int) -> bool:
+    """Exclui uma coleção e suas subcoleções; os itens continuam na biblioteca."""
+    return collection_service.delete_collection(collection_id)
+
+def get_collection_ancestors(collection_id: int):
+    """Retorna os ancestrais de uma coleção, da raiz até o pai imediato."""
+    return collection_service.get_collection_ancestors(collection_id)
+
+def get_collection_descendants(collection_id: int):
+    """Retorna todas as subcoleções de uma coleção, nível a nível."""
+    return collection_service.get_collection_descendants(collection_id)
+
+def move_collection(collection_id: int, new_parent_id: int | None) -> bool:
+    """Move uma coleção e suas subcoleções para outro pai (None = raiz)."""
+    return collection_service.move_collection(collection_id, new_parent_id)
+
+def get_collection_item_counts() -> dict:
+    """Retorna {id da coleção: {'direct', 'recursive'}} com o número de itens de cada coleção."""
+    return collection_service.get_collection_item_counts()
+
 def add_tag(name: str) -> int:
     """Adiciona uma nova tag."""
     return tag_service.add_tag(name)
@@ -60,10 +132,79 @@ def create_item_from_pdf(file_path_str: str) -> Item | None:
     """Cria um novo item a partir de um arquivo PDF."""
     return item_service.create_item_from_pdf(file_path_str)
 
-def search_items(query: str) -> list:
-    """Busca itens por um termo no título ou nos metadados."""
-    return item_service.search_items(query)
+def import_pdfs(paths_or_directory, workers: int | None = None,
+                lookup_workers: int = import_service.DEFAULT_LOOKUP_WORKERS,
+                batch_size: int = import_service.DEFAULT_BATCH_SIZE, progress=None) -> dict:
+    """
+    Importa em paralelo os PDFs de um diretório (ou de uma lista de caminhos).
+    `progress(concluídos, total, caminho, erro)` é chamado a cada arquivo.
+    Retorna {'items': [...], 'failed': [(caminho, erro), ...]}.
+    """
+    return import_service.import_pdfs(paths_or_directory, workers, lookup_workers, batch_size, progress)
+
+def get_metadata_fields(fields: list[str]) -> dict[int, dict]:
+    """
+    Retorna {item_id: {campo: valor}} com os campos de metadados informados,
+    para os itens que possuem o primeiro campo, em uma única consulta.
+    """
+    return item_service.get_metadata_fields(fields)
+
+def find_duplicates(near_duplicates: bool = True) -> list[dict]:
+    """
+    Lista os clusters de itens candidatos a duplicatas, com os motivos
+    ('doi', 'arxiv_id', 'isbn' ou 'title_author').
+    """
+    return duplicate_service.find_duplicates(near_duplicates)
+
+def merge_items(keep_id: int, duplicate_ids: list[int]) -> bool:
+    """Funde os itens duplicados no item `keep_id`, movendo tags, coleções e anexos."""
+    return duplicate_service.merge_items(keep_id, duplicate_ids)
+
+def search_items(query: str, limit: int | None = None, offset: int = 0, fulltext: bool = False) -> list:
+    """
+    Busca itens por termos no título, nos metadados ou nos autores, ordenados
+    por relevância. Com `fulltext`, também busca no texto dos PDFs anexados e
+    informa as páginas encontradas em 'fulltext_hits'.
+    """
+    return item_service.search_items(query, limit, offset, fulltext)
+
+def index_attachment_texts(workers: int | None = None, progress=None) -> dict | None:
+    """Extrai e indexa o texto dos PDFs anexados ainda não processados."""
+    return fulltext_service.index_attachment_texts(workers=workers, progress=progress)
+
+def start_fulltext_indexing():
+    """Inicia a indexação do texto dos anexos em uma thread de fundo."""
+    return fulltext_service.start_background_indexing()
+
+def get_attachment_text(attachment_id: int) -> list[str] | None:
+    """Retorna o texto extraído de um anexo, uma string por página."""
+    return fulltext_service.get_attachment_text(attachment_id)
+
+def rebuild_search_index() -> None:
+    """Reconstrói o índice de busca textual a partir da biblioteca."""
+    return item_service.rebuild_search_index()
+
+def rebuild_item_summary() -> None:
+    """Reconstrói o resumo (primeiro autor, ano, chaves de ordenação) usado nas listagens."""
+    return item_service.rebuild_item_summary()
+
+def list_items(sort: str = 'date_added', descending: bool | None = None, after: str | None = None,
+               limit: int = 100, collection_id: int | None = None) -> dict:
+    """
+    Retorna uma página de resumos de itens ordenada por 'title', 'author',
+    'date_added', 'date_modified' ou 'year'. Passe o 'next_cursor' de uma
+    página em `after` para buscar a seguinte.
+    """
+    return item_service.list_items(sort, descending, after, limit, collection_id)
 
 def get_all_items_summary() -> list:
     """Retorna uma lista de resumos de todos os itens."""
     return item_service.get_all_items_summary()
+
+def get_plugin_state(plugin: str) -> dict:
+    """Retorna o estado persistido de um plugin como {chave: (valor, atualizado_em)}."""
+    return plugin_state_service.get_plugin_state(plugin)
+
+def set_plugin_state(plugin: str, values: dict) -> None:
+    """Persiste valores (convertidos para texto) no estado de um plugin."""
+    return plugin_state_service.set_plugin_state(plugin, values)
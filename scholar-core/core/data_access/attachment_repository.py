@@ -2,11 +2,48 @@
 from .. import database
 from ..models import Attachment
 
-def add(item_id: int, attachment_id: int, db_path: str, mime_type: str | None) -> None:
+def add(item_id: int, attachment_id: int, db_path: str, mime_type: str | None, content_hash: str | None = None) -> None:
     """Adiciona um novo anexo ao banco de dados."""
     con = database.get_connection()
     con.execute(
-        "INSERT INTO attachments (id, item_id, path, mime_type) VALUES (?, ?, ?, ?)",
-        (attachment_id, item_id, db_path, mime_type)
+        "INSERT INTO attachments (id, item_id, path, mime_type, content_hash) VALUES (?, ?, ?, ?, ?)",
+        (attachment_id, item_id, db_path, mime_type, content_hash)
     )
-    con.close()
+
+def add_many(rows: list[tuple]) -> None:
+    """
+    Adiciona vários anexos, dados como (id, item_id, path, mime_type,
+    content_hash), em uma transação.
+    """
+    if not rows:
+        return
+    with database.transaction() as con:
+        database.stage_rows(
+            con, '_stage_attachments',
+            {'id': 'BIGINT', 'item_id': 'BIGINT', 'path': 'VARCHAR', 'mime_type': 'VARCHAR', 'content_hash': 'VARCHAR'},
+            rows
+        )
+        con.execute("""
+            INSERT INTO attachments (id, item_id, path, mime_type, content_hash)
+            SELECT id, item_id, path, mime_type, content_hash FROM _stage_attachments
+        """)
+        con.execute("DROP TABLE _stage_attachments")
+
+def content_hashes_for_item(item_id: int) -> list[str]:
+    """Hashes dos conteúdos referenciados pelos anexos de um item."""
+    con = database.get_connection()
+    rows = con.execute(
+        "SELECT DISTINCT content_hash FROM attachments WHERE item_id = ? AND content_hash IS NOT NULL", (item_id,)
+    ).fetchall()
+    return [row[0] for row in rows]
+
+def unreferenced(content_hashes: list[str]) -> list[str]:
+    """Dentre os hashes informados, os que nenhum anexo referencia mais."""
+    if not content_hashes:
+        return []
+    placeholders = ", ".join("?" for _ in content_hashes)
+    con = database.get_connection()
+    referenced = {row[0] for row in con.execute(
+        f"SELECT DISTINCT content_hash FROM attachments WHERE content_hash IN ({placeholders})", content_hashes
+    ).fetchall()}
+    return [digest for digest in content_hashes if digest not in referenced]
@@ -1,51 +1,255 @@
 # core/data_access/collection_repository.py
-import duckdb
+"""
+Coleções e sua hierarquia.
+
+A hierarquia vigente fica na tabela de fechamento `collection_tree`, com um
+par (ancestral, descendente, profundidade) para cada caminho da árvore,
+inclusive o da coleção com ela mesma. Subárvores, ancestrais e contagens
+recursivas viram joins simples, sem recursão por consulta, e mover uma
+subárvore reescreve apenas os caminhos que a ligam aos antigos ancestrais.
+
+`collections.parent_id` só é lido de bibliotecas anteriores à tabela de
+fechamento; coleções novas o deixam vazio. O DuckDB não permite alterar essa
+coluna em coleções que têm subcoleções (a atualização de uma coluna indexada
+remove e reinsere a linha, que é referenciada pelas filhas), nem remover uma
+coleção ainda referenciada, então ela não poderia acompanhar movimentações e
+impediria exclusões.
+"""
+
 from .. import database
 from ..models import Collection
 
+# Coleções com o pai vigente e o número de subcoleções diretas, lidos da tabela de fechamento
+_COLLECTIONS_SELECT = """
+    SELECT c.id, c.name, p.ancestor_id, coalesce(k.child_count, 0)
+    FROM collections c
+    LEFT JOIN collection_tree p ON p.descendant_id = c.id AND p.depth = 1
+    LEFT JOIN (
+        SELECT ancestor_id, count(*) AS child_count FROM collection_tree WHERE depth = 1 GROUP BY ancestor_id
+    ) k ON k.ancestor_id = c.id
+"""
+
+def _collection(row) -> Collection:
+    return Collection(id=row[0], name=row[1], parent_id=row[2], child_count=row[3])
+
 def add(name: str, parent_id: int | None, collection_id: int) -> int:
     """Adiciona uma nova coleção ao banco de dados."""
-    con = database.get_connection()
-    con.execute("INSERT INTO collections (id, name, parent_id) VALUES (?, ?, ?)", (collection_id, name, parent_id))
-    con.close()
+    with database.transaction() as con:
+        con.execute("INSERT INTO collections (id, name) VALUES (?, ?)", (collection_id, name))
+        con.execute("""
+            INSERT INTO collection_tree (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, ?, depth + 1 FROM collection_tree WHERE descendant_id = ?
+            UNION ALL SELECT ?, ?, 0
+        """, (collection_id, parent_id, collection_id, collection_id))
     return collection_id
 
 def add_item_to(item_id: int, collection_id: int) -> bool:
     """Adiciona um item a uma coleção."""
     con = database.get_connection()
-    try:
-        con.execute("INSERT INTO item_collections (item_id, collection_id) VALUES (?, ?)", (item_id, collection_id))
-    except duckdb.ConstraintException:
-        pass  # Associação já existe
-    finally:
-        con.close()
+    # Associação já existente é ignorada sem abortar uma transação externa
+    con.execute("INSERT INTO item_collections (item_id, collection_id) VALUES (?, ?) ON CONFLICT DO NOTHING", (item_id, collection_id))
     return True
 
-def get_items_in(collection_id: int) -> list:
-    """Retorna uma lista de resumos de itens em uma coleção específica."""
+def get_items_in(collection_id: int, recursive: bool = False) -> list:
+    """
+    Retorna uma lista de resumos de itens em uma coleção específica. Com
+    `recursive`, inclui os itens de todas as subcoleções, cada um uma única vez.
+    """
+    if recursive:
+        member_sql = """
+            SELECT ic.item_id FROM item_collections ic
+            JOIN collection_tree t ON t.descendant_id = ic.collection_id
+            WHERE t.ancestor_id = ?
+        """
+    else:
+        member_sql = "SELECT item_id FROM item_collections WHERE collection_id = ?"
     con = database.get_connection()
-    items = con.execute("""
+    items = con.execute(f"""
         SELECT
-            i.id, i.item_type, i.title,
-            (SELECT c.last_name FROM creators c JOIN item_creators ic_sub ON c.id = ic_sub.creator_id
-             WHERE ic_sub.item_id = i.id AND ic_sub.creator_type = 'author'
-             ORDER BY ic_sub.order_index LIMIT 1) AS first_author
-        FROM items i JOIN item_collections ic ON i.id = ic.item_id
-        WHERE ic.collection_id = ? ORDER BY i.date_added DESC
+            i.id, i.item_type, i.title, s.first_author
+        FROM items i
+        LEFT JOIN item_summary s ON s.item_id = i.id
+        WHERE i.id IN ({member_sql}) ORDER BY i.date_added DESC
     """, (collection_id,)).fetchall()
-    con.close()
     return [{'id': row[0], 'item_type': row[1], 'title': row[2], 'author_text': row[3] if row[3] else ''} for row in items]
 
 def get_all() -> list[Collection]:
     """Retorna uma lista de todas as coleções."""
     con = database.get_connection()
-    rows = con.execute("SELECT id, name, parent_id FROM collections ORDER BY name").fetchall()
-    con.close()
-    return [Collection(id=row[0], name=row[1], parent_id=row[2]) for row in rows]
+    rows = con.execute(f"{_COLLECTIONS_SELECT} ORDER BY c.name").fetchall()
+    return [_collection(row) for row in rows]
+
+def get(collection_id: int) -> Collection | None:
+    """Retorna uma coleção, ou None se ela não existir."""
+    con = database.get_connection()
+    row = con.execute(f"{_COLLECTIONS_SELECT} WHERE c.id = ?", (collection_id,)).fetchone()
+    return _collection(row) if row else None
+
+def get_children(parent_id: int | None) -> list[Collection]:
+    """Retorna as subcoleções diretas de uma coleção (ou as raízes, com None), por nome."""
+    con = database.get_connection()
+    if parent_id is None:
+        rows = con.execute(f"{_COLLECTIONS_SELECT} WHERE p.ancestor_id IS NULL ORDER BY c.name, c.id").fetchall()
+    else:
+        rows = con.execute(f"{_COLLECTIONS_SELECT} WHERE p.ancestor_id = ? ORDER BY c.name, c.id", (parent_id,)).fetchall()
+    return [_collection(row) for row in rows]
+
+def get_ancestors(collection_id: int) -> list[Collection]:
+    """Retorna os ancestrais de uma coleção, da raiz até o pai imediato."""
+    con = database.get_connection()
+    rows = con.execute(f"""
+        {_COLLECTIONS_SELECT}
+        JOIN collection_tree t ON t.ancestor_id = c.id
+        WHERE t.descendant_id = ? AND t.depth > 0
+        ORDER BY t.depth DESC
+    """, (collection_id,)).fetchall()
+    return [_collection(row) for row in rows]
+
+def get_descendants(collection_id: int) -> list[Collection]:
+    """Retorna todas as subcoleções de uma coleção, nível a nível e por nome."""
+    con = database.get_connection()
+    rows = con.execute(f"""
+        {_COLLECTIONS_SELECT}
+        JOIN collection_tree t ON t.descendant_id = c.id
+        WHERE t.ancestor_id = ? AND t.depth > 0
+        ORDER BY t.depth, c.name, c.id
+    """, (collection_id,)).fetchall()
+    return [_collection(row) for row in rows]
+
+def is_descendant(collection_id: int, ancestor_id: int) -> bool:
+    """Indica se `collection_id` é `ancestor_id` ou está na subárvore dele."""
+    con = database.get_connection()
+    result = con.execute(
+        "SELECT 1 FROM collection_tree WHERE ancestor_id = ? AND descendant_id = ?", (ancestor_id, collection_id)
+    ).fetchone()
+    return result is not None
+
+def move(collection_id: int, new_parent_id: int | None) -> None:
+    """
+    Move a coleção, com toda a sua subárvore, para baixo de `new_parent_id`
+    (ou para a raiz, com None). O chamador garante que o novo pai não está na
+    subárvore.
+    """
+    with database.transaction() as con:
+        # Desliga a subárvore dos ancestrais atuais
+        con.execute("""
+            DELETE FROM collection_tree
+            WHERE descendant_id IN (SELECT descendant_id FROM collection_tree WHERE ancestor_id = ?)
+              AND ancestor_id NOT IN (SELECT descendant_id FROM collection_tree WHERE ancestor_id = ?)
+        """, (collection_id, collection_id))
+        if new_parent_id is not None:
+            # Liga cada ancestral do novo pai (inclusive ele) a cada nó da subárvore
+            con.execute("""
+                INSERT INTO collection_tree (ancestor_id, descendant_id, depth)
+                SELECT a.ancestor_id, s.descendant_id, a.depth + s.depth + 1
+                FROM collection_tree a, collection_tree s
+                WHERE a.descendant_id = ? AND s.ancestor_id = ?
+            """, (new_parent_id, collection_id))
+
+def rename(collection_id: int, name: str) -> None:
+    """Renomeia uma coleção."""
+    con = database.get_connection()
+    con.execute("UPDATE collections SET name = ? WHERE id = ?", (name, collection_id))
+
+def subtree_ids(collection_id: int) -> list[int]:
+    """IDs da coleção e de todas as suas subcoleções."""
+    con = database.get_connection()
+    rows = con.execute("SELECT descendant_id FROM collection_tree WHERE ancestor_id = ? ORDER BY depth, descendant_id", (collection_id,)).fetchall()
+    return [row[0] for row in rows]
+
+def is_referenced_outside(collection_ids: list[int]) -> bool:
+    """Indica se alguma coleção fora do conjunto foi criada (em biblioteca antiga) com pai dentro dele."""
+    con = database.get_connection()
+    ids_sql = database.id_set_sql(con, collection_ids)
+    result = con.execute(
+        f"SELECT 1 FROM collections WHERE parent_id IN {ids_sql} AND id NOT IN {ids_sql} LIMIT 1"
+    ).fetchone()
+    return result is not None
+
+def delete(collection_ids: list[int]) -> None:
+    """
+    Exclui as coleções informadas (uma subárvore inteira); os itens continuam
+    na biblioteca. O DuckDB não permite remover, na mesma transação, linhas
+    que acabaram de deixar de ser referenciadas, então as associações, as
+    coleções e a tabela de fechamento são removidas em etapas. Se o processo
+    for interrompido no meio, a tabela de fechamento é reconstruída na
+    próxima inicialização.
+    """
+    with database.transaction() as con:
+        ids_sql = database.id_set_sql(con, collection_ids)
+        con.execute(f"DELETE FROM item_collections WHERE collection_id IN {ids_sql}")
+
+    con = database.get_connection()
+    ids_sql = database.id_set_sql(con, collection_ids)
+    # Coleções antigas podem referenciar o pai em `parent_id`: as folhas saem primeiro
+    while True:
+        deleted = con.execute(f"""
+            DELETE FROM collections WHERE id IN {ids_sql}
+              AND id NOT IN (SELECT parent_id FROM collections WHERE parent_id IS NOT NULL)
+        """).fetchone()[0]
+        if not deleted:
+            break
+    with database.transaction() as con:
+        ids_sql = database.id_set_sql(con, collection_ids)
+        con.execute(f"DELETE FROM collection_tree WHERE descendant_id IN {ids_sql}")
+
+def get_item_counts() -> dict[int, dict]:
+    """
+    Retorna, para cada coleção, o número de itens diretos e o número de itens
+    distintos na subárvore: {id: {'direct', 'recursive'}}.
+    """
+    con = database.get_connection()
+    rows = con.execute("""
+        WITH direct AS (
+            SELECT collection_id, count(*) AS total FROM item_collections GROUP BY collection_id
+        ),
+        recursive AS (
+            SELECT t.ancestor_id AS collection_id, count(DISTINCT ic.item_id) AS total
+            FROM collection_tree t JOIN item_collections ic ON ic.collection_id = t.descendant_id
+            GROUP BY t.ancestor_id
+        )
+        SELECT c.id, coalesce(d.total, 0), coalesce(r.total, 0)
+        FROM collections c
+        LEFT JOIN direct d ON d.collection_id = c.id
+        LEFT JOIN recursive r ON r.collection_id = c.id
+    """).fetchall()
+    return {row[0]: {'direct': row[1], 'recursive': row[2]} for row in rows}
 
 def collection_exists(collection_id: int) -> bool:
     """Verifica se uma coleção com o ID fornecido existe."""
     con = database.get_connection()
     result = con.execute("SELECT 1 FROM collections WHERE id = ?", (collection_id,)).fetchone()
-    con.close()
     return result is not None
+
+def needs_rebuild(con) -> bool:
+    """Indica se há coleções fora da tabela de fechamento (bibliotecas antigas)."""
+    collections = con.execute("SELECT count(*) FROM collections").fetchone()[0]
+    nodes = con.execute("SELECT count(*) FROM collection_tree WHERE depth = 0").fetchone()[0]
+    return collections != nodes
+
+def rebuild() -> None:
+    """
+    Reconstrói a tabela de fechamento. O pai de cada coleção já presente na
+    tabela é mantido (preservando movimentações); as demais usam `parent_id`.
+    """
+    with database.transaction() as con:
+        con.execute("""
+            CREATE OR REPLACE TEMP TABLE _collection_parents AS
+            SELECT c.id, CASE WHEN n.descendant_id IS NULL THEN c.parent_id ELSE p.ancestor_id END AS parent_id
+            FROM collections c
+            LEFT JOIN collection_tree n ON n.descendant_id = c.id AND n.depth = 0
+            LEFT JOIN collection_tree p ON p.descendant_id = c.id AND p.depth = 1
+        """)
+        con.execute("DELETE FROM collection_tree")
+        con.execute("""
+            INSERT INTO collection_tree (ancestor_id, descendant_id, depth)
+            WITH RECURSIVE paths(ancestor_id, descendant_id, depth) AS (
+                SELECT id, id, 0 FROM _collection_parents
+                UNION ALL
+                SELECT p.parent_id, paths.descendant_id, paths.depth + 1
+                FROM paths JOIN _collection_parents p ON p.id = paths.ancestor_id
+                WHERE p.parent_id IS NOT NULL
+            )
+            SELECT ancestor_id, descendant_id, depth FROM paths
+        """)
+        con.execute("DROP TABLE _collection_parents")
@@ -0,0 +1,151 @@
+# core/data_access/creator_repository.py
+"""
+Resolução de criadores (autores, editores, ...) para IDs.
+
+Cada criador tem uma chave de nome normalizada (`name_key`, indexada):
+sobrenome e prenome sem acentos, em minúsculas e sem pontuação, de modo que
+"Ada Lovelace", "ADA LOVELACE" e "Àda Lovelace" são o mesmo criador, assim
+como "J. R. R. Tolkien", "J.R.R. Tolkien" e "J R R Tolkien". Um prenome
+abreviado não é unificado com o prenome completo ("A. Lovelace" continua
+distinto de "Ada Lovelace"), pois a inicial sozinha não identifica a pessoa.
+
+`resolve` mapeia uma lista inteira de criadores para IDs com uma única
+consulta, inserindo os que ainda não existem. Um cache LRU limitado guarda
+as chaves já resolvidas; ele só recebe criadores lidos do banco (nunca os
+recém-inseridos, que sumiriam com um rollback) e é descartado quando o
+banco é reaberto.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from .. import database, tokenizer
+from ..models import Creator
+
+# Acima deste número de chaves, a busca usa uma tabela temporária e um join
+# em vez de uma lista de parâmetros (que aproveita o índice de `name_key`)
+INDEX_LOOKUP_LIMIT = 1000
+CACHE_SIZE = 100_000
+
+_APOSTROPHES_RE = re.compile(r"['’`]")
+_SEPARATORS_RE = re.compile(r"[\W_]+")
+
+_cache = OrderedDict()
+_cache_generation = None
+_cache_lock = threading.Lock()
+
+
+def _normalize_part(text: str | None) -> str:
+    text = _APOSTROPHES_RE.sub('', tokenizer.normalize(text or ''))
+    return _SEPARATORS_RE.sub(' ', text).strip()
+
+
+@lru_cache(maxsize=65536)
+def name_key(first_name: str | None, last_name: str | None) -> str:
+    """Chave normalizada que identifica um criador pelo nome."""
+    return f"{_normalize_part(last_name)}|{_normalize_part(first_name)}"
+
+
+def _cached(keys) -> dict:
+    """IDs das chaves presentes no cache (descartando-o se o banco foi reaberto)."""
+    global _cache_generation
+    found = {}
+    with _cache_lock:
+        if _cache_generation != database.manager.generation:
+            _cache.clear()
+            _cache_generation = database.manager.generation
+        for key in keys:
+            creator_id = _cache.get(key)
+            if creator_id is not None:
+                _cache.move_to_end(key)
+                found[key] = creator_id
+    return found
+
+
+def _remember(resolved: dict) -> None:
+    with _cache_lock:
+        if _cache_generation != database.manager.generation:
+            return
+        _cache.update(resolved)
+        for key in resolved:
+            _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear_cache() -> None:
+    """Esvazia o cache de criadores resolvidos."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _lookup(con, keys: list[str]) -> dict:
+    """IDs dos criadores existentes com as chaves informadas, em uma única consulta."""
+    if len(keys) <= INDEX_LOOKUP_LIMIT:
+        placeholders = ", ".join("?" for _ in keys)
+        rows = con.execute(
+            f"SELECT name_key, min(id) FROM creators WHERE name_key IN ({placeholders}) GROUP BY name_key", keys
+        ).fetchall()
+    else:
+        database.stage_rows(con, '_creator_keys', {'name_key': 'VARCHAR'}, ((key,) for key in keys))
+        rows = con.execute("""
+            SELECT k.name_key, min(c.id)
+            FROM _creator_keys k JOIN creators c ON c.name_key = k.name_key
+            GROUP BY k.name_key
+        """).fetchall()
+        con.execute("DROP TABLE _creator_keys")
+    return dict(rows)
+
+
+def resolve(con, creators: list[Creator]) -> list[int]:
+    """
+    Resolve os criadores para IDs, na ordem informada, e atualiza `creator.id`.
+    Nomes equivalentes reaproveitam o criador existente (ou o primeiro do
+    lote); os demais são inseridos com o ID que já trazem. Deve ser chamado
+    dentro da transação que grava os itens.
+    """
+    keys = [name_key(creator.first_name, creator.last_name) for creator in creators]
+    resolved = _cached(set(keys))
+
+    pending = {}
+    for key, creator in zip(keys, creators):
+        if key not in resolved:
+            pending.setdefault(key, creator)
+
+    if pending:
+        found = _lookup(con, list(pending))
+        resolved.update(found)
+        _remember(found)
+
+        new_creators = [(key, creator) for key, creator in pending.items() if key not in found]
+        if new_creators:
+            database.stage_rows(
+                con, '_stage_new_creators',
+                {'id': 'BIGINT', 'first_name': 'VARCHAR', 'last_name': 'VARCHAR', 'name_key': 'VARCHAR'},
+                ((creator.id, creator.first_name, creator.last_name, key) for key, creator in new_creators)
+            )
+            con.execute("""
+                INSERT INTO creators (id, first_name, last_name, name_key)
+                SELECT id, first_name, last_name, name_key FROM _stage_new_creators
+            """)
+            con.execute("DROP TABLE _stage_new_creators")
+            resolved.update((key, creator.id) for key, creator in new_creators)
+
+    for key, creator in zip(keys, creators):
+        creator.id = resolved[key]
+    return [creator.id for creator in creators]
+
+
+def backfill_name_keys(con) -> None:
+    """Calcula a chave de nome dos criadores gravados antes da coluna `name_key` existir."""
+    rows = con.execute("SELECT id, first_name, last_name FROM creators WHERE name_key IS NULL").fetchall()
+    if not rows:
+        return
+    database.stage_rows(
+        con, '_creator_name_keys', {'id': 'BIGINT', 'name_key': 'VARCHAR'},
+        ((creator_id, name_key(first_name, last_name)) for creator_id, first_name, last_name in rows)
+    )
+    con.execute("UPDATE creators SET name_key = k.name_key FROM _creator_name_keys k WHERE creators.id = k.id")
+    con.execute("DROP TABLE _creator_name_keys")
@@ -0,0 +1,88 @@
+# core/data_access/duplicate_repository.py
+"""
+Detecção de itens duplicados sem comparação par a par.
+
+Duplicatas exatas são agrupadas pelos identificadores normalizados (DOI,
+arXiv sem versão, ISBN) da tabela `metadata`, com um único GROUP BY.
+
+Quase-duplicatas (mesmo artigo com pequenas diferenças de título) são
+encontradas com MinHash/LSH calculado no próprio DuckDB sobre as palavras
+do título normalizado de `item_summary`: cada item ganha
+`MINHASH_BANDS * MINHASH_ROWS` valores de MinHash, e só itens que coincidem
+em uma banda inteira viram candidatos. Os candidatos são confirmados pela
+similaridade de Jaccard das palavras do título e pelo mesmo primeiro autor.
+O custo cresce com o número de itens, não com o número de pares.
+"""
+
+from .. import database
+from .item_repository import DOI_KEY_SQL
+
+# Expressões que normalizam cada identificador (valor da coluna `value`)
+IDENTIFIER_KEYS_SQL = {
+    'doi': DOI_KEY_SQL.format(value='value'),
+    'arxiv_id': r"regexp_replace(lower(trim(value)), '^arxiv:|v\d+$', '', 'g')",
+    'isbn': "regexp_replace(upper(value), '[^0-9X]', '', 'g')",
+}
+
+MINHASH_BANDS = 4
+MINHASH_ROWS = 4
+# Similaridade mínima das palavras do título para confirmar uma quase-duplicata
+TITLE_SIMILARITY = 0.8
+# Baldes LSH maiores que isto (títulos genéricos como "Introduction") são ignorados
+MAX_BUCKET_SIZE = 50
+
+
+def exact_groups() -> list[tuple[str, list[int]]]:
+    """Grupos de itens que compartilham um identificador normalizado, como (campo, [IDs])."""
+    branches = " UNION ALL ".join(
+        f"SELECT '{field}' AS field, {key_sql} AS key, item_id FROM metadata WHERE field = '{field}'"
+        for field, key_sql in IDENTIFIER_KEYS_SQL.items()
+    )
+    con = database.get_connection()
+    return con.execute(f"""
+        SELECT field, list(DISTINCT item_id ORDER BY item_id)
+        FROM ({branches})
+        WHERE key <> ''
+        GROUP BY field, key
+        HAVING count(DISTINCT item_id) > 1
+    """).fetchall()
+
+
+def near_duplicate_pairs() -> list[tuple[int, int]]:
+    """Pares de itens com títulos quase iguais e o mesmo primeiro autor, via MinHash/LSH."""
+    signature_size = MINHASH_BANDS * MINHASH_ROWS
+    con = database.get_connection()
+    return con.execute(f"""
+        WITH words AS (
+            SELECT item_id, list_distinct(list_filter(regexp_split_to_array(title_key, '[^a-z0-9]+'), lambda w: w <> '')) AS words
+            FROM item_summary
+        ),
+        signatures AS (
+            -- Assinatura MinHash calculada por linha, sem expandir as palavras em linhas
+            SELECT item_id, list_transform(range({signature_size}), lambda seed: list_min(list_transform(words, lambda w: hash(w, seed)))) AS signature
+            FROM words WHERE len(words) > 0
+        ),
+        bands AS (
+            SELECT item_id, band, hash(signature[band * {MINHASH_ROWS} + 1 : (band + 1) * {MINHASH_ROWS}]) AS bucket
+            FROM signatures CROSS JOIN range({MINHASH_BANDS}) r(band)
+        ),
+        buckets AS (
+            SELECT band, bucket FROM bands GROUP BY band, bucket
+            HAVING count(*) BETWEEN 2 AND {MAX_BUCKET_SIZE}
+        ),
+        candidates AS (
+            SELECT DISTINCT x.item_id AS a, y.item_id AS b
+            FROM bands x
+            JOIN buckets k ON k.band = x.band AND k.bucket = x.bucket
+            JOIN bands y ON y.band = x.band AND y.bucket = x.bucket AND x.item_id < y.item_id
+        )
+        SELECT c.a, c.b
+        FROM candidates c
+        JOIN item_summary sa ON sa.item_id = c.a
+        JOIN item_summary sb ON sb.item_id = c.b
+        JOIN words wa ON wa.item_id = c.a
+        JOIN words wb ON wb.item_id = c.b
+        WHERE sa.author_key = sb.author_key
+          AND len(list_intersect(wa.words, wb.words)) >= {TITLE_SIMILARITY} * len(list_distinct(list_concat(wa.words, wb.words)))
+        ORDER BY c.a, c.b
+    """).fetchall()
@@ -0,0 +1,196 @@
+# core/data_access/fulltext_repository.py
+"""
+Texto completo dos anexos e índice invertido por página.
+
+O texto extraído de cada conteúdo (identificado pelo hash, então anexos
+repetidos compartilham a extração) fica comprimido em `attachment_texts`.
+As postagens (termo, texto, página, frequência) seguem o mesmo esquema do
+índice de itens: `fulltext_postings` ordenada por termo e
+`fulltext_postings_delta` para as escritas recentes.
+"""
+
+import base64
+
+from .. import database
+from .search_repository import query_filters
+
+POSTINGS_TABLES = ('fulltext_postings', 'fulltext_postings_delta')
+DELTA_MERGE_MIN_ROWS = 200_000
+DELTA_MERGE_RATIO = 0.1
+PDF_MIME_TYPE = 'application/pdf'
+
+
+def pending(extractor_version: int, limit: int | None = None) -> list[tuple[str, str]]:
+    """
+    Conteúdos PDF anexados que ainda não foram extraídos com a versão atual
+    do extrator, como (hash, caminho relativo de um dos anexos).
+    """
+    con = database.get_connection()
+    limit_sql = "LIMIT ?" if limit is not None else ""
+    params = [extractor_version, PDF_MIME_TYPE] + ([limit] if limit is not None else [])
+    return con.execute(f"""
+        SELECT a.content_hash, min(a.path)
+        FROM attachments a
+        LEFT JOIN attachment_texts t ON t.content_hash = a.content_hash AND t.extractor_version = ?
+        WHERE a.content_hash IS NOT NULL AND a.mime_type = ? AND t.content_hash IS NULL
+        GROUP BY a.content_hash
+        ORDER BY a.content_hash
+        {limit_sql}
+    """, params).fetchall()
+
+
+def extracted(content_hashes: list[str], extractor_version: int) -> set[str]:
+    """Dentre os conteúdos informados, os que já foram extraídos com a versão atual do extrator."""
+    if not content_hashes:
+        return set()
+    placeholders = ", ".join("?" for _ in content_hashes)
+    con = database.get_connection()
+    rows = con.execute(
+        f"SELECT content_hash FROM attachment_texts WHERE extractor_version = ? AND content_hash IN ({placeholders})",
+        [extractor_version, *content_hashes]
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _delete(con) -> None:
+    """Remove o texto e as postagens dos conteúdos em `_text_hashes`."""
+    for table in POSTINGS_TABLES:
+        con.execute(f"""
+            DELETE FROM {table} WHERE text_id IN (
+                SELECT t.text_id FROM attachment_texts t JOIN _text_hashes h ON t.content_hash = h.content_hash
+            )
+        """)
+    con.execute("DELETE FROM attachment_texts WHERE content_hash IN (SELECT content_hash FROM _text_hashes)")
+
+
+def store(entries: list[dict], extractor_version: int) -> None:
+    """
+    Grava, em uma transação, o resultado da extração de vários conteúdos.
+    Cada entrada tem 'content_hash', 'text_id' e, em caso de sucesso,
+    'page_count', 'text' (comprimido) e 'postings' [(termo, página, tf)];
+    em caso de falha, 'error'.
+    """
+    if not entries:
+        return
+    with database.transaction() as con:
+        database.stage_rows(con, '_text_hashes', {'content_hash': 'VARCHAR'}, ((e['content_hash'],) for e in entries))
+        _delete(con)
+
+        # BLOBs passam pelo carregamento em lote codificados em base64
+        database.stage_rows(
+            con, '_stage_texts',
+            {'content_hash': 'VARCHAR', 'text_id': 'BIGINT', 'page_count': 'INTEGER', 'text': 'VARCHAR', 'error': 'VARCHAR'},
+            ((e['content_hash'], e['text_id'], e.get('page_count'),
+              base64.b64encode(e['text']).decode('ascii') if e.get('text') is not None else None, e.get('error'))
+             for e in entries)
+        )
+        con.execute("""
+            INSERT INTO attachment_texts (content_hash, text_id, extractor_version, page_count, text, error)
+            SELECT content_hash, text_id, ?, page_count, from_base64(text), error FROM _stage_texts
+        """, (extractor_version,))
+
+        database.stage_rows(
+            con, '_stage_text_postings',
+            {'term': 'VARCHAR', 'text_id': 'BIGINT', 'page': 'INTEGER', 'tf': 'INTEGER'},
+            ((term, e['text_id'], page, tf) for e in entries for term, page, tf in e.get('postings') or ())
+        )
+        con.execute("""
+            INSERT INTO fulltext_postings_delta (term, text_id, page, tf)
+            SELECT term, text_id, page, tf FROM _stage_text_postings
+        """)
+        for table in ('_text_hashes', '_stage_texts', '_stage_text_postings'):
+            con.execute(f"DROP TABLE {table}")
+
+
+def remove(content_hashes: list[str]) -> None:
+    """Remove o texto e as postagens dos conteúdos informados."""
+    if not content_hashes:
+        return
+    with database.transaction() as con:
+        database.stage_rows(con, '_text_hashes', {'content_hash': 'VARCHAR'}, ((digest,) for digest in content_hashes))
+        _delete(con)
+        con.execute("DROP TABLE _text_hashes")
+
+
+def get_text_blob(attachment_id: int) -> bytes | None:
+    """Retorna o texto comprimido das páginas de um anexo, ou None se ainda não foi extraído."""
+    con = database.get_connection()
+    row = con.execute("""
+        SELECT t.text FROM attachments a JOIN attachment_texts t ON t.content_hash = a.content_hash
+        WHERE a.id = ? AND t.text IS NOT NULL
+    """, (attachment_id,)).fetchone()
+    return row[0] if row else None
+
+
+def merge_delta_if_needed() -> None:
+    """Mescla a tabela delta na principal quando ela cresce demais (fora de uma transação)."""
+    con = database.get_connection()
+    delta_rows = con.execute("SELECT count(*) FROM fulltext_postings_delta").fetchone()[0]
+    if delta_rows < DELTA_MERGE_MIN_ROWS:
+        return
+    main_rows = con.execute("SELECT count(*) FROM fulltext_postings").fetchone()[0]
+    if delta_rows >= main_rows * DELTA_MERGE_RATIO:
+        merge_delta()
+
+
+def merge_delta() -> None:
+    """Mescla incondicionalmente a tabela delta na tabela principal ordenada."""
+    with database.transaction() as con:
+        con.execute("""
+            CREATE OR REPLACE TABLE fulltext_postings AS
+            SELECT term, text_id, page, tf FROM (
+                SELECT term, text_id, page, tf FROM fulltext_postings
+                UNION ALL
+                SELECT term, text_id, page, tf FROM fulltext_postings_delta
+            ) ORDER BY term, text_id, page
+        """)
+        con.execute("DELETE FROM fulltext_postings_delta")
+
+
+def search(query: str) -> list[dict]:
+    """
+    Busca a consulta dentro do texto dos anexos. Uma página casa quando
+    contém todas as palavras. Retorna os itens ordenados pela soma das
+    frequências nas páginas que casaram, cada um com 'fulltext_hits':
+    [{'attachment_id', 'pages'}].
+    """
+    groups = query_filters(query)
+    if not groups:
+        return []
+
+    branches = []
+    params = []
+    for index, group in enumerate(groups):
+        for condition, values in group:
+            for table in POSTINGS_TABLES:
+                branches.append(f"SELECT text_id, page, tf, {index} AS grp FROM {table} WHERE {condition}")
+                params.extend(values)
+    params.append(len(groups))
+
+    con = database.get_connection()
+    rows = con.execute(f"""
+        WITH postings AS (
+            {" UNION ALL ".join(branches)}
+        ),
+        page_hits AS (
+            SELECT text_id, page, sum(tf) AS score
+            FROM postings GROUP BY text_id, page
+            HAVING count(DISTINCT grp) = ?
+        ),
+        attachment_hits AS (
+            SELECT a.item_id, a.id AS attachment_id, list(h.page ORDER BY h.page) AS pages, sum(h.score) AS score
+            FROM page_hits h
+            JOIN attachment_texts t ON t.text_id = h.text_id
+            JOIN attachments a ON a.content_hash = t.content_hash
+            GROUP BY a.item_id, a.id
+        )
+        SELECT i.id, i.item_type, i.title, list({{'attachment_id': h.attachment_id, 'pages': h.pages}} ORDER BY h.attachment_id) AS hits, sum(h.score) AS score
+        FROM attachment_hits h JOIN items i ON i.id = h.item_id
+        GROUP BY i.id, i.item_type, i.title, i.date_modified
+        ORDER BY score DESC, i.date_modified DESC, i.id
+    """, params).fetchall()
+    return [
+        {'id': row[0], 'item_type': row[1], 'title': row[2],
+         'fulltext_hits': [dict(hit) for hit in row[3]]}
+        for row in rows
+    ]
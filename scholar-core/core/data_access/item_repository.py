@@ -1,135 +1,360 @@
 # core/data_access/item_repository.py
 from .. import database
 from ..models import Item, Creator, Tag, Attachment
+from . import creator_repository, search_repository, summary_repository
+
+# Formas normalizadas de DOI e URL usadas na deduplicação; devem corresponder
+# a `metadata_resolver.normalize_doi` e a `item_service.normalize_url`
+DOI_KEY_SQL = r"lower(trim(regexp_replace(trim({value}), '^(https?://(dx\.)?doi\.org/|doi:)', '', 'i')))"
+URL_KEY_SQL = "rtrim(split_part(trim({value}), '#', 1), '/')"
 
 def get(item_id: int) -> dict | None:
     """Recupera todos os dados brutos de um item do banco de dados."""
+    items = get_many([item_id])
+    return items[0] if items else None
+
+def get_many(item_ids: list[int]) -> list[dict]:
+    """
+    Recupera os dados brutos de vários itens com um número constante de
+    consultas, na ordem dos IDs informados. IDs inexistentes são ignorados.
+    """
+    if not item_ids:
+        return []
+
     con = database.get_connection()
+    ids_sql = database.id_set_sql(con, item_ids)
+
+    items_by_id = {}
+    for row in con.execute(f"SELECT id, item_type, title, date_added, date_modified FROM items WHERE id IN {ids_sql}").fetchall():
+        items_by_id[row[0]] = {
+            'id': row[0],
+            'item_type': row[1],
+            'title': row[2],
+            'date_added': row[3],
+            'date_modified': row[4],
+            'metadata': {},
+            'creators': [],
+            'tags': [],
+            'attachments': []
+        }
+    if not items_by_id:
+        return []
+
+    for item_id, field, value in con.execute(f"SELECT item_id, field, value FROM metadata WHERE item_id IN {ids_sql}").fetchall():
+        items_by_id[item_id]['metadata'][field] = value
 
-    item_row = con.execute("SELECT id, item_type, title, date_added, date_modified FROM items WHERE id = ?", (item_id,)).fetchone()
-    if not item_row:
-        con.close()
-        return None
-
-    item_data = {
-        'id': item_row[0],
-        'item_type': item_row[1],
-        'title': item_row[2],
-        'date_added': item_row[3],
-        'date_modified': item_row[4],
-        'metadata': {},
-        'creators': [],
-        'tags': [],
-        'attachments': []
-    }
-
-    metadata_rows = con.execute("SELECT field, value FROM metadata WHERE item_id = ?", (item_id,)).fetchall()
-    item_data['metadata'] = {row[0]: row[1] for row in metadata_rows}
-
-    creator_rows = con.execute("""
-        SELECT c.id, c.first_name, c.last_name, ic.creator_type
+    for row in con.execute(f"""
+        SELECT ic.item_id, c.id, c.first_name, c.last_name, ic.creator_type
         FROM item_creators ic JOIN creators c ON ic.creator_id = c.id
-        WHERE ic.item_id = ? ORDER BY ic.order_index
-    """, (item_id,)).fetchall()
-    item_data['creators'] = [Creator(id=row[0], first_name=row[1], last_name=row[2], creator_type=row[3]) for row in creator_rows]
+        WHERE ic.item_id IN {ids_sql} ORDER BY ic.item_id, ic.order_index
+    """).fetchall():
+        items_by_id[row[0]]['creators'].append(Creator(id=row[1], first_name=row[2], last_name=row[3], creator_type=row[4]))
 
-    tag_rows = con.execute("""
-        SELECT t.id, t.name FROM tags t JOIN item_tags it ON t.id = it.tag_id
-        WHERE it.item_id = ? ORDER BY t.name
-    """, (item_id,)).fetchall()
-    item_data['tags'] = [Tag(id=row[0], name=row[1]) for row in tag_rows]
+    for row in con.execute(f"""
+        SELECT it.item_id, t.id, t.name FROM tags t JOIN item_tags it ON t.id = it.tag_id
+        WHERE it.item_id IN {ids_sql} ORDER BY it.item_id, t.name
+    """).fetchall():
+        items_by_id[row[0]]['tags'].append(Tag(id=row[1], name=row[2]))
 
-    attachment_rows = con.execute("""
+    for row in con.execute(f"""
         SELECT id, item_id, path, mime_type, date_added FROM attachments
-        WHERE item_id = ? ORDER BY date_added
-    """, (item_id,)).fetchall()
-    item_data['attachments'] = [Attachment(id=row[0], item_id=row[1], path=row[2], mime_type=row[3], date_added=row[4]) for row in attachment_rows]
+        WHERE item_id IN {ids_sql} ORDER BY item_id, date_added
+    """).fetchall():
+        items_by_id[row[1]]['attachments'].append(Attachment(id=row[0], item_id=row[1], path=row[2], mime_type=row[3], date_added=row[4]))
 
-    con.close()
-    return item_data
+    return [items_by_id[item_id] for item_id in dict.fromkeys(item_ids) if item_id in items_by_id]
 
-def search(query: str) -> list[dict]:
-    """Busca itens por um termo no título ou nos metadados."""
+def get_metadata_fields(fields: list[str]) -> dict[int, dict]:
+    """
+    Retorna {item_id: {campo: valor}} com os campos informados, em uma única
+    consulta, apenas para os itens que possuem o primeiro campo.
+    """
+    if not fields:
+        return {}
+    placeholders = ", ".join("?" for _ in fields)
     con = database.get_connection()
-    search_term = f"%{query.lower()}%"
+    rows = con.execute(f"""
+        SELECT m.item_id, m.field, m.value FROM metadata m
+        WHERE m.field IN ({placeholders})
+          AND m.item_id IN (SELECT item_id FROM metadata WHERE field = ?)
+    """, (*fields, fields[0])).fetchall()
+    result = {}
+    for item_id, field, value in rows:
+        result.setdefault(item_id, {})[field] = value
+    return result
 
-    items = con.execute("""
-        SELECT DISTINCT i.id, i.item_type, i.title
-        FROM items i
-        LEFT JOIN metadata m ON i.id = m.item_id
-        WHERE lower(i.title) LIKE ? OR lower(m.value) LIKE ?
-        ORDER BY i.date_modified DESC
-    """, (search_term, search_term)).fetchall()
-    con.close()
-    return [{'id': row[0], 'item_type': row[1], 'title': row[2]} for row in items]
+def find_by_identifiers(dois: list[str], urls: list[str]) -> dict[tuple[str, str], int]:
+    """
+    Procura itens existentes pelos DOIs e URLs informados (já normalizados)
+    em uma única consulta. Retorna {('doi' | 'url', valor): item_id}.
+    """
+    keys = [('doi', doi) for doi in dois] + [('url', url) for url in urls]
+    if not keys:
+        return {}
+    con = database.get_connection()
+    database.stage_rows(con, '_identifier_keys', {'field': 'VARCHAR', 'key': 'VARCHAR'}, keys)
+    rows = con.execute(f"""
+        SELECT k.field, k.key, min(m.item_id)
+        FROM metadata m
+        JOIN _identifier_keys k ON m.field = k.field AND k.key = CASE m.field
+            WHEN 'doi' THEN {DOI_KEY_SQL.format(value='m.value')}
+            ELSE {URL_KEY_SQL.format(value='m.value')}
+        END
+        WHERE m.field IN ('doi', 'url')
+        GROUP BY k.field, k.key
+    """).fetchall()
+    return {(field, key): item_id for field, key, item_id in rows}
+
+def search(query: str, limit: int | None = None, offset: int = 0) -> list[dict]:
+    """Busca itens por termos no título, nos metadados ou nos criadores."""
+    return search_repository.search(query, limit, offset)
 
 def get_all_summary() -> list[dict]:
     """Retorna um resumo de todos os itens."""
     con = database.get_connection()
     items = con.execute("""
-        SELECT
-            i.id, i.item_type, i.title,
-            (SELECT c.last_name FROM creators c JOIN item_creators ic ON c.id = ic.creator_id
-             WHERE ic.item_id = i.id AND ic.creator_type = 'author'
-             ORDER BY ic.order_index LIMIT 1) AS first_author
-        FROM items i ORDER BY i.date_added DESC
+        SELECT i.id, i.item_type, i.title, s.first_author
+        FROM items i LEFT JOIN item_summary s ON s.item_id = i.id
+        ORDER BY i.date_added DESC
     """).fetchall()
-    con.close()
     return [{'id': row[0], 'item_type': row[1], 'title': row[2], 'author_text': row[3] if row[3] else ''} for row in items]
 
+# Tabela que contém a chave, coluna de ID, expressão de ordenação e tipo SQL
+# da chave de cada ordenação suportada
+SORT_KEYS = {
+    'title': ('item_summary', 'item_id', "title_key", 'VARCHAR'),
+    'author': ('item_summary', 'item_id', "author_key", 'VARCHAR'),
+    'date_added': ('items', 'id', "date_added", 'TIMESTAMP'),
+    'date_modified': ('items', 'id', "date_modified", 'TIMESTAMP'),
+    'year': ('item_summary', 'item_id', "coalesce(year, 0)", 'INTEGER'),
+}
+
+def list_summaries(sort: str, descending: bool, limit: int, after: tuple | None = None,
+                   collection_id: int | None = None) -> list[tuple]:
+    """
+    Retorna uma página de resumos ordenada por `sort`, usando paginação por
+    chave (keyset): `after` é o par (chave, id) da última linha da página
+    anterior. Cada linha é (resumo, chave de ordenação).
+    """
+    table, id_column, key_sql, key_type = SORT_KEYS[sort]
+    direction = "DESC" if descending else "ASC"
+    comparison = "<" if descending else ">"
+
+    # Só a tabela que contém a chave é varrida; as demais colunas são
+    # buscadas apenas para as linhas da página.
+    join_sql = ""
+    params = []
+    if collection_id is not None:
+        join_sql = f"JOIN item_collections ic ON ic.item_id = k.{id_column} AND ic.collection_id = ?"
+        params.append(collection_id)
+
+    where_sql = ""
+    if after is not None:
+        where_sql = f"WHERE {key_sql} {comparison} CAST(? AS {key_type}) OR ({key_sql} = CAST(? AS {key_type}) AND k.{id_column} {comparison} ?)"
+        params += [after[0], after[0], after[1]]
+    params.append(limit)
+
+    con = database.get_connection()
+    rows = con.execute(f"""
+        WITH page AS (
+            SELECT k.{id_column} AS id, {key_sql} AS sort_key
+            FROM {table} k {join_sql}
+            {where_sql}
+            ORDER BY sort_key {direction}, k.{id_column} {direction}
+            LIMIT ?
+        )
+        SELECT i.id, i.item_type, i.title, s.first_author, s.year, p.sort_key
+        FROM page p
+        JOIN items i ON i.id = p.id
+        LEFT JOIN item_summary s ON s.item_id = p.id
+        ORDER BY p.sort_key {direction}, p.id {direction}
+    """, params).fetchall()
+    return [
+        ({'id': row[0], 'item_type': row[1], 'title': row[2], 'author_text': row[3] or '', 'year': row[4]}, row[5])
+        for row in rows
+    ]
+
+def _insert_item_creators(con, items: list[Item]) -> None:
+    """
+    Liga os itens aos criadores já resolvidos. Nomes equivalentes repetidos
+    em um mesmo item resultam em uma única ligação.
+    """
+    database.stage_rows(
+        con, '_stage_item_creators',
+        {'item_id': 'BIGINT', 'creator_id': 'BIGINT', 'creator_type': 'VARCHAR', 'order_index': 'INTEGER'},
+        ((item.id, creator.id, creator.creator_type, index)
+         for item in items for index, creator in enumerate(item.creators))
+    )
+    con.execute("""
+        INSERT INTO item_creators (item_id, creator_id, creator_type, order_index)
+        SELECT item_id, creator_id, creator_type, order_index FROM _stage_item_creators
+        ON CONFLICT DO NOTHING
+    """)
+    con.execute("DROP TABLE _stage_item_creators")
+
 def add(item: Item) -> None:
     """Adiciona um novo item e seus dados associados ao banco de dados."""
-    con = database.get_connection()
-    con.execute("INSERT INTO items (id, item_type, title) VALUES (?, ?, ?)", (item.id, item.item_type, item.title))
-
-    if item.metadata:
-        metadata_to_insert = [(item.id, k, v) for k, v in item.metadata.items()]
-        con.executemany("INSERT INTO metadata (item_id, field, value) VALUES (?, ?, ?)", metadata_to_insert)
-
-    if item.creators:
-        item_creators_to_insert = []
-        for index, creator in enumerate(item.creators):
-            result = con.execute("SELECT id FROM creators WHERE first_name = ? AND last_name = ?", (creator.first_name, creator.last_name)).fetchone()
-            if result:
-                creator.id = result[0]
-            else:
-                con.execute("INSERT INTO creators (id, first_name, last_name) VALUES (?, ?, ?)", (creator.id, creator.first_name, creator.last_name))
-            item_creators_to_insert.append((item.id, creator.id, creator.creator_type, index))
-        con.executemany("INSERT INTO item_creators (item_id, creator_id, creator_type, order_index) VALUES (?, ?, ?, ?)", item_creators_to_insert)
-    con.close()
+    with database.transaction() as con:
+        con.execute("INSERT INTO items (id, item_type, title) VALUES (?, ?, ?)", (item.id, item.item_type, item.title))
+
+        if item.metadata:
+            metadata_to_insert = [(item.id, k, v) for k, v in item.metadata.items()]
+            con.executemany("INSERT INTO metadata (item_id, field, value) VALUES (?, ?, ?)", metadata_to_insert)
+
+        if item.creators:
+            creator_repository.resolve(con, item.creators)
+            _insert_item_creators(con, [item])
+
+        search_repository.index_items(con, [item.id])
+        summary_repository.refresh_items(con, [item.id])
+    search_repository.merge_delta_if_needed()
+
+def add_many(items: list[Item]) -> None:
+    """
+    Adiciona um lote de itens em uma única transação, usando tabelas
+    temporárias e inserções baseadas em conjuntos.
+    """
+    if not items:
+        return
+
+    with database.transaction() as con:
+        insert_many(con, items)
+    search_repository.merge_delta_if_needed()
+
+def insert_many(con, items: list[Item]) -> None:
+    """
+    Grava um lote de itens na transação em andamento, para que outras
+    gravações (como os anexos de uma importação) entrem no mesmo commit. O
+    chamador deve chamar `search_repository.merge_delta_if_needed()` depois
+    do commit.
+    """
+    database.stage_rows(
+        con, '_stage_items',
+        {'id': 'BIGINT', 'item_type': 'VARCHAR', 'title': 'VARCHAR'},
+        ((item.id, item.item_type, item.title) for item in items)
+    )
+    con.execute("INSERT INTO items (id, item_type, title) SELECT id, item_type, title FROM _stage_items")
+
+    database.stage_rows(
+        con, '_stage_metadata',
+        {'item_id': 'BIGINT', 'field': 'VARCHAR', 'value': 'VARCHAR'},
+        ((item.id, k, v) for item in items for k, v in item.metadata.items())
+    )
+    con.execute("INSERT INTO metadata (item_id, field, value) SELECT item_id, field, value FROM _stage_metadata")
+
+    creator_repository.resolve(con, [creator for item in items for creator in item.creators])
+    _insert_item_creators(con, items)
+
+    con.execute("DROP TABLE _stage_items")
+    con.execute("DROP TABLE _stage_metadata")
+
+    item_ids = [item.id for item in items]
+    search_repository.index_items(con, item_ids)
+    summary_repository.refresh_items(con, item_ids)
 
 def update(item_id: int, update_data: dict) -> None:
     """Atualiza os dados de um item existente."""
-    con = database.get_connection()
-    if 'metadata' in update_data:
-        metadata_to_upsert = [(item_id, k, v) for k, v in update_data['metadata'].items()]
-        if metadata_to_upsert:
-            con.executemany("INSERT INTO metadata (item_id, field, value) VALUES (?, ?, ?) ON CONFLICT (item_id, field) DO UPDATE SET value = excluded.value", metadata_to_upsert)
-            if 'title' in update_data['metadata']:
-                con.execute("UPDATE items SET title = ? WHERE id = ?", (update_data['metadata']['title'], item_id))
-    con.execute("UPDATE items SET date_modified = current_timestamp WHERE id = ?", (item_id,))
-    con.close()
+    with database.transaction() as con:
+        if 'metadata' in update_data:
+            metadata_to_upsert = [(item_id, k, v) for k, v in update_data['metadata'].items()]
+            if metadata_to_upsert:
+                con.executemany("INSERT INTO metadata (item_id, field, value) VALUES (?, ?, ?) ON CONFLICT (item_id, field) DO UPDATE SET value = excluded.value", metadata_to_upsert)
+                if 'title' in update_data['metadata']:
+                    con.execute("UPDATE items SET title = ? WHERE id = ?", (update_data['metadata']['title'], item_id))
+        con.execute("UPDATE items SET date_modified = current_timestamp WHERE id = ?", (item_id,))
+        search_repository.index_items(con, [item_id])
+        summary_repository.refresh_items(con, [item_id])
+    search_repository.merge_delta_if_needed()
 
 def delete(item_id: int) -> bool:
     """Exclui um item e seus dados associados."""
+    with database.transaction() as con:
+        item_exists = con.execute("SELECT id FROM items WHERE id = ?", (item_id,)).fetchone()
+        if not item_exists:
+            return False
+
+        con.execute("DELETE FROM item_creators WHERE item_id = ?", (item_id,))
+        con.execute("DELETE FROM metadata WHERE item_id = ?", (item_id,))
+        con.execute("DELETE FROM item_tags WHERE item_id = ?", (item_id,))
+        con.execute("DELETE FROM item_collections WHERE item_id = ?", (item_id,))
+        con.execute("DELETE FROM attachments WHERE item_id = ?", (item_id,))
+        search_repository.remove_items(con, [item_id])
+        summary_repository.remove_items(con, [item_id])
+
+    # O DuckDB não permite apagar a linha referenciada na mesma transação em
+    # que as referências foram removidas (limitação das foreign keys), então o
+    # item em si é removido logo após o commit dos dados associados.
     con = database.get_connection()
-    item_exists = con.execute("SELECT id FROM items WHERE id = ?", (item_id,)).fetchone()
-    if not item_exists:
-        con.close()
-        return False
-
-    con.execute("DELETE FROM item_creators WHERE item_id = ?", (item_id,))
-    con.execute("DELETE FROM metadata WHERE item_id = ?", (item_id,))
-    con.execute("DELETE FROM item_tags WHERE item_id = ?", (item_id,))
-    con.execute("DELETE FROM item_collections WHERE item_id = ?", (item_id,))
-    con.execute("DELETE FROM attachments WHERE item_id = ?", (item_id,))
     con.execute("DELETE FROM items WHERE id = ?", (item_id,))
-    con.close()
     return True
 
+def merge(keep_id: int, duplicate_ids: list[int]) -> list[int]:
+    """
+    Funde os itens duplicados no item `keep_id` em uma transação: campos de
+    metadados ausentes no item mantido (e os criadores, se ele não tiver
+    nenhum) são copiados das duplicatas, e tags, coleções e anexos passam
+    para o item mantido. As duplicatas são então excluídas. Retorna os IDs
+    das duplicatas que existiam.
+    """
+    duplicate_ids = [item_id for item_id in dict.fromkeys(duplicate_ids) if item_id != keep_id]
+    if not duplicate_ids:
+        return []
+
+    with database.transaction() as con:
+        ids_sql = database.id_set_sql(con, duplicate_ids)
+        duplicate_ids = [row[0] for row in con.execute(f"SELECT id FROM items WHERE id IN {ids_sql} ORDER BY id").fetchall()]
+        if not duplicate_ids or not con.execute("SELECT 1 FROM items WHERE id = ?", (keep_id,)).fetchone():
+            return []
+        ids_sql = database.id_set_sql(con, duplicate_ids)
+
+        # Cada campo ausente vem da duplicata de menor ID que o tem
+        con.execute(f"""
+            INSERT INTO metadata (item_id, field, value)
+            SELECT ?, field, arg_min(value, item_id) FROM metadata
+            WHERE item_id IN {ids_sql}
+              AND field NOT IN (SELECT field FROM metadata WHERE item_id = ?)
+            GROUP BY field
+        """, (keep_id, keep_id))
+        if not con.execute("SELECT 1 FROM item_creators WHERE item_id = ?", (keep_id,)).fetchone():
+            con.execute(f"""
+                INSERT INTO item_creators (item_id, creator_id, creator_type, order_index)
+                SELECT ?, creator_id, creator_type, order_index FROM item_creators
+                WHERE item_id = (SELECT min(item_id) FROM item_creators WHERE item_id IN {ids_sql})
+            """, (keep_id,))
+
+        for table, column in (('item_tags', 'tag_id'), ('item_collections', 'collection_id')):
+            con.execute(f"""
+                INSERT INTO {table} (item_id, {column})
+                SELECT DISTINCT ?, {column} FROM {table} WHERE item_id IN {ids_sql}
+                ON CONFLICT DO NOTHING
+            """, (keep_id,))
+            con.execute(f"DELETE FROM {table} WHERE item_id IN {ids_sql}")
+
+        # Anexos cujo conteúdo o item mantido já tem são descartados em vez de repetidos
+        con.execute(f"""
+            DELETE FROM attachments WHERE item_id IN {ids_sql} AND content_hash IN (
+                SELECT content_hash FROM attachments WHERE item_id = ? AND content_hash IS NOT NULL
+            )
+        """, (keep_id,))
+        con.execute(f"UPDATE attachments SET item_id = ? WHERE item_id IN {ids_sql}", (keep_id,))
+
+        con.execute(f"DELETE FROM item_creators WHERE item_id IN {ids_sql}")
+        con.execute(f"DELETE FROM metadata WHERE item_id IN {ids_sql}")
+        con.execute("UPDATE items SET date_modified = current_timestamp WHERE id = ?", (keep_id,))
+        search_repository.remove_items(con, duplicate_ids)
+        summary_repository.remove_items(con, duplicate_ids)
+        search_repository.index_items(con, [keep_id])
+        summary_repository.refresh_items(con, [keep_id])
+
+    # Assim como em `delete`, as linhas de `items` só podem ser apagadas
+    # depois do commit que removeu as referências a elas
+    con = database.get_connection()
+    con.execute(f"DELETE FROM items WHERE id IN {database.id_set_sql(con, duplicate_ids)}")
+    search_repository.merge_delta_if_needed()
+    return duplicate_ids
+
 def item_exists(item_id: int) -> bool:
     """Verifica se um item com o ID fornecido existe."""
     con = database.get_connection()
     result = con.execute("SELECT 1 FROM items WHERE id = ?", (item_id,)).fetchone()
-    con.close()
     return result is not None
@@ -0,0 +1,21 @@
+# core/data_access/plugin_state_repository.py
+from .. import database
+
+def get(plugin: str) -> dict[str, tuple]:
+    """Retorna o estado salvo de um plugin como {chave: (valor, atualizado_em)}."""
+    con = database.get_connection()
+    rows = con.execute("SELECT key, value, updated_at FROM plugin_state WHERE plugin = ?", (plugin,)).fetchall()
+    return {key: (value, updated_at) for key, value, updated_at in rows}
+
+def set_many(plugin: str, values: dict[str, str]) -> None:
+    """Grava (ou substitui) várias chaves do estado de um plugin em uma transação."""
+    if not values:
+        return
+    with database.transaction() as con:
+        database.stage_rows(con, '_stage_plugin_state', {'key': 'VARCHAR', 'value': 'VARCHAR'}, values.items())
+        con.execute("""
+            INSERT INTO plugin_state (plugin, key, value, updated_at)
+            SELECT ?, key, value, current_timestamp FROM _stage_plugin_state
+            ON CONFLICT (plugin, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+        """, (plugin,))
+        con.execute("DROP TABLE _stage_plugin_state")
@@ -0,0 +1,216 @@
+# core/data_access/search_repository.py
+"""
+Índice invertido para a busca textual de itens.
+
+Cada item vira um documento formado pelo título (com peso dobrado), pelos
+valores de metadados e pelos nomes dos criadores. As postagens ficam em
+`search_postings` (ordenada por termo) e em `search_postings_delta`
+(escritas recentes), e o ranqueamento usa BM25 calculado em SQL.
+"""
+
+from collections import Counter
+
+from .. import database
+from .. import tokenizer
+
+TITLE_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+POSTINGS_TABLES = ('search_postings', 'search_postings_delta')
+DELTA_MERGE_MIN_ROWS = 50_000
+DELTA_MERGE_RATIO = 0.1
+MIN_PREFIX_LENGTH = 3
+_MAX_CHAR = chr(0x10FFFF)
+
+
+def _document_terms(con) -> dict[int, Counter]:
+    """Lê os textos dos itens em `_index_ids` e conta os termos de cada um."""
+    documents = {}
+    for item_id, title in con.execute(
+        "SELECT i.id, i.title FROM items i JOIN _index_ids x ON i.id = x.item_id"
+    ).fetchall():
+        counts = Counter()
+        for term in tokenizer.tokenize(title):
+            counts[term] += TITLE_WEIGHT
+        documents[item_id] = counts
+
+    # O título já está indexado com peso próprio, então o campo 'title' é ignorado
+    for item_id, value in con.execute("""
+        SELECT m.item_id, m.value FROM metadata m JOIN _index_ids x ON m.item_id = x.item_id
+        WHERE m.field <> 'title'
+    """).fetchall():
+        documents[item_id].update(tokenizer.tokenize(value))
+
+    for item_id, first_name, last_name in con.execute("""
+        SELECT ic.item_id, c.first_name, c.last_name
+        FROM item_creators ic JOIN creators c ON ic.creator_id = c.id
+        JOIN _index_ids x ON ic.item_id = x.item_id
+    """).fetchall():
+        documents[item_id].update(tokenizer.tokenize(f"{first_name or ''} {last_name or ''}"))
+
+    return documents
+
+
+def index_items(con, item_ids: list[int]) -> None:
+    """
+    (Re)indexa os itens informados. Deve ser chamado dentro da mesma
+    transação que alterou os itens; as novas postagens vão para a tabela
+    delta, mesclada depois por `merge_delta_if_needed`.
+    """
+    if not item_ids:
+        return
+
+    database.stage_rows(con, '_index_ids', {'item_id': 'BIGINT'}, ((item_id,) for item_id in item_ids))
+    documents = _document_terms(con)
+
+    for table in POSTINGS_TABLES + ('search_documents',):
+        con.execute(f"DELETE FROM {table} WHERE item_id IN (SELECT item_id FROM _index_ids)")
+
+    lengths = {item_id: sum(counts.values()) for item_id, counts in documents.items()}
+    database.stage_rows(
+        con, '_index_postings',
+        {'term': 'VARCHAR', 'item_id': 'BIGINT', 'tf': 'INTEGER', 'doc_length': 'INTEGER'},
+        ((term, item_id, tf, lengths[item_id]) for item_id, counts in documents.items() for term, tf in counts.items())
+    )
+    database.stage_rows(
+        con, '_index_documents',
+        {'item_id': 'BIGINT', 'length': 'INTEGER'},
+        lengths.items()
+    )
+    con.execute("INSERT INTO search_postings_delta (term, item_id, tf, doc_length) SELECT term, item_id, tf, doc_length FROM _index_postings")
+    con.execute("INSERT INTO search_documents (item_id, length) SELECT item_id, length FROM _index_documents")
+
+    con.execute("DROP TABLE _index_ids")
+    con.execute("DROP TABLE _index_postings")
+    con.execute("DROP TABLE _index_documents")
+
+
+def remove_items(con, item_ids: list[int]) -> None:
+    """Remove os itens informados do índice."""
+    for item_id in item_ids:
+        for table in POSTINGS_TABLES + ('search_documents',):
+            con.execute(f"DELETE FROM {table} WHERE item_id = ?", (item_id,))
+
+
+def merge_delta_if_needed() -> None:
+    """
+    Mescla a tabela delta na tabela principal, reescrevendo-a ordenada por
+    termo, quando a delta passa de `DELTA_MERGE_MIN_ROWS` linhas e de
+    `DELTA_MERGE_RATIO` da tabela principal. Deve ser chamado fora de uma
+    transação de escrita.
+    """
+    con = database.get_connection()
+    delta_rows = con.execute("SELECT count(*) FROM search_postings_delta").fetchone()[0]
+    if delta_rows < DELTA_MERGE_MIN_ROWS:
+        return
+    main_rows = con.execute("SELECT count(*) FROM search_postings").fetchone()[0]
+    if delta_rows >= main_rows * DELTA_MERGE_RATIO:
+        merge_delta()
+
+
+def merge_delta() -> None:
+    """Mescla incondicionalmente a tabela delta na tabela principal ordenada."""
+    with database.transaction() as con:
+        con.execute("""
+            CREATE OR REPLACE TABLE search_postings AS
+            SELECT term, item_id, tf, doc_length FROM (
+                SELECT term, item_id, tf, doc_length FROM search_postings
+                UNION ALL
+                SELECT term, item_id, tf, doc_length FROM search_postings_delta
+            ) ORDER BY term, item_id
+        """)
+        con.execute("DELETE FROM search_postings_delta")
+
+
+def needs_rebuild(con) -> bool:
+    """Indica se há itens na biblioteca, mas o índice ainda está vazio."""
+    has_items = con.execute("SELECT 1 FROM items LIMIT 1").fetchone()
+    has_documents = con.execute("SELECT 1 FROM search_documents LIMIT 1").fetchone()
+    return bool(has_items) and not has_documents
+
+
+def rebuild() -> None:
+    """Reconstrói o índice inteiro a partir das tabelas de itens."""
+    with database.transaction() as con:
+        for table in POSTINGS_TABLES + ('search_documents',):
+            con.execute(f"DELETE FROM {table}")
+        item_ids = [row[0] for row in con.execute("SELECT id FROM items").fetchall()]
+        index_items(con, item_ids)
+    merge_delta()
+
+
+def query_filters(query: str) -> list[list[tuple[str, tuple]]]:
+    """
+    Converte a consulta em grupos de filtros sobre `term`. Cada palavra
+    precisa casar com pelo menos um filtro do seu grupo; a última palavra
+    também casa por prefixo, para a busca enquanto o usuário digita.
+    """
+    raw_words = [word for word in tokenizer.words(query) if word not in tokenizer.STOPWORDS]
+    groups = [[("term = ?", (tokenizer.stem(word),))] for word in raw_words]
+    if raw_words and len(raw_words[-1]) >= MIN_PREFIX_LENGTH and not query[-1:].isspace():
+        prefix = raw_words[-1]
+        prefix_filter = ("term >= ? AND term < ?", (prefix, prefix + _MAX_CHAR))
+        if tokenizer.stem(prefix).startswith(prefix):
+            groups[-1] = [prefix_filter]
+        else:
+            groups[-1].append(prefix_filter)
+    return groups
+
+
+def search(query: str, limit: int | None = None, offset: int = 0) -> list[dict]:
+    """
+    Busca itens pelo índice invertido, ordenados por relevância (BM25).
+    Todas as palavras da consulta precisam estar presentes no item.
+    """
+    groups = query_filters(query)
+    if not groups:
+        return []
+
+    # Um filtro simples por ramo permite que os zone maps da tabela ordenada
+    # descartem os row groups que não contêm o termo.
+    branches = []
+    params = []
+    for index, group in enumerate(groups):
+        for condition, values in group:
+            for table in POSTINGS_TABLES:
+                branches.append(f"SELECT item_id, term, tf, doc_length, {index} AS grp FROM {table} WHERE {condition}")
+                params.extend(values)
+    params += [BM25_K1 + 1, BM25_K1 * (1 - BM25_B), BM25_K1 * BM25_B, len(groups)]
+
+    page_sql = ""
+    if limit is not None:
+        page_sql = "LIMIT ? OFFSET ?"
+        params += [limit, offset]
+    elif offset:
+        page_sql = "OFFSET ?"
+        params.append(offset)
+
+    con = database.get_connection()
+    rows = con.execute(f"""
+        WITH postings AS (
+            {" UNION ALL ".join(branches)}
+        ),
+        stats AS (
+            SELECT count(*)::DOUBLE AS n, greatest(coalesce(avg(length), 0), 1)::DOUBLE AS avgdl
+            FROM search_documents
+        ),
+        idf AS (
+            SELECT p.term, ln(1 + (any_value(stats.n) - count(*) + 0.5) / (count(*) + 0.5)) AS idf
+            FROM postings p CROSS JOIN stats GROUP BY p.term
+        ),
+        scored AS (
+            SELECT p.item_id,
+                   count(DISTINCT p.grp) AS matched_groups,
+                   sum(idf.idf * p.tf * ?::DOUBLE / (p.tf + ?::DOUBLE + ?::DOUBLE * p.doc_length / stats.avgdl)) AS score
+            FROM postings p
+            JOIN idf ON idf.term = p.term
+            CROSS JOIN stats
+            GROUP BY p.item_id
+        )
+        SELECT i.id, i.item_type, i.title
+        FROM scored s JOIN items i ON i.id = s.item_id
+        WHERE s.matched_groups = ?
+        ORDER BY s.score DESC, i.date_modified DESC, i.id
+        {page_sql}
+    """, params).fetchall()
+    return [{'id': row[0], 'item_type': row[1], 'title': row[2]} for row in rows]
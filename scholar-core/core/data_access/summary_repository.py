@@ -0,0 +1,79 @@
+# core/data_access/summary_repository.py
+"""
+Projeção materializada usada nas listagens de itens.
+
+A tabela `item_summary` guarda, para cada item, o título de exibição, o
+primeiro autor, o número de autores, o ano e as chaves de ordenação já
+normalizadas, evitando subconsultas correlacionadas por linha. Ela é mantida
+pelas mesmas transações que alteram os itens.
+"""
+
+from .. import database
+
+# Calcula o resumo dos itens em `_summary_ids` a partir das tabelas de origem
+_SUMMARY_SELECT = """
+    SELECT
+        i.id,
+        nullif(trim(i.title), ''),
+        lower(strip_accents(coalesce(i.title, ''))),
+        fa.first_author,
+        lower(strip_accents(coalesce(fa.first_author, ''))),
+        coalesce(fa.author_count, 0),
+        y.year
+    FROM items i
+    JOIN _summary_ids x ON x.item_id = i.id
+    LEFT JOIN (
+        SELECT ic.item_id, arg_min(c.last_name, ic.order_index) AS first_author, count(*) AS author_count
+        FROM item_creators ic
+        JOIN creators c ON c.id = ic.creator_id
+        JOIN _summary_ids x ON x.item_id = ic.item_id
+        WHERE ic.creator_type = 'author'
+        GROUP BY ic.item_id
+    ) fa ON fa.item_id = i.id
+    LEFT JOIN (
+        SELECT m.item_id,
+               arg_min(TRY_CAST(regexp_extract(m.value, '(\\d{4})', 1) AS INTEGER), m.field <> 'year') AS year
+        FROM metadata m
+        JOIN _summary_ids x ON x.item_id = m.item_id
+        WHERE m.field IN ('year', 'date')
+        GROUP BY m.item_id
+    ) y ON y.item_id = i.id
+"""
+
+
+def refresh_items(con, item_ids: list[int]) -> None:
+    """
+    Recalcula o resumo dos itens informados. Deve ser chamado dentro da
+    mesma transação que alterou os itens.
+    """
+    if not item_ids:
+        return
+
+    database.stage_rows(con, '_summary_ids', {'item_id': 'BIGINT'}, ((item_id,) for item_id in item_ids))
+    con.execute("DELETE FROM item_summary WHERE item_id IN (SELECT item_id FROM _summary_ids)")
+    con.execute(f"""
+        INSERT INTO item_summary (item_id, display_title, title_key, first_author, author_key, author_count, year)
+        {_SUMMARY_SELECT}
+    """)
+    con.execute("DROP TABLE _summary_ids")
+
+
+def remove_items(con, item_ids: list[int]) -> None:
+    """Remove o resumo dos itens informados."""
+    for item_id in item_ids:
+        con.execute("DELETE FROM item_summary WHERE item_id = ?", (item_id,))
+
+
+def needs_rebuild(con) -> bool:
+    """Indica se a projeção está dessincronizada da tabela de itens."""
+    items = con.execute("SELECT count(*) FROM items").fetchone()[0]
+    summaries = con.execute("SELECT count(*) FROM item_summary").fetchone()[0]
+    return items != summaries
+
+
+def rebuild() -> None:
+    """Reconstrói a projeção inteira a partir das tabelas de itens."""
+    with database.transaction() as con:
+        con.execute("DELETE FROM item_summary")
+        item_ids = [row[0] for row in con.execute("SELECT id FROM items").fetchall()]
+        refresh_items(con, item_ids)
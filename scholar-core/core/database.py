@@ -1,7 +1,15 @@
 # core/database.py
 import duckdb
+import itertools
+import json
 import os
+import re
 import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 
 # Determina o diretório base da aplicação
 if getattr(sys, 'frozen', False):
@@ -16,6 +24,18 @@ else:
 DATA_DIR = os.path.join(application_path, 'data')
 DB_FILE = os.path.join(DATA_DIR, 'library.duckdb')
 
+# Número de linhas serializadas por arquivo ao preparar cargas em lote
+STAGE_CHUNK_ROWS = 200_000
+
+# Acima deste número de IDs, filtros por conjunto usam uma tabela temporária
+INLINE_ID_LIMIT = 1000
+
+# Rastreamento de SQL (ver QueryTracer); os valores iniciais vêm do ambiente
+SQL_TRACE = os.environ.get("SCHOLAR_SQL_TRACE", "") not in ("", "0")
+SLOW_QUERY_MS = float(os.environ.get("SCHOLAR_SLOW_QUERY_MS", "100"))
+SQL_EXPLAIN = os.environ.get("SCHOLAR_SQL_EXPLAIN", "") not in ("", "0")
+SQL_REDACT = os.environ.get("SCHOLAR_SQL_REDACT", "") not in ("", "0")
+
 
 def initialize_database():
     """Cria o schema do banco de dados se ele não existir."""
@@ -25,7 +45,10 @@ def initialize_database():
         db_dir = os.path.dirname(DB_FILE)
         os.makedirs(db_dir, exist_ok=True)
 
-    con = duckdb.connect(DB_FILE)
+    # Reabre o handle compartilhado para que um banco recém-criado (ou um
+    # DB_FILE alterado, como nos testes) nunca reaproveite uma instância antiga.
+    manager.close()
+    con = manager.cursor()
 
     # Tabela principal para itens bibliográficos
     con.execute("""
@@ -54,9 +77,11 @@ def initialize_database():
     CREATE TABLE IF NOT EXISTS creators (
         id BIGINT PRIMARY KEY,
         first_name VARCHAR,
-        last_name VARCHAR
+        last_name VARCHAR,
+        name_key VARCHAR -- nome normalizado, ver creator_repository.name_key
     );
     """)
+    con.execute("ALTER TABLE creators ADD COLUMN IF NOT EXISTS name_key VARCHAR;")
 
     # Tabela de junção para itens e criadores
     con.execute("""
@@ -110,6 +135,20 @@ def initialize_database():
         FOREIGN KEY (collection_id) REFERENCES collections(id)
     );
     """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_item_collections_collection ON item_collections(collection_id);")
+
+    # Tabela de fechamento da hierarquia de coleções: um par (ancestral,
+    # descendente) para cada caminho, inclusive o da coleção com ela mesma
+    # (profundidade 0). É a fonte da hierarquia vigente, ver collection_repository.
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS collection_tree (
+        ancestor_id BIGINT,
+        descendant_id BIGINT,
+        depth INTEGER NOT NULL,
+        PRIMARY KEY (ancestor_id, descendant_id)
+    );
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_collection_tree_descendant ON collection_tree(descendant_id);")
 
     # Tabela para anexos
     con.execute("""
@@ -119,12 +158,618 @@ def initialize_database():
         path TEXT NOT NULL,
         mime_type VARCHAR,
         date_added TIMESTAMP DEFAULT current_timestamp,
+        content_hash VARCHAR,
         FOREIGN KEY (item_id) REFERENCES items(id)
     );
     """)
+    # Bibliotecas anteriores ao armazenamento por conteúdo não têm a coluna;
+    # seus anexos antigos continuam com content_hash nulo, fora da contagem
+    con.execute("ALTER TABLE attachments ADD COLUMN IF NOT EXISTS content_hash VARCHAR;")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_attachments_content_hash ON attachments(content_hash);")
+
+    # Índice invertido da busca textual (títulos, metadados e criadores).
+    # `search_postings` é mantida ordenada por termo, para que os zone maps
+    # do DuckDB descartem quase todos os row groups em uma consulta; as
+    # escritas incrementais vão para `search_postings_delta`, que é mesclada
+    # na tabela principal quando cresce demais.
+    for postings_table in ('search_postings', 'search_postings_delta'):
+        con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {postings_table} (
+            term VARCHAR NOT NULL,
+            item_id BIGINT NOT NULL,
+            tf INTEGER NOT NULL, -- frequência do termo, com peso extra para o título
+            doc_length INTEGER NOT NULL -- repetido aqui para evitar um join no BM25
+        );
+        """)
+
+    # Tamanho (em termos) de cada documento indexado, usado pelo BM25
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS search_documents (
+        item_id BIGINT PRIMARY KEY,
+        length INTEGER NOT NULL
+    );
+    """)
+
+    # Resumo materializado de cada item, usado nas listagens e ordenações
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS item_summary (
+        item_id BIGINT PRIMARY KEY,
+        display_title TEXT,
+        title_key VARCHAR NOT NULL,
+        first_author VARCHAR,
+        author_key VARCHAR NOT NULL,
+        author_count INTEGER NOT NULL,
+        year INTEGER
+    );
+    """)
+
+    # Cache persistente das respostas do Crossref, por DOI normalizado
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS crossref_cache (
+        doi VARCHAR PRIMARY KEY,
+        status INTEGER NOT NULL, -- 200 ou 404 (DOI inexistente)
+        body TEXT, -- JSON da mensagem do Crossref
+        etag VARCHAR,
+        last_modified VARCHAR,
+        fetched_at TIMESTAMP NOT NULL -- UTC
+    );
+    """)
+
+    # Estado persistido pelos plugins (chave-valor por plugin)
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS plugin_state (
+        plugin VARCHAR NOT NULL,
+        key VARCHAR NOT NULL,
+        value VARCHAR,
+        updated_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (plugin, key)
+    );
+    """)
+
+    # Texto completo extraído dos PDFs anexados, um por conteúdo (hash), para
+    # que cada conteúdo seja extraído uma única vez. `text_id` é a chave
+    # compacta usada nas postagens por página da busca por conteúdo.
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS attachment_texts (
+        content_hash VARCHAR PRIMARY KEY,
+        text_id BIGINT NOT NULL,
+        extractor_version INTEGER NOT NULL,
+        page_count INTEGER,
+        text BLOB, -- páginas separadas por \f, comprimidas com zlib
+        error VARCHAR, -- preenchido quando a extração falhou (não é repetida)
+        extracted_at TIMESTAMP DEFAULT current_timestamp
+    );
+    """)
+    for postings_table in ('fulltext_postings', 'fulltext_postings_delta'):
+        con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {postings_table} (
+            term VARCHAR NOT NULL,
+            text_id BIGINT NOT NULL,
+            page INTEGER NOT NULL,
+            tf INTEGER NOT NULL
+        );
+        """)
+
+    # Bibliotecas criadas antes do índice textual, do resumo materializado ou
+    # da tabela de hierarquia das coleções são processadas uma única vez
+    from .data_access import collection_repository, creator_repository, search_repository, summary_repository
+    # O DuckDB não permite atualizar uma coluna indexada de uma tabela
+    # referenciada por chave estrangeira, então a chave de nome dos criadores
+    # antigos é preenchida antes de o índice ser criado
+    creator_repository.backfill_name_keys(con)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_creators_name_key ON creators(name_key);")
+    if search_repository.needs_rebuild(con):
+        search_repository.rebuild()
+    if summary_repository.needs_rebuild(con):
+        summary_repository.rebuild()
+    if collection_repository.needs_rebuild(con):
+        collection_repository.rebuild()
+
+
+# Instruções que devolvem o número de linhas afetadas em vez de linhas
+_WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class QueryTracer:
+    """
+    Rastreamento das instruções SQL enviadas pelos repositórios.
+
+    Quando ativo, cada `execute`/`executemany` feito por uma conexão de
+    `get_connection()` ou `transaction()` é registrado com a função do
+    repositório que o chamou, os parâmetros (ou só os seus tipos, com
+    `redact_parameters`), o tempo de parede da execução e o número de
+    linhas. O resultado continua sendo lido do cursor pelo chamador, no
+    ritmo dele: as linhas são contadas à medida que ele as lê (nas escritas,
+    vale a contagem de linhas afetadas devolvida pelo DuckDB). As
+    estatísticas são agregadas por forma da consulta: literais numéricos e
+    de texto viram `?`, então as listas de IDs montadas por `id_set_sql`
+    caem na mesma entrada.
+
+    Instruções acima de `slow_query_ms` são impressas e guardadas em
+    `slow_queries`. Com `explain_slow`, o resultado de uma instrução lenta é
+    lido por inteiro antes de ser entregue (para liberar o cursor), e as
+    consultas de leitura são repetidas com `EXPLAIN ANALYZE` (as demais, só
+    com `EXPLAIN`, para não aplicá-las duas vezes); o plano acompanha o
+    registro.
+
+    Desativado, o custo é uma verificação de atributo por instrução.
+    """
+
+    def __init__(self, enabled: bool = False, slow_query_ms: float = 100.0, explain_slow: bool = False,
+                 redact_parameters: bool = False, history: int = 1000):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.explain_slow = explain_slow
+        self.redact_parameters = redact_parameters
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._types = {}
+        self.recent = deque(maxlen=history)
+        self.slow_queries = deque(maxlen=100)
+
+    def configure(self, **settings) -> None:
+        """Altera `enabled`, `slow_query_ms`, `explain_slow` ou `redact_parameters`."""
+        for name, value in settings.items():
+            if name not in ('enabled', 'slow_query_ms', 'explain_slow', 'redact_parameters'):
+                raise ValueError(f"Opção de rastreamento desconhecida: {name}")
+            setattr(self, name, value)
+
+    def reset(self) -> None:
+        """Descarta as estatísticas e os registros acumulados."""
+        with self._lock:
+            self._stats.clear()
+            self._types.clear()
+            self.recent.clear()
+            self.slow_queries.clear()
+
+    def stats(self) -> list[dict]:
+        """
+        Estatísticas por forma de consulta, da que consumiu mais tempo no total
+        para a que consumiu menos: {'query', 'calls', 'rows', 'total_ms',
+        'mean_ms', 'max_ms', 'functions'}.
+        """
+        with self._lock:
+            entries = [dict(entry, functions=sorted(entry['functions'])) for entry in self._stats.values()]
+        for entry in entries:
+            entry['mean_ms'] = entry['total_ms'] / entry['calls']
+        return sorted(entries, key=lambda entry: entry['total_ms'], reverse=True)
+
+    def format_stats(self, limit: int = 20) -> str:
+        """Tabela de texto com as consultas que mais consumiram tempo."""
+        lines = [f"{'total ms':>10}{'chamadas':>10}{'média ms':>10}{'máx ms':>10}{'linhas':>10}  consulta"]
+        for entry in self.stats()[:limit]:
+            lines.append(f"{entry['total_ms']:>10.1f}{entry['calls']:>10}{entry['mean_ms']:>10.2f}"
+                         f"{entry['max_ms']:>10.2f}{entry['rows']:>10}  {', '.join(entry['functions'])}: {entry['query'][:120]}")
+        return "\n".join(lines)
+
+    def execute(self, cursor, query: str, parameters=None, many: bool = False):
+        """Executa a instrução no cursor, registrando-a; retorna o resultado, que conta as linhas lidas."""
+        caller = _caller_name()
+        if many and not isinstance(parameters, list):
+            parameters = list(parameters)
+        shape = _query_shape(query)
+        statement_type = self._statement_type(cursor, query, shape)
+        start = time.perf_counter()
+        if many:
+            cursor.executemany(query, parameters)
+        elif parameters is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query, parameters)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        description = cursor.description
+
+        # Escritas devolvem uma única linha com o número de linhas afetadas:
+        # ela é lida aqui e entregue ao chamador pelo resultado
+        buffered = None
+        row_count = 0
+        if statement_type in _WRITE_STATEMENTS and description and description[0][0] == 'Count':
+            buffered = cursor.fetchall()
+            row_count = buffered[0][0] if buffered else 0
+
+        record = {
+            'query': query,
+            'function': caller,
+            'parameters': self._describe_parameters(parameters, many),
+            'rows': row_count,
+            'ms': elapsed_ms,
+        }
+        with self._lock:
+            entry = self._stats.get(shape)
+            if entry is None:
+                entry = self._stats[shape] = {'query': shape, 'calls': 0, 'rows': 0, 'total_ms': 0.0,
+                                              'max_ms': 0.0, 'functions': set()}
+            entry['calls'] += 1
+            entry['rows'] += row_count
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['functions'].add(caller)
+            self.recent.append(record)
+
+        if elapsed_ms >= self.slow_query_ms:
+            if self.explain_slow and not many:
+                if buffered is None and description:
+                    buffered = cursor.fetchall()
+                    self._add_rows(shape, record, len(buffered))
+                record['plan'] = self._explain(cursor, query, parameters, statement_type)
+            with self._lock:
+                self.slow_queries.append(record)
+            rows_text = f", {record['rows']} linhas" if buffered is not None else ""
+            print(f"SQL lento: {elapsed_ms:.1f} ms{rows_text}, em {caller}: {shape[:200]}"
+                  f" parâmetros={repr(record['parameters'])[:300]}")
+            if record.get('plan'):
+                print(record['plan'])
+        return _TracedResult(self, cursor, description, shape, record, buffered)
+
+    def _add_rows(self, shape: str, record: dict, count: int) -> None:
+        """Soma linhas lidas de um resultado ao registro e às estatísticas da sua forma."""
+        with self._lock:
+            record['rows'] += count
+            entry = self._stats.get(shape)
+            if entry is not None:
+                entry['rows'] += count
+
+    def _statement_type(self, cursor, query: str, shape: str) -> str:
+        """Tipo da instrução segundo o parser do DuckDB (SELECT, INSERT, DELETE, ...), guardado por forma."""
+        with self._lock:
+            statement_type = self._types.get(shape)
+        if statement_type is None:
+            try:
+                statements = cursor.extract_statements(query)
+                statement_type = statements[-1].type.name if statements else ''
+            except Exception:
+                statement_type = ''
+            with self._lock:
+                self._types[shape] = statement_type
+        return statement_type
+
+    def _describe_parameters(self, parameters, many: bool):
+        if parameters is None:
+            return None
+        if many:
+            sample = self._describe_parameters(parameters[0], False) if parameters else None
+            return {'sets': len(parameters), 'first': sample}
+        if isinstance(parameters, dict):
+            return {name: self._describe_value(value) for name, value in parameters.items()}
+        return [self._describe_value(value) for value in parameters]
+
+    def _describe_value(self, value):
+        if self.redact_parameters:
+            return type(value).__name__
+        if isinstance(value, str) and len(value) > 200:
+            return value[:200] + '...'
+        return value
+
+    @staticmethod
+    def _explain(cursor, query: str, parameters, statement_type: str) -> str:
+        # Só consultas de leitura podem ser executadas de novo sem efeitos
+        # (um WITH ... DELETE tem o tipo DELETE, não o da primeira palavra)
+        explain = "EXPLAIN ANALYZE" if statement_type == 'SELECT' else "EXPLAIN"
+        try:
+            if parameters is None:
+                plan_rows = cursor.execute(f"{explain} {query}").fetchall()
+            else:
+                plan_rows = cursor.execute(f"{explain} {query}", parameters).fetchall()
+        except Exception as e:
+            return f"(plano indisponível: {e})"
+        return "\n".join(str(row[-1]) for row in plan_rows)
+
+
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def _query_shape(query: str) -> str:
+    """Texto da consulta em uma linha, com literais trocados por `?` e listas de valores por `(?...)`."""
+    shape = _STRING_LITERAL.sub("?", query)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _VALUE_LIST.sub("(?...)", shape)
+    return " ".join(shape.split())
+
+def _caller_name() -> str:
+    """Função (módulo.função) fora deste módulo que originou a instrução."""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_globals.get('__name__') in (__name__, 'contextlib'):
+        frame = frame.f_back
+    if frame is None:
+        return '?'
+    module = frame.f_globals.get('__name__', '?').rsplit('.', 1)[-1]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+class _TracedResult:
+    """
+    Resultado de uma instrução rastreada. A leitura é repassada ao cursor e
+    as linhas entregues são somadas ao registro. `buffered` são linhas que o
+    rastreador já leu e contou (a contagem das escritas ou, com
+    `explain_slow`, o resultado de uma instrução lenta), entregues no lugar
+    do cursor.
+    """
+
+    def __init__(self, tracer, cursor, description, shape, record, buffered=None):
+        self._tracer = tracer
+        self._cursor = cursor
+        self.description = description
+        self._shape = shape
+        self._record = record
+        self._buffered = buffered
+
+    def _read(self, rows):
+        if rows:
+            self._tracer._add_rows(self._shape, self._record, len(rows))
+        return rows
+
+    def fetchone(self):
+        if self._buffered is not None:
+            return self._buffered.pop(0) if self._buffered else None
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._read([row])
+        return row
+
+    def fetchmany(self, size: int = 1):
+        if self._buffered is not None:
+            rows, self._buffered[:size] = self._buffered[:size], []
+            return rows
+        return self._read(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        if self._buffered is not None:
+            rows, self._buffered = self._buffered, []
+            return rows
+        return self._read(self._cursor.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# Instância global única do rastreador de SQL
+tracer = QueryTracer(SQL_TRACE, SLOW_QUERY_MS, SQL_EXPLAIN, SQL_REDACT)
+
+
+class _PooledConnection:
+    """
+    Envolve o cursor da thread atual expondo a mesma interface de uma conexão
+    DuckDB. O `close()` apenas devolve o cursor ao gerenciador, permitindo que
+    os repositórios continuem chamando `con.close()` sem derrubar o handle.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def close(self):
+        pass
+
+    def execute(self, query, parameters=None):
+        if tracer.enabled:
+            return tracer.execute(self._cursor, query, parameters)
+        return self._cursor.execute(query, parameters)
+
+    def executemany(self, query, parameters=None):
+        if tracer.enabled:
+            return tracer.execute(self._cursor, query, parameters, many=True)
+        return self._cursor.executemany(query, parameters)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class ConnectionManager:
+    """
+    Mantém um único handle DuckDB por processo e um cursor por thread.
+
+    O DuckDB permite que vários cursores do mesmo banco sejam usados em
+    paralelo, desde que cada cursor fique em uma única thread. Assim a thread
+    principal do Kivy e as threads de plugins compartilham o mesmo banco sem
+    pagar o custo de abrir o arquivo a cada operação.
+
+    O handle é exclusivo do processo: enquanto está aberto, o DuckDB mantém
+    a trava do arquivo da biblioteca e nenhum outro processo consegue abri-la
+    (a abertura falha com `duckdb.IOException`). Processos que usam o banco
+    só de vez em quando, como o host de mensagens nativas, devem trabalhar
+    dentro de `session()` ou chamar `release()` ao terminar; o handle é
+    reaberto sob demanda no próximo `cursor()`, com uma nova geração.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._root = None
+        self._path = None
+        self._generation = 0
+        self._local = threading.local()
+        # Transações abertas em todas as threads e sessões ativas: o handle
+        # só é liberado quando não há nenhuma
+        self._active_transactions = 0
+        self._sessions = 0
+        self._release_pending = False
+
+    def _ensure_open(self):
+        path = str(DB_FILE)
+        with self._lock:
+            if self._root is None or self._path != path:
+                self._close_locked()
+                self._root = duckdb.connect(path)
+                self._path = path
+                self._generation += 1
+            return self._root, self._generation
+
+    @property
+    def generation(self) -> int:
+        """Contador incrementado a cada vez que o banco é (re)aberto."""
+        return self._generation
+
+    def cursor(self):
+        """Retorna o cursor da thread atual, criando-o se necessário."""
+        root, generation = self._ensure_open()
+        local = self._local
+        if getattr(local, 'generation', None) != generation:
+            with self._lock:
+                local.cursor = root.cursor()
+            local.generation = generation
+            local.depth = 0
+        return local.cursor
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unidade de trabalho: executa o bloco em uma única transação no cursor
+        da thread atual. Transações aninhadas se juntam à transação externa.
+        """
+        cursor = self.cursor()
+        local = self._local
+        if local.depth:
+            local.depth += 1
+            try:
+                yield _PooledConnection(cursor)
+            finally:
+                local.depth -= 1
+            return
+
+        with self._lock:
+            self._active_transactions += 1
+        try:
+            cursor.execute("BEGIN TRANSACTION")
+            local.depth = 1
+            try:
+                yield _PooledConnection(cursor)
+            except BaseException:
+                local.depth = 0
+                cursor.execute("ROLLBACK")
+                raise
+            local.depth = 0
+            # O custo da gravação aparece no COMMIT, que também entra no rastreamento
+            _PooledConnection(cursor).execute("COMMIT")
+        finally:
+            with self._lock:
+                self._active_transactions -= 1
+                if self._release_pending and not self._active_transactions and not self._sessions:
+                    self._close_locked()
+
+    def release(self):
+        """
+        Libera o arquivo da biblioteca para outros processos fechando o
+        handle, que será reaberto no próximo `cursor()`. Se houver transações
+        abertas ou sessões ativas, o fechamento fica para quando a última
+        terminar. Cursores obtidos antes da liberação deixam de valer.
+        """
+        with self._lock:
+            if self._active_transactions or self._sessions:
+                self._release_pending = True
+            else:
+                self._close_locked()
+
+    @contextmanager
+    def session(self):
+        """
+        Bloco de trabalho ao fim do qual o handle é liberado (ver `release`).
+        Sessões aninhadas ou simultâneas liberam só quando a última termina.
+        """
+        with self._lock:
+            self._sessions += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._sessions -= 1
+                if not self._sessions:
+                    self.release()
+
+    def close(self):
+        """Fecha o handle compartilhado (e, com ele, todos os cursores)."""
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self):
+        self._release_pending = False
+        if self._root is not None:
+            self._root.close()
+            self._root = None
+            self._path = None
+
+
+# Instância global única do gerenciador de conexões
+manager = ConnectionManager()
 
-    con.close()
 
 def get_connection():
-    """Retorna uma conexão com o banco de dados."""
-    return duckdb.connect(str(DB_FILE))
+    """Retorna uma conexão (cursor da thread atual) com o banco de dados."""
+    return _PooledConnection(manager.cursor())
+
+
+def transaction():
+    """Abre uma unidade de trabalho transacional no banco de dados."""
+    return manager.transaction()
+
+
+def close_connection():
+    """Fecha o handle compartilhado do banco de dados."""
+    manager.close()
+
+
+def release_connection():
+    """
+    Libera o arquivo da biblioteca para outros processos assim que não houver
+    transações em andamento; o banco é reaberto no próximo uso.
+    """
+    manager.release()
+
+
+def session():
+    """Bloco de trabalho que libera o arquivo da biblioteca ao terminar."""
+    return manager.session()
+
+
+def stage_rows(con, table_name: str, columns: dict, rows) -> None:
+    """
+    Cria uma tabela temporária `table_name` com as colunas informadas
+    ({nome: tipo SQL}) e a preenche com `rows` (tuplas na mesma ordem).
+
+    Vincular listas Python como parâmetros (ou usar `executemany`) custa
+    cerca de um milissegundo por linha no DuckDB; serializar cada bloco de
+    linhas com uma única chamada a `json.dumps` e lê-lo com `read_json` é
+    ordens de grandeza mais rápido, então este é o caminho de carga em lote
+    dos repositórios.
+    """
+    column_defs = ", ".join(f"{name} {sql_type}" for name, sql_type in columns.items())
+    con.execute(f"CREATE OR REPLACE TEMP TABLE {table_name} ({column_defs})")
+
+    select_list = ", ".join(
+        f"j[{position}]::{sql_type}" for position, sql_type in enumerate(columns.values(), start=1)
+    )
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, STAGE_CHUNK_ROWS))
+        if not chunk:
+            break
+        fd, path = tempfile.mkstemp(suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(chunk, ensure_ascii=False))
+            con.execute(
+                f"INSERT INTO {table_name} SELECT {select_list} "
+                f"FROM read_json(?, format = 'array', records = false, columns = {{'j': 'VARCHAR[]'}})",
+                (path,)
+            )
+        finally:
+            os.remove(path)
+
+
+def id_set_sql(con, ids, table_name: str = '_id_set') -> str:
+    """
+    Retorna uma expressão SQL para usar em `IN ...` com os IDs informados.
+    Conjuntos pequenos viram uma lista literal de inteiros; conjuntos grandes
+    são carregados em uma tabela temporária com `stage_rows`.
+    """
+    ids = [int(item_id) for item_id in ids]
+    if not ids:
+        return "(NULL)"
+    if len(ids) <= INLINE_ID_LIMIT:
+        return "(" + ", ".join(map(str, ids)) + ")"
+    stage_rows(con, table_name, {'id': 'BIGINT'}, ((item_id,) for item_id in ids))
+    return f"(SELECT id FROM {table_name})"
@@ -0,0 +1,108 @@
+# core/file_store.py
+"""
+Armazenamento de arquivos endereçado por conteúdo.
+
+Cada conteúdo é guardado uma única vez em `blobs/<hh>/<hash>/`, onde
+`<hash>` é o SHA-256 do arquivo. Dentro desse diretório, cada nome com que o
+conteúdo foi anexado é um hardlink para o mesmo arquivo, então anexar de
+novo um conteúdo já guardado não copia nenhum byte.
+
+Conteúdo novo é clonado com reflink quando o sistema de arquivos permite
+(Btrfs, XFS, ...) e, caso contrário, copiado em blocos. O arquivo de origem
+nunca é ligado por hardlink: uma edição posterior feita pelo usuário
+alteraria silenciosamente o anexo guardado.
+
+Este módulo depende apenas da biblioteca padrão; a contagem de referências
+fica na tabela `attachments` (coluna `content_hash`).
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+
+BLOBS_DIR = "blobs"
+_BLOCK_SIZE = 1 << 20
+# ioctl FICLONE do Linux: cria um clone copy-on-write do arquivo inteiro
+_FICLONE = 0x40049409
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def content_hash(file_path_str: str) -> str:
+    """Hash SHA-256 do conteúdo do arquivo, lido em blocos."""
+    digest = hashlib.sha256()
+    with open(file_path_str, 'rb') as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def blob_dir(storage_dir: str, digest: str) -> Path:
+    """Diretório que guarda o conteúdo com o hash informado."""
+    return Path(storage_dir) / BLOBS_DIR / digest[:2] / digest
+
+
+def _reflink(source: Path, destination: Path) -> bool:
+    """Tenta clonar `source` em `destination` sem copiar dados; retorna False se não for possível."""
+    if fcntl is None:
+        return False
+    try:
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+    except OSError:
+        destination.unlink(missing_ok=True)
+        return False
+
+
+def _copy(source: Path, destination: Path) -> None:
+    """Copia em blocos de tamanho fixo."""
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        shutil.copyfileobj(src, dst, _BLOCK_SIZE)
+
+
+def _existing_copy(directory: Path) -> Path | None:
+    """Um arquivo já guardado no diretório do conteúdo, se houver."""
+    if not directory.is_dir():
+        return None
+    return next((path for path in directory.iterdir() if not path.name.startswith('.')), None)
+
+
+def store(storage_dir: str, source_path_str: str, digest: str | None = None, name: str | None = None) -> str:
+    """
+    Guarda o arquivo (se o conteúdo ainda não estiver no armazenamento) com o
+    nome `name` (padrão: o nome do arquivo de origem) e retorna seu caminho
+    relativo a `storage_dir`. `digest` evita recalcular um hash já conhecido.
+    """
+    source = Path(source_path_str)
+    digest = digest or content_hash(source_path_str)
+    name = name or source.name
+    directory = blob_dir(storage_dir, digest)
+    target = directory / name
+    relative_path = os.path.relpath(target, storage_dir)
+    if target.exists():
+        return relative_path
+
+    directory.mkdir(parents=True, exist_ok=True)
+    # Grava com um nome temporário e renomeia, para nunca expor um arquivo incompleto
+    temp = directory / f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    existing = _existing_copy(directory)
+    if existing is not None:
+        try:
+            os.link(existing, temp)
+        except OSError:
+            _copy(existing, temp)
+    elif not _reflink(source, temp):
+        _copy(source, temp)
+    os.replace(temp, target)
+    return relative_path
+
+
+def remove(storage_dir: str, digest: str) -> None:
+    """Remove o conteúdo e todos os seus nomes do armazenamento."""
+    shutil.rmtree(blob_dir(storage_dir, digest), ignore_errors=True)
@@ -0,0 +1,91 @@
+# core/id_allocator.py
+"""
+Alocação central de chaves primárias.
+
+Os IDs continuam sendo inteiros de 64 bits derivados do relógio em
+microssegundos (compatíveis com os já gravados), mas cada ID entregue é
+estritamente maior que o anterior: se o relógio não avançou (várias threads
+no mesmo microssegundo, laços de inserção em lote) ou voltou, a sequência
+continua a partir do último ID. Lotes reservam um intervalo contíguo com
+uma única operação, então alocar milhões de IDs custa o mesmo que alocar um.
+
+Entre processos, a sequência parte do maior ID já gravado no banco. O
+DuckDB só permite que um processo por vez abra o arquivo da biblioteca: o
+host de mensagens nativas o abre apenas durante cada lote e o libera em
+seguida, e enquanto a GUI o mantém aberto as gravações do host falham.
+Como o outro processo pode ter gravado IDs nesse intervalo (inclusive "no
+futuro", se o relógio dele estava adiantado), o piso é relido a cada vez
+que o banco é reaberto.
+"""
+
+import threading
+import time
+from typing import Callable
+
+# Tabelas cujas chaves primárias vêm do alocador
+ID_TABLES = ('items', 'creators', 'tags', 'collections', 'attachments')
+_UNSEEDED = object()
+
+
+def stored_high_water_mark() -> int:
+    """Maior ID gravado nas tabelas cujas chaves vêm do alocador."""
+    from . import database
+
+    con = database.get_connection()
+    union_sql = " UNION ALL ".join(f"SELECT max(id) FROM {table}" for table in ID_TABLES)
+    return con.execute(f"SELECT coalesce(max(m), 0) FROM ({union_sql}) AS t(m)").fetchone()[0]
+
+
+def library_generation() -> int:
+    """Geração da conexão com a biblioteca, abrindo-a se necessário."""
+    from . import database
+
+    database.get_connection()
+    return database.manager.generation
+
+
+class IdAllocator:
+    """Distribui IDs únicos e monotônicos, seguro entre threads."""
+
+    def __init__(self, floor_source: Callable[[], int] | None = None,
+                 generation_source: Callable[[], object] | None = None):
+        self._lock = threading.Lock()
+        self._last = 0
+        # O piso é consultado na primeira alocação e de novo sempre que
+        # `generation_source` muda (sem ela, uma única vez)
+        self._floor_source = floor_source
+        self._generation_source = generation_source
+        self._seeded_generation = _UNSEEDED
+
+    def reserve(self, count: int) -> int:
+        """Reserva `count` IDs consecutivos e retorna o primeiro deles."""
+        if count < 1:
+            raise ValueError("É preciso reservar ao menos um ID.")
+        with self._lock:
+            if self._floor_source is not None:
+                generation = self._generation_source() if self._generation_source else None
+                if generation != self._seeded_generation:
+                    # Só marca como lido depois do sucesso: uma falha é repetida na próxima reserva
+                    self._last = max(self._last, self._floor_source())
+                    self._seeded_generation = generation
+            start = max(time.time_ns() // 1000, self._last + 1)
+            self._last = start + count - 1
+        return start
+
+    def next_id(self) -> int:
+        """Retorna um único ID novo."""
+        return self.reserve(1)
+
+
+# Instância global única do alocador
+allocator = IdAllocator(stored_high_water_mark, library_generation)
+
+
+def next_id() -> int:
+    """Retorna um ID novo do alocador global."""
+    return allocator.next_id()
+
+
+def reserve(count: int) -> int:
+    """Reserva `count` IDs consecutivos no alocador global e retorna o primeiro."""
+    return allocator.reserve(count)
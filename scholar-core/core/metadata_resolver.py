@@ -0,0 +1,151 @@
+# core/metadata_resolver.py
+"""
+Resolução de metadados de DOIs pelo Crossref.
+
+Todas as consultas passam por uma única sessão HTTP com pool de conexões e
+por um cache persistente (tabela `crossref_cache` do DuckDB) com validade
+configurável. Entradas vencidas são revalidadas com requisições condicionais
+(ETag / Last-Modified), DOIs inexistentes também ficam em cache por um
+período menor, e consultas simultâneas ao mesmo DOI são feitas uma única vez.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import database
+
+DEFAULT_BASE_URL = os.environ.get("SCHOLAR_CROSSREF_URL", "https://api.crossref.org")
+DEFAULT_TTL = timedelta(days=30)
+NOT_FOUND_TTL = timedelta(days=1)
+REQUEST_TIMEOUT = 10
+POOL_SIZE = 16
+USER_AGENT = "ScholarCore/1.0 (metadata resolver)"
+
+
+def normalize_doi(doi: str) -> str:
+    """Remove prefixos de URL/`doi:` e converte para minúsculas (DOIs não diferenciam maiúsculas)."""
+    doi = doi.strip()
+    for prefix in ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/", "doi:"):
+        if doi.lower().startswith(prefix):
+            doi = doi[len(prefix):]
+            break
+    return doi.strip().lower()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class CrossrefResolver:
+    """Cliente do Crossref com sessão compartilhada e cache persistente."""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, ttl: timedelta = DEFAULT_TTL,
+                 not_found_ttl: timedelta = NOT_FOUND_TTL, timeout: float = REQUEST_TIMEOUT):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+
+    def resolve(self, doi: str) -> dict | None:
+        """
+        Retorna a mensagem do Crossref para o DOI, ou None se ele não existir
+        ou não puder ser consultado. Usa o cache sempre que possível.
+        """
+        key = normalize_doi(doi)
+        if not key:
+            return None
+
+        # Consultas simultâneas ao mesmo DOI esperam pela primeira
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            message = self._resolve_uncoalesced(key)
+            future.set_result(message)
+            return message
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _resolve_uncoalesced(self, key: str) -> dict | None:
+        con = database.get_connection()
+        cached = con.execute(
+            "SELECT status, body, etag, last_modified, fetched_at FROM crossref_cache WHERE doi = ?", (key,)
+        ).fetchone()
+
+        if cached:
+            status, body, etag, last_modified, fetched_at = cached
+            ttl = self.ttl if status == 200 else self.not_found_ttl
+            if _utcnow() - fetched_at < ttl:
+                return json.loads(body) if body else None
+
+        headers = {}
+        if cached and cached[0] == 200:
+            if cached[2]:
+                headers['If-None-Match'] = cached[2]
+            if cached[3]:
+                headers['If-Modified-Since'] = cached[3]
+
+        try:
+            response = self.session.get(f"{self.base_url}/works/{quote(key, safe='/:;()')}",
+                                        headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            # Sem rede, uma entrada vencida ainda é melhor do que nada
+            return json.loads(cached[1]) if cached and cached[1] else None
+
+        if response.status_code == 304 and cached:
+            con.execute("UPDATE crossref_cache SET fetched_at = ? WHERE doi = ?", (_utcnow(), key))
+            return json.loads(cached[1]) if cached[1] else None
+        if response.status_code == 404:
+            self._store(con, key, 404, None, None, None)
+            return None
+        if response.status_code != 200:
+            return json.loads(cached[1]) if cached and cached[1] else None
+
+        try:
+            message = response.json()['message']
+        except (ValueError, KeyError):
+            return None
+        self._store(con, key, 200, json.dumps(message),
+                    response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return message
+
+    def _store(self, con, key: str, status: int, body: str | None, etag: str | None, last_modified: str | None) -> None:
+        con.execute("""
+            INSERT INTO crossref_cache (doi, status, body, etag, last_modified, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (doi) DO UPDATE SET
+                status = excluded.status, body = excluded.body, etag = excluded.etag,
+                last_modified = excluded.last_modified, fetched_at = excluded.fetched_at
+        """, (key, status, body, etag, last_modified, _utcnow()))
+
+
+# Instância global única do resolvedor
+resolver = CrossrefResolver()
+
+
+def resolve(doi: str) -> dict | None:
+    """Resolve um DOI com o resolvedor global."""
+    return resolver.resolve(doi)
@@ -14,6 +14,7 @@ class Collection:
     id: int
     name: str
     parent_id: Optional[int]
+    child_count: int = 0
 
 @dataclass
 class Tag:
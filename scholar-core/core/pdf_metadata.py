@@ -0,0 +1,196 @@
+# core/pdf_metadata.py
+"""
+Extração de metadados e identificadores (DOI, arXiv, ISBN) de arquivos PDF.
+
+Este módulo depende apenas do PyPDF2 (e do `file_store` e do `pdf_text`,
+que também não usam o banco) e não toca no banco de dados nem nos plugins,
+para que possa ser importado pelos processos de trabalho da importação em
+lote.
+
+Os identificadores são procurados primeiro nos metadados do documento
+(dicionário de informações e XMP) e, só se faltar algum, no texto de uma
+janela limitada de páginas do início e do fim, de modo que o custo não
+cresce com o tamanho do documento. Os resultados podem ser guardados em um
+cache em disco indexado pelo hash do conteúdo do arquivo.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+
+from PyPDF2 import PdfReader
+
+from .file_store import content_hash
+
+# Versão do formato do resultado; entradas de cache de outras versões são ignoradas
+EXTRACTOR_VERSION = 1
+HEAD_PAGES = 3
+TAIL_PAGES = 2
+
+DOI_RE = re.compile(r'10\.\d{4,9}/[-._;()/:A-Z0-9]+', re.IGNORECASE)
+ARXIV_RE = re.compile(
+    r'(?:arXiv:\s*|arxiv\.org/(?:abs|pdf)/)'
+    r'(\d{4}\.\d{4,5}|[a-z][a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v(\d+))?',
+    re.IGNORECASE
+)
+ISBN_RE = re.compile(r'ISBN(?:-1[03])?:?\s*((?:[0-9][-\s]?){12}[0-9]|(?:[0-9][-\s]?){9}[0-9X])', re.IGNORECASE)
+
+IDENTIFIER_FIELDS = ('doi', 'arxiv_id', 'isbn')
+
+
+def _valid_isbn(digits: str) -> bool:
+    """Confere o dígito verificador de um ISBN-10 ou ISBN-13."""
+    if len(digits) == 10:
+        total = sum((10 - i) * (10 if ch == 'X' else int(ch)) for i, ch in enumerate(digits))
+        return total % 11 == 0
+    if len(digits) == 13 and digits.isdigit():
+        total = sum((1 if i % 2 == 0 else 3) * int(ch) for i, ch in enumerate(digits))
+        return total % 10 == 0
+    return False
+
+
+def find_identifiers(text: str) -> dict:
+    """Procura DOI, identificador do arXiv (com versão) e ISBN em um texto."""
+    found = {}
+    match = DOI_RE.search(text)
+    if match:
+        doi = match.group(0).rstrip('.;,')
+        # Um ')' final só faz parte do DOI se fechar um '(' do próprio DOI
+        if doi.endswith(')') and doi.count('(') < doi.count(')'):
+            doi = doi[:-1]
+        found['doi'] = doi
+    match = ARXIV_RE.search(text)
+    if match:
+        found['arxiv_id'] = match.group(1)
+        if match.group(2):
+            found['arxiv_version'] = int(match.group(2))
+    for match in ISBN_RE.finditer(text):
+        digits = re.sub(r'[-\s]', '', match.group(1)).upper()
+        # Um ISBN-10 seguido de outros números pode ter sido lido como ISBN-13
+        isbn = next((candidate for candidate in (digits, digits[:10]) if _valid_isbn(candidate)), None)
+        if isbn:
+            found['isbn'] = isbn
+            break
+    return found
+
+
+def _merge(result: dict, found: dict) -> None:
+    """Completa `result` com os identificadores ainda ausentes."""
+    for key, value in found.items():
+        if result.get(key) is None:
+            result[key] = value
+
+
+def _metadata_text(reader: PdfReader) -> str:
+    """Concatena os valores textuais do dicionário de informações e o XMP bruto."""
+    parts = []
+    info = reader.metadata
+    if info:
+        parts.extend(value for value in info.values() if isinstance(value, str))
+    try:
+        xmp = reader.trailer['/Root'].get_object().get('/Metadata')
+        data = xmp.get_object().get_data() if xmp is not None else None
+        if isinstance(data, bytes):
+            parts.append(data.decode('utf-8', errors='ignore'))
+    except Exception:
+        # XMP ausente ou malformado não impede a leitura do restante
+        pass
+    return "\n".join(parts)
+
+
+def _page_window(page_count: int, head_pages: int, tail_pages: int) -> list[int]:
+    """Índices das primeiras `head_pages` e das últimas `tail_pages` páginas."""
+    head = range(min(head_pages, page_count))
+    tail = range(max(page_count - tail_pages, 0), page_count)
+    return list(dict.fromkeys([*head, *tail]))
+
+
+def _read_cache(cache_file: Path, head_pages: int, tail_pages: int) -> dict | None:
+    try:
+        cached = json.loads(cache_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if cached.get('version') != EXTRACTOR_VERSION or cached.get('window') != [head_pages, tail_pages]:
+        return None
+    return cached['result']
+
+
+def _write_cache(cache_file: Path, result: dict, head_pages: int, tail_pages: int) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    # Grava em um arquivo temporário e renomeia, pois vários processos podem escrever ao mesmo tempo
+    temp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    temp_file.write_text(json.dumps({'version': EXTRACTOR_VERSION, 'window': [head_pages, tail_pages], 'result': result}), encoding='utf-8')
+    os.replace(temp_file, cache_file)
+
+
+def _has_identifier(result: dict) -> bool:
+    return any(result[key] is not None for key in IDENTIFIER_FIELDS)
+
+
+def _full_text(reader: PdfReader, page_texts: dict[int, str]) -> dict | None:
+    """
+    Texto de todas as páginas, no formato de `pdf_text.extract`, reaproveitando
+    as páginas já lidas. Se alguma página falhar, retorna None e a extração
+    fica para a indexação em segundo plano, que registra o erro.
+    """
+    from . import pdf_text
+
+    try:
+        for index, page in enumerate(reader.pages):
+            if index not in page_texts:
+                page_texts[index] = page.extract_text() or ""
+    except Exception:
+        return None
+    return pdf_text.from_pages([page_texts[index] for index in range(len(page_texts))])
+
+
+def extract(file_path_str: str, cache_dir: str | None = None,
+            head_pages: int = HEAD_PAGES, tail_pages: int = TAIL_PAGES, full_text: bool = False) -> dict:
+    """
+    Lê um PDF e retorna um dicionário com 'path', 'title' (do próprio PDF
+    ou derivado do nome do arquivo), 'doi', 'arxiv_id', 'arxiv_version' e
+    'isbn' (None quando não encontrados). A busca para na primeira fonte
+    (metadados ou página) que contém algum identificador. Com `cache_dir`,
+    o resultado é reaproveitado para arquivos de mesmo conteúdo, e o hash
+    do conteúdo é devolvido em 'content_hash' (None sem cache).
+
+    Com `full_text`, o texto de todas as páginas também é lido (as páginas
+    da busca não são lidas de novo) e devolvido em 'fulltext', pronto para
+    o índice de texto completo; ele é None sem `full_text`, quando o
+    resultado vem do cache ou se alguma página não puder ser lida.
+    """
+    file_path = Path(file_path_str)
+    cache_file = None
+    digest = None
+    result = None
+    fulltext = None
+    if cache_dir is not None:
+        digest = content_hash(file_path_str)
+        cache_file = Path(cache_dir) / f"{digest}.json"
+        result = _read_cache(cache_file, head_pages, tail_pages)
+
+    if result is None:
+        reader = PdfReader(file_path)
+        pdf_meta = reader.metadata
+        result = {'pdf_title': pdf_meta.title if pdf_meta else None,
+                  'doi': None, 'arxiv_id': None, 'arxiv_version': None, 'isbn': None}
+        _merge(result, find_identifiers(_metadata_text(reader)))
+
+        page_texts = {}
+        if not _has_identifier(result):
+            for index in _page_window(len(reader.pages), head_pages, tail_pages):
+                page_texts[index] = reader.pages[index].extract_text() or ""
+                _merge(result, find_identifiers(page_texts[index]))
+                if _has_identifier(result):
+                    break
+
+        if cache_file is not None:
+            _write_cache(cache_file, result, head_pages, tail_pages)
+        if full_text:
+            fulltext = _full_text(reader, page_texts)
+
+    # O título derivado do nome do arquivo não vai para o cache, pois o
+    # mesmo conteúdo pode aparecer com outro nome
+    title = result['pdf_title'] or file_path.stem.replace('_', ' ').replace('-', ' ')
+    return {**result, 'path': file_path_str, 'title': title, 'content_hash': digest, 'fulltext': fulltext}
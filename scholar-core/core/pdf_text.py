@@ -0,0 +1,62 @@
+# core/pdf_text.py
+"""
+Extração do texto completo de PDFs anexados, para a busca por conteúdo.
+
+Assim como `pdf_metadata`, este módulo não toca no banco de dados nem nos
+plugins, para que `extract` possa rodar nos processos de trabalho da
+indexação: o trabalho pesado (leitura, tokenização e compressão) fica todo
+no processo de trabalho, e o processo principal só grava o resultado.
+"""
+
+import zlib
+
+from PyPDF2 import PdfReader
+
+from . import tokenizer
+
+# Versão do formato extraído; textos de versões anteriores são reextraídos
+EXTRACTOR_VERSION = 1
+# Separador de páginas no texto armazenado
+PAGE_SEPARATOR = "\f"
+_COMPRESSION_LEVEL = 6
+
+
+def compress_pages(pages: list[str]) -> bytes:
+    """Junta as páginas e comprime o texto para armazenamento."""
+    return zlib.compress(PAGE_SEPARATOR.join(pages).encode('utf-8'), _COMPRESSION_LEVEL)
+
+
+def decompress_pages(data: bytes) -> list[str]:
+    """Inverso de `compress_pages`."""
+    return zlib.decompress(data).decode('utf-8').split(PAGE_SEPARATOR)
+
+
+def page_postings(pages: list[str]) -> list[tuple[str, int, int]]:
+    """Retorna (termo, página, frequência) de cada termo, com páginas numeradas a partir de 1."""
+    postings = []
+    for page_number, text in enumerate(pages, start=1):
+        counts = {}
+        for term in tokenizer.tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+        postings.extend((term, page_number, tf) for term, tf in counts.items())
+    return postings
+
+
+def from_pages(page_texts: list[str]) -> dict:
+    """
+    Monta, a partir do texto de cada página, o resultado de `extract`. Serve
+    para aproveitar páginas já lidas por outra etapa (como a busca de
+    identificadores em `pdf_metadata`).
+    """
+    # O separador de páginas não pode aparecer dentro de uma página
+    pages = [text.replace(PAGE_SEPARATOR, " ") for text in page_texts]
+    return {'page_count': len(pages), 'text': compress_pages(pages), 'postings': page_postings(pages)}
+
+
+def extract(file_path_str: str) -> dict:
+    """
+    Extrai o texto de todas as páginas de um PDF e retorna {'page_count',
+    'text' (comprimido), 'postings'}, pronto para ser gravado.
+    """
+    reader = PdfReader(file_path_str)
+    return from_pages([page.extract_text() or "" for page in reader.pages])
@@ -1,50 +1,308 @@
+import atexit
 import importlib
+import json
+import os
 import pkgutil
+import queue
+import threading
+import time
 import plugins
 
+# Eventos entregues aos plugins, com o hook individual de cada um
+ITEM_ADDED = 'item_added'
+ITEM_UPDATED = 'item_updated'
+ITEM_DELETED = 'item_deleted'
+COLLECTION_ADDED = 'collection_added'
+# Nome, pai ou itens da coleção alterados
+COLLECTION_UPDATED = 'collection_updated'
+COLLECTION_DELETED = 'collection_deleted'
+_SINGLE_HOOKS = {
+    ITEM_ADDED: 'on_item_added',
+    ITEM_UPDATED: 'on_item_updated',
+    ITEM_DELETED: 'on_item_deleted',
+    COLLECTION_ADDED: 'on_collection_added',
+    COLLECTION_UPDATED: 'on_collection_updated',
+    COLLECTION_DELETED: 'on_collection_deleted',
+}
+# Hooks opcionais que recebem um lote inteiro de IDs
+_BATCH_HOOKS = {
+    ITEM_ADDED: 'on_items_added',
+}
+_STOP = object()
+
+
+def _coalesce(events: list[tuple]) -> list[tuple]:
+    """Junta eventos consecutivos do mesmo tipo em um único lote de IDs, sem repetições."""
+    merged = []
+    for kind, item_ids in events:
+        if merged and merged[-1][0] == kind:
+            merged[-1][1].update(dict.fromkeys(item_ids))
+        else:
+            merged.append((kind, dict.fromkeys(item_ids)))
+    return [(kind, list(item_ids)) for kind, item_ids in merged]
+
+
+class _PluginEntry:
+    """
+    Um plugin descoberto no pacote `plugins`. O módulo só é importado no
+    primeiro `load()`; até lá o manifesto (quando existe) basta para saber
+    quais hooks o plugin implementa.
+    """
+
+    def __init__(self, module_name: str, manifest: dict | None):
+        self.module_name = module_name
+        self.manifest = manifest
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._instance = None
+
+    def implements(self, *hooks: str) -> bool:
+        """Indica se o plugin pode implementar algum dos hooks (sempre True sem manifesto)."""
+        if self.manifest is None:
+            return True
+        return any(hook in self.manifest.get('hooks', ()) for hook in hooks)
+
+    def load(self):
+        """Importa e registra o plugin uma única vez; retorna None se ele falhar."""
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                try:
+                    module = importlib.import_module(self.module_name)
+                    if hasattr(module, 'register'):
+                        self._instance = module.register()
+                        print(f"Plugin '{self.module_name}' carregado.")
+                except Exception as e:
+                    print(f"Falha ao carregar o plugin {self.module_name}: {e}")
+            return self._instance
+
+
+class _ListenerEntry:
+    """
+    Um ouvinte registrado pela aplicação (como um widget da GUI), tratado
+    como um plugin já carregado: recebe os eventos pelos mesmos hooks, na
+    sua própria thread de entrega.
+    """
+
+    def __init__(self, listener):
+        self.module_name = f"listener-{id(listener)}"
+        self.listener = listener
+
+    def implements(self, *hooks: str) -> bool:
+        return any(hook and hasattr(self.listener, hook) for hook in hooks)
+
+    def load(self):
+        return self.listener
+
+
+class _PluginWorker:
+    """
+    Fila e thread de entrega de eventos de um único plugin. Cada plugin tem
+    a sua, então um plugin lento não atrasa os demais e os eventos chegam a
+    cada plugin na ordem em que foram publicados. O plugin é importado na
+    própria thread de entrega, fora do caminho de escrita.
+    """
+
+    def __init__(self, entry: _PluginEntry):
+        self.entry = entry
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name=f"plugin-events-{entry.module_name}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            events = [self.queue.get()]
+            # Drena o que já estiver na fila, para entregar rajadas em lotes
+            while True:
+                try:
+                    events.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                stop = any(event is _STOP for event in events)
+                for kind, item_ids in _coalesce([event for event in events if event is not _STOP]):
+                    self._deliver(kind, item_ids)
+            finally:
+                for _ in events:
+                    self.queue.task_done()
+            if stop:
+                return
+
+    def _deliver(self, kind: str, item_ids: list[int]):
+        plugin = self.entry.load()
+        if plugin is None:
+            return
+        single_hook = getattr(plugin, _SINGLE_HOOKS[kind], None)
+        batch_hook = getattr(plugin, _BATCH_HOOKS.get(kind, ''), None)
+        try:
+            if batch_hook is not None and (len(item_ids) > 1 or single_hook is None):
+                batch_hook(item_ids)
+            elif single_hook is not None:
+                for item_id in item_ids:
+                    single_hook(item_id)
+        except Exception as e:
+            # Uma falha no plugin nunca chega ao caminho de escrita nem aos outros plugins
+            name = plugin.get_name() if hasattr(plugin, 'get_name') else self.entry.module_name
+            print(f"Erro no plugin '{name}' ao processar o evento '{kind}': {e}")
+
+    def wait_idle(self, deadline: float | None) -> bool:
+        """Espera a fila esvaziar; retorna False se o prazo acabar antes."""
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+
 class PluginManager:
+    """
+    Descobre os plugins sem importá-los: cada pacote de plugin pode trazer
+    um `manifest.json` com seu nome e a lista de hooks que implementa. O
+    módulo só é importado quando um desses hooks é usado (ou quando a GUI
+    chama `initialize_gui`); plugins sem manifesto são importados no
+    primeiro evento.
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+
     def __init__(self):
-        self.plugins = []
+        self._entries = []
+        self._listeners = []
+        self._workers = {}
+        self._workers_lock = threading.Lock()
         self._discover_plugins()
 
     def _discover_plugins(self):
-        """Encontra e carrega plugins do diretório 'plugins'."""
+        """Encontra os plugins do diretório 'plugins' e lê seus manifestos."""
         print("Descobrindo plugins...")
         # Certifique-se de que o diretório de plugins exista
         if not hasattr(plugins, '__path__'):
             print("Diretório de plugins não encontrado.")
             return
 
-        for _, name, _ in pkgutil.iter_modules(plugins.__path__, prefix='plugins.'):
-            try:
-                module = importlib.import_module(name)
-                if hasattr(module, 'register'):
-                    plugin_instance = module.register()
-                    self.plugins.append(plugin_instance)
-                    print(f"Plugin '{name}' carregado.")
-            except Exception as e:
-                print(f"Falha ao carregar o plugin {name}: {e}")
+        for finder, name, _ in pkgutil.iter_modules(plugins.__path__, prefix='plugins.'):
+            self._entries.append(_PluginEntry(name, self._read_manifest(finder, name)))
+
+    def _read_manifest(self, finder, module_name: str) -> dict | None:
+        """Lê o manifesto de um plugin, se houver; manifestos inválidos são ignorados."""
+        directory = getattr(finder, 'path', None)
+        if not isinstance(directory, str):
+            return None
+        manifest_path = os.path.join(directory, module_name.rsplit('.', 1)[-1], self.MANIFEST_FILE)
+        try:
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if isinstance(manifest, dict) else None
+
+    def _load_plugins(self, *hooks: str) -> list:
+        """Importa (uma vez) e retorna os plugins que podem implementar algum dos hooks."""
+        loaded = [entry.load() for entry in self._entries if not hooks or entry.implements(*hooks)]
+        return [plugin for plugin in loaded if plugin is not None]
+
+    @property
+    def plugins(self) -> list:
+        """Todos os plugins, importando os que ainda não foram carregados."""
+        return self._load_plugins()
+
+    def _publish(self, kind: str, item_ids: list[int]):
+        """
+        Enfileira um evento para cada plugin interessado e retorna
+        imediatamente; a entrega (e a importação do plugin, se necessária)
+        acontece nas threads dos plugins.
+        """
+        hooks = (_SINGLE_HOOKS[kind], _BATCH_HOOKS.get(kind, ''))
+        for entry in self._entries + self._listeners:
+            if not entry.implements(*hooks):
+                continue
+            with self._workers_lock:
+                worker = self._workers.get(entry.module_name)
+                if worker is None:
+                    worker = self._workers[entry.module_name] = _PluginWorker(entry)
+            worker.queue.put((kind, list(item_ids)))
+
+    def add_listener(self, listener):
+        """
+        Registra um objeto que recebe os eventos pelos mesmos hooks dos
+        plugins (`on_item_added`, `on_collection_updated`, ...), na thread de
+        entrega dele; quem atualiza a GUI deve reagendar o trabalho na thread
+        principal.
+        """
+        self._listeners.append(_ListenerEntry(listener))
+
+    def remove_listener(self, listener):
+        """Cancela o registro de um ouvinte."""
+        self._listeners = [entry for entry in self._listeners if entry.listener is not listener]
+        with self._workers_lock:
+            worker = self._workers.pop(f"listener-{id(listener)}", None)
+        if worker is not None:
+            worker.queue.put(_STOP)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Espera até que todos os eventos publicados (inclusive os gerados
+        pelos próprios plugins durante a entrega) tenham sido entregues.
+        Retorna False se o `timeout` (em segundos) acabar antes.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._workers_lock:
+                workers = list(self._workers.values())
+            if not all(worker.wait_idle(deadline) for worker in workers):
+                return False
+            if all(worker.queue.unfinished_tasks == 0 for worker in workers):
+                return True
+
+    def shutdown(self, timeout: float | None = None):
+        """Entrega os eventos pendentes e encerra as threads dos plugins."""
+        self.flush(timeout)
+        with self._workers_lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.queue.put(_STOP)
 
     def hook_item_added(self, item_id: int):
         """Hook chamado quando um item é adicionado."""
         print(f"Hook: Item {item_id} adicionado.")
-        for plugin in self.plugins:
-            if hasattr(plugin, 'on_item_added'):
-                plugin.on_item_added(item_id)
+        self._publish(ITEM_ADDED, [item_id])
+
+    def hook_items_added(self, item_ids: list[int]):
+        """
+        Hook chamado uma única vez quando um lote de itens é adicionado.
+        Plugins com `on_items_added` recebem o lote inteiro; os demais recebem
+        `on_item_added` para cada item.
+        """
+        print(f"Hook: {len(item_ids)} itens adicionados em lote.")
+        self._publish(ITEM_ADDED, item_ids)
 
     def hook_item_updated(self, item_id: int):
         """Hook chamado quando um item é atualizado."""
         print(f"Hook: Item {item_id} atualizado.")
-        for plugin in self.plugins:
-            if hasattr(plugin, 'on_item_updated'):
-                plugin.on_item_updated(item_id)
+        self._publish(ITEM_UPDATED, [item_id])
 
     def hook_item_deleted(self, item_id: int):
         """Hook chamado quando um item é deletado."""
         print(f"Hook: Item {item_id} deletado.")
-        for plugin in self.plugins:
-            if hasattr(plugin, 'on_item_deleted'):
-                plugin.on_item_deleted(item_id)
+        self._publish(ITEM_DELETED, [item_id])
+
+    def hook_collection_added(self, collection_id: int):
+        """Hook chamado quando uma coleção é criada."""
+        print(f"Hook: Coleção {collection_id} criada.")
+        self._publish(COLLECTION_ADDED, [collection_id])
+
+    def hook_collection_updated(self, collection_id: int):
+        """Hook chamado quando o nome, o pai ou os itens de uma coleção mudam."""
+        print(f"Hook: Coleção {collection_id} alterada.")
+        self._publish(COLLECTION_UPDATED, [collection_id])
+
+    def hook_collections_deleted(self, collection_ids: list[int]):
+        """Hook chamado quando coleções (uma subárvore) são excluídas."""
+        print(f"Hook: {len(collection_ids)} coleções excluídas.")
+        self._publish(COLLECTION_DELETED, collection_ids)
 
     def initialize_gui(self, app_gui):
         """
@@ -62,7 +320,7 @@ class PluginManager:
         que as suportam.
         """
         print("Executando verificações de fundo dos plugins...")
-        for plugin in self.plugins:
+        for plugin in self._load_plugins('check_all_items'):
             if hasattr(plugin, 'check_all_items'):
                 # Idealmente, isso deveria rodar em uma thread separada para
                 # não bloquear a GUI, especialmente com chamadas de rede.
@@ -71,3 +329,5 @@ class PluginManager:
 
 # Instância global única do gerenciador de plugins
 manager = PluginManager()
+# Na saída, os eventos ainda na fila são entregues (com um limite de tempo)
+atexit.register(manager.shutdown, 5)
@@ -1,16 +1,28 @@
 # core/services/attachment_service.py
-import time
-import shutil
 import mimetypes
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 from ..models import Attachment
-from ..data_access import item_repository, attachment_repository
-from .. import database
+from ..data_access import item_repository, attachment_repository, fulltext_repository
+from .. import database, file_store, id_allocator
+from . import fulltext_service, item_cache
+
+# Serializa as gravações no armazenamento e a coleta de conteúdos sem
+# referência, para que um conteúdo não seja removido enquanto é anexado
+_store_lock = threading.Lock()
+
+def storage_dir() -> str:
+    """Diretório raiz dos arquivos anexados."""
+    return os.path.join(database.DATA_DIR, "storage")
 
 def add_attachment(item_id: int, source_path_str: str) -> Attachment | None:
-    """Copia um arquivo, o anexa a um item e o salva no banco de dados."""
+    """
+    Guarda um arquivo no armazenamento por conteúdo, o anexa a um item e o
+    salva no banco de dados. Conteúdo já guardado não é copiado de novo.
+    """
     source_path = Path(source_path_str)
     if not source_path.exists():
         return None
@@ -18,24 +30,98 @@ def add_attachment(item_id: int, source_path_str: str) -> Attachment | None:
     if not item_repository.item_exists(item_id):
         return None
 
-    storage_dir = os.path.join(database.DATA_DIR, "storage")
-    attachment_id = int(time.time() * 1_000_000)
-    attachment_dir = os.path.join(storage_dir, str(attachment_id))
-    os.makedirs(attachment_dir, exist_ok=True)
+    digest = file_store.content_hash(source_path_str)
+    with _store_lock:
+        attachment = _store(id_allocator.next_id(), item_id, source_path_str, digest)
+        attachment_repository.add(item_id, attachment.id, attachment.path, attachment.mime_type, digest)
+    item_cache.cache.invalidate([item_id])
+    fulltext_service.schedule_indexing()
+    return attachment
+
+def _store(attachment_id: int, item_id: int, source_path_str: str, digest: str) -> Attachment:
+    """Guarda o arquivo no armazenamento e monta o anexo correspondente (ainda não gravado no banco)."""
+    db_path = file_store.store(storage_dir(), source_path_str, digest)
+    mime_type, _ = mimetypes.guess_type(db_path)
+    # A data é adicionada pelo DB, não a retornamos aqui
+    return Attachment(id=attachment_id, item_id=item_id, path=db_path, mime_type=mime_type, date_added=None)
+
+def add_attachments(pairs: list[tuple]) -> list[Attachment]:
+    """
+    Guarda e anexa vários arquivos, dados como (item_id, caminho),
+    (item_id, caminho, hash do conteúdo já calculado) ou (item_id, caminho,
+    hash, texto já extraído por `pdf_text.from_pages`), gravando todos os
+    registros com uma única inserção. Os itens devem existir.
+    """
+    if not pairs:
+        return []
+
+    # O hash (a leitura completa do arquivo) é calculado fora da trava
+    entries = []
+    texts = []
+    for item_id, source_path_str, *known in pairs:
+        digest = known[0] if known and known[0] else file_store.content_hash(source_path_str)
+        entries.append((item_id, source_path_str, digest))
+        texts.append((digest, known[1] if len(known) > 1 else None))
+
+    base_id = id_allocator.reserve(len(entries))
+    attachments = []
+    with _store_lock:
+        for offset, (item_id, source_path_str, digest) in enumerate(entries):
+            attachments.append(_store(base_id + offset, item_id, source_path_str, digest))
+
+        with database.transaction():
+            attachment_repository.add_many([
+                (a.id, a.item_id, a.path, a.mime_type, digest) for a, (_, _, digest) in zip(attachments, entries)
+            ])
+            fulltext_service.store_extracted(texts)
+    fulltext_repository.merge_delta_if_needed()
+    item_cache.cache.invalidate({item_id for item_id, _, _ in entries})
+    fulltext_service.schedule_indexing()
+    return attachments
 
-    destination_path = os.path.join(attachment_dir, source_path.name)
-    shutil.copy(source_path, destination_path)
+@contextmanager
+def staged_files(files: list[tuple]):
+    """
+    Guarda arquivos, dados como (caminho, hash já calculado ou None), para
+    que os registros dos anexos sejam gravados dentro do bloco, ainda sob a
+    trava do armazenamento. Cada arquivo é independente: o bloco recebe, na
+    mesma ordem, (anexo sem item, hash) ou a exceção que impediu guardá-lo.
+    Se o bloco falhar, os conteúdos que ficaram sem referência são removidos.
+    """
+    # O hash (a leitura completa do arquivo) é calculado fora da trava
+    entries = []
+    for source_path_str, digest in files:
+        try:
+            entries.append((source_path_str, digest or file_store.content_hash(source_path_str)))
+        except Exception as e:
+            entries.append(e)
 
-    mime_type, _ = mimetypes.guess_type(destination_path)
-    db_path = os.path.relpath(destination_path, storage_dir)
+    next_id = id_allocator.reserve(len(entries)) if entries else 0
+    with _store_lock:
+        staged = []
+        for entry in entries:
+            attachment_id, next_id = next_id, next_id + 1
+            if isinstance(entry, Exception):
+                staged.append(entry)
+                continue
+            source_path_str, digest = entry
+            try:
+                staged.append((_store(attachment_id, None, source_path_str, digest), digest))
+            except Exception as e:
+                staged.append(e)
+        try:
+            yield staged
+        except BaseException:
+            _release_locked([entry[1] for entry in staged if not isinstance(entry, Exception)])
+            raise
 
-    attachment_repository.add(item_id, attachment_id, db_path, mime_type)
+def release_contents(content_hashes: list[str]) -> None:
+    """Remove do armazenamento os conteúdos que nenhum anexo referencia mais."""
+    with _store_lock:
+        _release_locked(content_hashes)
 
-    new_attachment = Attachment(
-        id=attachment_id,
-        item_id=item_id,
-        path=db_path,
-        mime_type=mime_type,
-        date_added=None # A data é adicionada pelo DB, não a retornamos aqui
-    )
-    return new_attachment
+def _release_locked(content_hashes: list[str]) -> None:
+    unreferenced = attachment_repository.unreferenced(content_hashes)
+    for digest in unreferenced:
+        file_store.remove(storage_dir(), digest)
+    fulltext_repository.remove(unreferenced)
@@ -1,25 +1,93 @@
 # core/services/collection_service.py
-import time
+from .. import id_allocator
 from ..data_access import collection_repository, item_repository
 from ..models import Collection
+from ..plugin_manager import manager as plugin_manager
 
 def add_collection(name: str, parent_id: int | None = None) -> int:
-    """Adiciona uma nova coleção."""
-    collection_id = int(time.time() * 1_000_000)
-    return collection_repository.add(name, parent_id, collection_id)
+    """Adiciona uma nova coleção e chama o hook do plugin."""
+    if parent_id is not None and not collection_repository.collection_exists(parent_id):
+        raise ValueError(f"Coleção pai inexistente: {parent_id}")
+    collection_id = id_allocator.next_id()
+    collection_repository.add(name, parent_id, collection_id)
+    plugin_manager.hook_collection_added(collection_id)
+    return collection_id
+
+def rename_collection(collection_id: int, name: str) -> bool:
+    """Renomeia uma coleção e chama o hook do plugin."""
+    if not collection_repository.collection_exists(collection_id):
+        return False
+    collection_repository.rename(collection_id, name)
+    plugin_manager.hook_collection_updated(collection_id)
+    return True
+
+def delete_collection(collection_id: int) -> bool:
+    """
+    Exclui uma coleção e todas as suas subcoleções (os itens continuam na
+    biblioteca) e chama o hook do plugin. Falha se a coleção não existir ou
+    se, em uma biblioteca antiga, outra coleção ainda a referenciar como pai
+    original.
+    """
+    if not collection_repository.collection_exists(collection_id):
+        return False
+    collection_ids = collection_repository.subtree_ids(collection_id)
+    if collection_repository.is_referenced_outside(collection_ids):
+        return False
+    collection_repository.delete(collection_ids)
+    plugin_manager.hook_collections_deleted(collection_ids)
+    return True
 
 def add_item_to_collection(item_id: int, collection_id: int) -> bool:
     """Adiciona um item a uma coleção, verificando se ambos existem."""
     if not item_repository.item_exists(item_id) or not collection_repository.collection_exists(collection_id):
         return False
 
-    return collection_repository.add_item_to(item_id, collection_id)
+    collection_repository.add_item_to(item_id, collection_id)
+    plugin_manager.hook_collection_updated(collection_id)
+    return True
 
-def get_items_in_collection(collection_id: int) -> list:
-    """Retorna os itens de uma coleção."""
+def get_items_in_collection(collection_id: int, recursive: bool = False) -> list:
+    """Retorna os itens de uma coleção (e, com `recursive`, de suas subcoleções)."""
     if not collection_repository.collection_exists(collection_id):
         return []
-    return collection_repository.get_items_in(collection_id)
+    return collection_repository.get_items_in(collection_id, recursive)
+
+def get_collection(collection_id: int) -> Collection | None:
+    """Retorna uma coleção, ou None se ela não existir."""
+    return collection_repository.get(collection_id)
+
+def get_child_collections(parent_id: int | None = None) -> list[Collection]:
+    """Retorna as subcoleções diretas de uma coleção (ou as coleções raiz)."""
+    return collection_repository.get_children(parent_id)
+
+def get_collection_ancestors(collection_id: int) -> list[Collection]:
+    """Retorna os ancestrais de uma coleção, da raiz até o pai imediato."""
+    return collection_repository.get_ancestors(collection_id)
+
+def get_collection_descendants(collection_id: int) -> list[Collection]:
+    """Retorna todas as subcoleções de uma coleção."""
+    return collection_repository.get_descendants(collection_id)
+
+def move_collection(collection_id: int, new_parent_id: int | None) -> bool:
+    """
+    Move uma coleção, com suas subcoleções, para outro pai (ou para a raiz).
+    Falha se alguma das coleções não existir ou se o novo pai estiver na
+    própria subárvore.
+    """
+    if not collection_repository.collection_exists(collection_id):
+        return False
+    if new_parent_id is not None:
+        if not collection_repository.collection_exists(new_parent_id):
+            return False
+        if collection_repository.is_descendant(new_parent_id, collection_id):
+            return False
+    collection_repository.move(collection_id, new_parent_id)
+    plugin_manager.hook_collection_updated(collection_id)
+    return True
+
+def get_collection_item_counts() -> dict[int, dict]:
+    """Retorna, por coleção, o número de itens diretos e da subárvore."""
+    return collection_repository.get_item_counts()
 
 def get_all_collections() -> list[Collection]:
     """Retorna todas as coleções."""
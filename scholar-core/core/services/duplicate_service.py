@@ -0,0 +1,84 @@
+# core/services/duplicate_service.py
+"""
+Detecção e fusão de itens duplicados.
+
+Os grupos de duplicatas exatas (identificadores) e os pares de
+quase-duplicatas (título e primeiro autor) vêm do `duplicate_repository`;
+aqui eles são unidos em clusters com union-find, de modo que A~B e B~C
+resultem em um único cluster {A, B, C}.
+"""
+
+from ..data_access import duplicate_repository, item_repository
+from ..plugin_manager import manager as plugin_manager
+from . import item_cache
+
+# Motivo informado para os clusters encontrados pelo título e primeiro autor
+TITLE_AUTHOR_REASON = 'title_author'
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item_id: int) -> int:
+        root = self.parent.setdefault(item_id, item_id)
+        while root != self.parent[root]:
+            root = self.parent[root]
+        # Compressão de caminho
+        while item_id != root:
+            self.parent[item_id], item_id = root, self.parent[item_id]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def find_duplicates(near_duplicates: bool = True) -> list[dict]:
+    """
+    Retorna os clusters de itens candidatos a duplicatas, cada um como
+    {'item_ids': [...], 'reasons': [...]}, em que os motivos são os campos
+    de identificador compartilhados ('doi', 'arxiv_id', 'isbn') e/ou
+    'title_author'. Com `near_duplicates=False`, só os identificadores são usados.
+    """
+    clusters = _UnionFind()
+    reasons = []
+    for field, item_ids in duplicate_repository.exact_groups():
+        for item_id in item_ids[1:]:
+            clusters.union(item_ids[0], item_id)
+        reasons.append((item_ids[0], field))
+    if near_duplicates:
+        for a, b in duplicate_repository.near_duplicate_pairs():
+            clusters.union(a, b)
+            reasons.append((a, TITLE_AUTHOR_REASON))
+
+    members = {}
+    for item_id in list(clusters.parent):
+        members.setdefault(clusters.find(item_id), []).append(item_id)
+    cluster_reasons = {}
+    for item_id, reason in reasons:
+        cluster_reasons.setdefault(clusters.find(item_id), set()).add(reason)
+
+    return [
+        {'item_ids': sorted(item_ids), 'reasons': sorted(cluster_reasons[root])}
+        for root, item_ids in sorted(members.items())
+    ]
+
+
+def merge_items(keep_id: int, duplicate_ids: list[int]) -> bool:
+    """
+    Funde as duplicatas no item `keep_id` (tags, coleções, anexos e campos
+    ausentes) e as exclui, em uma única transação. Retorna False se nada
+    foi fundido.
+    """
+    # Os anexos são movidos (ou descartados por repetirem um conteúdo que o
+    # item mantido já tem), então nenhum conteúdo fica sem referência
+    merged = item_repository.merge(keep_id, duplicate_ids)
+    item_cache.cache.invalidate([keep_id, *duplicate_ids])
+    if not merged:
+        return False
+    plugin_manager.hook_item_updated(keep_id)
+    for item_id in merged:
+        plugin_manager.hook_item_deleted(item_id)
+    return True
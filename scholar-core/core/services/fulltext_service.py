@@ -0,0 +1,229 @@
+# core/services/fulltext_service.py
+"""
+Extração e indexação do texto completo dos PDFs anexados.
+
+A indexação é incremental: cada execução processa apenas os conteúdos
+anexados que ainda não foram extraídos com a versão atual do extrator, então
+depois da primeira passada sobre a biblioteca manter o índice em dia custa
+só o trabalho dos anexos novos. A leitura dos PDFs roda em um pool de
+processos e a gravação é feita em lotes por um único escritor, na thread
+que chamou `index_attachment_texts`.
+
+Quando o texto já foi lido por outra etapa (a busca de identificadores na
+criação de itens a partir de PDFs), ele é gravado junto com o anexo por
+`store_extracted`, sem nova leitura. Depois de `start_background_indexing`,
+cada gravação de anexos agenda uma passada incremental em segundo plano;
+pedidos feitos durante uma passada são atendidos por uma única passada
+seguinte.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable
+
+from .. import id_allocator
+from ..data_access import fulltext_repository
+from . import attachment_service
+from .import_service import InlineExecutor
+
+DEFAULT_BATCH_SIZE = 50
+# Tarefas em andamento por processo de leitura (limita a memória dos resultados pendentes)
+_IN_FLIGHT_PER_WORKER = 4
+
+# Uma única indexação por vez; chamadas simultâneas retornam imediatamente
+_run_lock = threading.Lock()
+
+# Indexação em segundo plano após gravações de anexos, ligada por
+# `start_background_indexing`. `_rerun` indica que há uma passada pedida e
+# `_worker` é a thread que as executa (None quando ociosa).
+_auto_indexing = False
+_schedule_lock = threading.Lock()
+_rerun = False
+_worker: threading.Thread | None = None
+
+
+def index_attachment_texts(workers: int | None = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                           progress: Callable[[int, int], None] | None = None) -> dict | None:
+    """
+    Extrai e indexa o texto dos PDFs anexados que ainda não foram
+    processados. `workers` é o número de processos de leitura (padrão:
+    número de CPUs; 0 lê na própria thread). `progress(concluídos, total)` é
+    chamado a cada lote gravado.
+
+    Retorna {'indexed': conteúdos extraídos, 'failed': [(hash, erro), ...]},
+    ou None se outra indexação já estiver em andamento. Falhas ficam
+    registradas e não são tentadas de novo na mesma versão do extrator.
+    """
+    if not _run_lock.acquire(blocking=False):
+        return None
+    try:
+        return _index_pending(workers, batch_size, progress)
+    finally:
+        _run_lock.release()
+
+
+def _index_pending(workers: int | None, batch_size: int, progress: Callable[[int, int], None] | None) -> dict:
+    """Corpo de `index_attachment_texts`; quem chama detém `_run_lock`."""
+    # Importado aqui para que carregar a API não pague o custo do PyPDF2
+    from .. import pdf_text
+
+    pending = fulltext_repository.pending(pdf_text.EXTRACTOR_VERSION)
+    result = {'indexed': 0, 'failed': []}
+    if not pending:
+        return result
+
+    total = len(pending)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, total)
+    if workers > 0:
+        # 'spawn' evita herdar, via fork, as threads e o handle do DuckDB
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    else:
+        pool = InlineExecutor()
+
+    first_text_id = id_allocator.reserve(total)
+    storage_dir = attachment_service.storage_dir()
+    batch = []
+    done = 0
+
+    def flush() -> None:
+        nonlocal done
+        fulltext_repository.store(batch, pdf_text.EXTRACTOR_VERSION)
+        done += len(batch)
+        batch.clear()
+        if progress:
+            progress(done, total)
+
+    try:
+        queued = iter(enumerate(pending))
+        in_flight = {}
+        max_in_flight = max(workers, 1) * _IN_FLIGHT_PER_WORKER
+        while True:
+            for offset, (content_hash, relative_path) in queued:
+                future = pool.submit(pdf_text.extract, str(Path(storage_dir) / relative_path))
+                in_flight[future] = {'content_hash': content_hash, 'text_id': first_text_id + offset}
+                if len(in_flight) >= max_in_flight:
+                    break
+            if not in_flight:
+                break
+
+            completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in completed:
+                entry = in_flight.pop(future)
+                try:
+                    entry.update(future.result())
+                    result['indexed'] += 1
+                except Exception as e:
+                    entry['error'] = str(e) or type(e).__name__
+                    result['failed'].append((entry['content_hash'], entry['error']))
+                batch.append(entry)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    fulltext_repository.merge_delta_if_needed()
+    return result
+
+
+def store_extracted(extracted: list[tuple[str, dict | None]]) -> None:
+    """
+    Grava textos já extraídos, dados como (hash do conteúdo, resultado de
+    `pdf_text.from_pages` ou None), pulando os conteúdos que já têm texto.
+    Pode ser chamada dentro de uma transação: quem chama fica responsável
+    por `fulltext_repository.merge_delta_if_needed` depois dela.
+    """
+    entries = {digest: fulltext for digest, fulltext in extracted if fulltext is not None}
+    if not entries:
+        return
+    from .. import pdf_text
+
+    for digest in fulltext_repository.extracted(list(entries), pdf_text.EXTRACTOR_VERSION):
+        del entries[digest]
+    if not entries:
+        return
+    first_text_id = id_allocator.reserve(len(entries))
+    fulltext_repository.store([
+        {**fulltext, 'content_hash': digest, 'text_id': first_text_id + offset}
+        for offset, (digest, fulltext) in enumerate(entries.items())
+    ], pdf_text.EXTRACTOR_VERSION)
+
+
+def start_background_indexing() -> threading.Thread:
+    """
+    Roda `index_attachment_texts` em uma thread de fundo e a retorna. A
+    partir daí, `schedule_indexing` passa a agendar novas passadas.
+    """
+    global _auto_indexing
+    _auto_indexing = True
+    return _schedule()
+
+
+def schedule_indexing() -> None:
+    """
+    Pede uma passada incremental em segundo plano, depois de novos anexos.
+    Não faz nada se `start_background_indexing` não foi chamada (no host de
+    mensagens nativas e nos scripts, por exemplo).
+    """
+    if _auto_indexing:
+        _schedule()
+
+
+def wait_for_indexing(timeout: float | None = None) -> bool:
+    """Espera as passadas agendadas terminarem. Retorna False se o tempo acabar antes."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        with _schedule_lock:
+            worker = _worker
+        if worker is None:
+            return True
+        worker.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        if worker.is_alive():
+            return False
+
+
+def _schedule() -> threading.Thread:
+    global _rerun, _worker
+    with _schedule_lock:
+        _rerun = True
+        if _worker is None:
+            _worker = threading.Thread(target=_run_scheduled, name="fulltext-indexer", daemon=True)
+            _worker.start()
+        return _worker
+
+
+def _run_scheduled() -> None:
+    """Executa as passadas pedidas, uma de cada vez, até não haver mais pedidos."""
+    global _rerun, _worker
+    while True:
+        with _schedule_lock:
+            if not _rerun:
+                _worker = None
+                return
+            _rerun = False
+        try:
+            # Espera uma indexação em andamento, que pode ter lido a lista de pendentes antes do pedido
+            with _run_lock:
+                _index_pending(None, DEFAULT_BATCH_SIZE, None)
+        except Exception as e:
+            print(f"Erro na indexação do texto dos anexos: {e}")
+
+
+def get_attachment_text(attachment_id: int) -> list[str] | None:
+    """Texto extraído de um anexo, uma string por página, ou None se ainda não foi extraído."""
+    from .. import pdf_text
+
+    data = fulltext_repository.get_text_blob(attachment_id)
+    return pdf_text.decompress_pages(data) if data is not None else None
+
+
+def search(query: str) -> list[dict]:
+    """Itens cujos anexos contêm a consulta, com as páginas em que ela aparece."""
+    return fulltext_repository.search(query)
@@ -0,0 +1,163 @@
+# core/services/import_service.py
+"""
+Importação em lote de arquivos PDF.
+
+O pipeline tem três estágios: a leitura dos PDFs (limitada por CPU) roda em
+um pool de processos, as consultas ao Crossref (com cache, via
+`metadata_resolver`) rodam em um pool de threads de tamanho limitado, e a
+gravação no banco é feita em lotes por um único escritor, na thread que
+chamou `import_pdfs`.
+
+Em cada lote, os arquivos são guardados primeiro e só os que foram
+guardados entram na transação que grava os itens e os anexos, então um
+arquivo com problema falha sozinho e nenhum item fica sem o seu PDF. O
+texto das páginas, lido pelos processos de trabalho junto com os
+identificadores, é gravado no índice de texto completo na mesma transação.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterable
+
+from ..models import Item
+from . import item_service, attachment_service
+
+DEFAULT_LOOKUP_WORKERS = 8
+DEFAULT_BATCH_SIZE = 100
+
+
+class InlineExecutor:
+    """Executor que roda as tarefas na própria thread (usado com `workers=0`)."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        pass
+
+
+def collect_pdf_paths(paths_or_directory: str | os.PathLike | Iterable) -> list[str]:
+    """
+    Expande um diretório (recursivamente), um arquivo ou uma lista de ambos
+    nos caminhos dos PDFs a importar, sem repetições.
+    """
+    if isinstance(paths_or_directory, (str, os.PathLike)):
+        paths_or_directory = [paths_or_directory]
+
+    paths = []
+    for entry in paths_or_directory:
+        entry = Path(entry)
+        if entry.is_dir():
+            paths.extend(str(p) for p in sorted(entry.rglob('*')) if p.is_file() and p.suffix.lower() == '.pdf')
+        else:
+            paths.append(str(entry))
+    return list(dict.fromkeys(paths))
+
+
+def import_pdfs(paths_or_directory, workers: int | None = None, lookup_workers: int = DEFAULT_LOOKUP_WORKERS,
+                batch_size: int = DEFAULT_BATCH_SIZE,
+                progress: Callable[[int, int, str, str | None], None] | None = None) -> dict:
+    """
+    Importa PDFs em paralelo. `workers` é o número de processos de leitura
+    (padrão: número de CPUs; 0 lê na própria thread) e `lookup_workers` o
+    de consultas simultâneas ao Crossref. `progress(concluídos, total,
+    caminho, erro)` é chamado uma vez por arquivo, com `erro` None em caso
+    de sucesso.
+
+    Retorna {'items': itens importados, 'failed': [(caminho, erro), ...]}.
+    """
+    # Importados aqui para que carregar a API não pague o custo do PyPDF2 e do requests
+    from .. import metadata_resolver, pdf_metadata
+
+    paths = collect_pdf_paths(paths_or_directory)
+    total = len(paths)
+    result = {'items': [], 'failed': []}
+    done = 0
+
+    def report(path: str, error: str | None) -> None:
+        nonlocal done
+        done += 1
+        if error is not None:
+            result['failed'].append((path, error))
+        if progress:
+            progress(done, total, path, error)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, total)
+    if workers > 0:
+        # 'spawn' evita herdar, via fork, as threads e o handle do DuckDB
+        parse_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    else:
+        parse_pool = InlineExecutor()
+    lookup_pool = ThreadPoolExecutor(max_workers=lookup_workers)
+
+    ready: list[tuple[str, Item, str | None, dict | None]] = []
+
+    def flush() -> None:
+        batch = ready[:]
+        ready.clear()
+        # O hash calculado na leitura do PDF evita reler o arquivo no armazenamento
+        try:
+            items, failures = item_service.add_items_with_files([(item, path, digest, fulltext)
+                                                                 for path, item, digest, fulltext in batch])
+        except Exception as e:
+            # Nada do lote foi gravado: reimportar os arquivos não cria duplicatas
+            for path, *_ in batch:
+                report(path, f"Erro ao gravar: {e}")
+            return
+        errors = dict(failures)
+        result['items'].extend(items)
+        for path, *_ in batch:
+            report(path, f"Erro ao gravar: {errors[path]}" if path in errors else None)
+
+    cache_dir = item_service.pdf_metadata_cache_dir()
+    try:
+        stages: dict[Future, tuple] = {}
+        for path in paths:
+            if not Path(path).is_file():
+                report(path, "Arquivo não encontrado")
+                continue
+            # O texto completo é lido junto com os identificadores, para o índice de texto completo
+            stages[parse_pool.submit(pdf_metadata.extract, path, cache_dir, full_text=True)] = ('parse', path, None)
+
+        pending = set(stages)
+        while pending:
+            completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                stage, path, pdf_info = stages.pop(future)
+                if stage == 'parse':
+                    try:
+                        pdf_info = future.result()
+                    except Exception as e:
+                        report(path, f"Erro ao ler PDF: {e}")
+                        continue
+                    if pdf_info['doi']:
+                        lookup = lookup_pool.submit(metadata_resolver.resolve, pdf_info['doi'])
+                        stages[lookup] = ('lookup', path, pdf_info)
+                        pending.add(lookup)
+                        continue
+                    crossref_data = None
+                else:
+                    try:
+                        crossref_data = future.result()
+                    except Exception as e:
+                        report(path, f"Erro ao consultar metadados: {e}")
+                        continue
+                ready.append((path, item_service.build_item_from_pdf(pdf_info, crossref_data), pdf_info['content_hash'],
+                              pdf_info['fulltext']))
+
+            if len(ready) >= batch_size or (ready and not pending):
+                flush()
+    finally:
+        parse_pool.shutdown(wait=True, cancel_futures=True)
+        lookup_pool.shutdown(wait=True, cancel_futures=True)
+
+    return result
@@ -0,0 +1,109 @@
+# core/services/item_cache.py
+"""
+Cache LRU limitado de itens completos (`Item`) para leituras repetidas.
+
+Montar um item custa várias consultas (item, metadados, criadores, tags e
+anexos); a GUI e os plugins leem os mesmos itens muitas vezes. O cache é de
+leitura direta: `get_many` devolve os itens guardados e busca os ausentes de
+uma vez com `item_repository.get_many`.
+
+A invalidação é feita pelos serviços, no mesmo ponto em que disparam os
+hooks dos plugins (alteração, exclusão, fusão, tags e anexos), de forma
+síncrona: a próxima leitura já vê o banco atualizado. Uma leitura que
+começou antes de uma invalidação não guarda o resultado, que poderia estar
+desatualizado. Quem recebe um item recebe uma cópia, então alterá-lo não
+afeta o cache.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+
+from .. import database
+from ..data_access import item_repository
+from ..models import Item
+
+DEFAULT_CAPACITY = 512
+
+
+class ItemCache:
+    """Cache LRU de itens, seguro para várias threads, com estatísticas de uso."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        # Incrementado a cada invalidação, para descartar leituras concorrentes
+        self._version = 0
+        self._db_generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_database_locked(self):
+        # Um banco reaberto (ou outro arquivo) invalida tudo
+        if self._db_generation != database.manager.generation:
+            self._items.clear()
+            self._db_generation = database.manager.generation
+
+    def get_many(self, item_ids: list[int], count_stats: bool = True) -> list[Item]:
+        """Itens na ordem dos IDs informados (inexistentes são ignorados), buscando os ausentes em lote."""
+        found = {}
+        # IDs repetidos no pedido contam uma única vez nas estatísticas
+        unique_ids = list(dict.fromkeys(item_ids))
+        with self._lock:
+            self._check_database_locked()
+            for item_id in unique_ids:
+                item = self._items.get(item_id)
+                if item is not None:
+                    self._items.move_to_end(item_id)
+                    found[item_id] = item
+            missing = [item_id for item_id in unique_ids if item_id not in found]
+            if count_stats:
+                self.hits += len(found)
+                self.misses += len(missing)
+            version = self._version
+
+        if missing:
+            loaded = {data['id']: Item(**data) for data in item_repository.get_many(missing)}
+            with self._lock:
+                if version == self._version:
+                    self._store_locked(loaded)
+            found.update(loaded)
+        return [copy.deepcopy(found[item_id]) for item_id in item_ids if item_id in found]
+
+    def _store_locked(self, items: dict):
+        self._items.update(items)
+        for item_id in items:
+            self._items.move_to_end(item_id)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def prefetch(self, item_ids: list[int]) -> None:
+        """Carrega no cache, em uma única busca, os itens ainda ausentes (sem contar nas estatísticas)."""
+        self.get_many(item_ids, count_stats=False)
+
+    def invalidate(self, item_ids) -> None:
+        """Descarta os itens informados."""
+        with self._lock:
+            self._version += 1
+            for item_id in item_ids:
+                self._items.pop(item_id, None)
+
+    def clear(self) -> None:
+        """Descarta todos os itens e zera as estatísticas."""
+        with self._lock:
+            self._version += 1
+            self._items.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Acertos, falhas, descartes por capacidade, tamanho atual e capacidade."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._items), 'capacity': self.capacity}
+
+
+# Instância global única do cache de itens
+cache = ItemCache()
@@ -1,24 +1,23 @@
 # core/services/item_service.py
-import time
-import re
-import requests
+import os
+import json
+import base64
 from pathlib import Path
-from PyPDF2 import PdfReader
 
 from ..models import Item, Creator
-from ..data_access import item_repository, attachment_repository
+from .. import database, id_allocator
+from ..data_access import item_repository, attachment_repository, search_repository, summary_repository, fulltext_repository
 from ..plugin_manager import manager as plugin_manager
-from . import attachment_service
+from . import attachment_service, fulltext_service, item_cache
 
 def add_item(item: Item) -> Item:
     """
     Adiciona um novo item à biblioteca, orquestrando a lógica de negócio.
     """
-    # Gerar IDs
-    item.id = int(time.time() * 1_000_000)
-    if item.creators:
-        for index, creator in enumerate(item.creators):
-            creator.id = int(time.time() * 1_000_000) + index
+    # Gerar IDs: um para o item e um para cada criador
+    item.id = id_allocator.reserve(1 + len(item.creators))
+    for index, creator in enumerate(item.creators, start=1):
+        creator.id = item.id + index
 
     # Garantir que o título do item esteja sincronizado com os metadados
     if item.metadata:
@@ -29,18 +28,182 @@ def add_item(item: Item) -> Item:
     plugin_manager.hook_item_added(item.id)
     return item
 
+def add_items(items: list[Item]) -> list[Item]:
+    """
+    Adiciona um lote de itens em uma única transação e dispara o hook dos
+    plugins uma única vez para o lote inteiro.
+    """
+    if not items:
+        return []
+
+    _assign_batch_ids(items)
+    item_repository.add_many(items)
+
+    plugin_manager.hook_items_added([item.id for item in items])
+    return items
+
+def _assign_batch_ids(items: list[Item]) -> None:
+    # Reservar de uma vez os IDs de todos os itens e criadores do lote
+    next_id = id_allocator.reserve(len(items) + sum(len(item.creators) for item in items))
+    for item in items:
+        item.id = next_id
+        next_id += 1
+    for item in items:
+        for creator in item.creators:
+            creator.id = next_id
+            next_id += 1
+        if item.metadata:
+            item.metadata['title'] = item.title
+
+def add_items_with_files(entries: list[tuple]) -> tuple[list[Item], list[tuple[str, str]]]:
+    """
+    Adiciona itens, cada um com um arquivo anexado, dados como (item,
+    caminho, hash já calculado ou None), opcionalmente seguidos do texto já
+    extraído do arquivo (`pdf_text.from_pages`), que é gravado no índice de
+    texto completo na mesma transação. Os arquivos são guardados primeiro;
+    o que não puder ser guardado fica de fora, com o seu erro, sem afetar os
+    demais. Os itens restantes e seus anexos são gravados em uma única
+    transação: se ela falhar, nada fica gravado e a exceção é propagada.
+
+    Retorna (itens gravados, [(caminho, erro), ...]).
+    """
+    failed = []
+    kept = []
+    texts = {}
+    with attachment_service.staged_files([(path, digest) for _, path, digest, *_ in entries]) as staged:
+        for (item, path, _, *fulltext), entry in zip(entries, staged):
+            if isinstance(entry, Exception):
+                failed.append((path, str(entry)))
+            else:
+                kept.append((item, *entry))
+                if fulltext and fulltext[0] is not None:
+                    texts[entry[1]] = fulltext[0]
+        if kept:
+            items = [item for item, _, _ in kept]
+            _assign_batch_ids(items)
+            for item, attachment, _ in kept:
+                attachment.item_id = item.id
+            with database.transaction() as con:
+                item_repository.insert_many(con, items)
+                attachment_repository.add_many([
+                    (attachment.id, attachment.item_id, attachment.path, attachment.mime_type, digest)
+                    for _, attachment, digest in kept
+                ])
+                fulltext_service.store_extracted(list(texts.items()))
+
+    if not kept:
+        return [], failed
+    search_repository.merge_delta_if_needed()
+    fulltext_repository.merge_delta_if_needed()
+    fulltext_service.schedule_indexing()
+    for item, attachment, _ in kept:
+        item.attachments.append(attachment)
+    plugin_manager.hook_items_added([item.id for item, _, _ in kept])
+    return [item for item, _, _ in kept], failed
+
+def normalize_url(url: str) -> str:
+    """Forma da URL usada na deduplicação: sem espaços, fragmento ou barra final."""
+    return url.strip().split('#', 1)[0].rstrip('/')
+
+def item_from_capture(data: dict) -> Item:
+    """
+    Converte os dados capturados pela extensão do navegador em um item.
+    Levanta ValueError se a captura não tiver o formato esperado.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Cada item deve ser um objeto JSON.")
+    metadata = data.get('metadata') or {}
+    if not isinstance(metadata, dict):
+        raise ValueError("'metadata' deve ser um objeto JSON.")
+    creators = data.get('creators') or []
+    if not isinstance(creators, list) or not all(isinstance(creator, dict) for creator in creators):
+        raise ValueError("'creators' deve ser uma lista de objetos JSON.")
+    item_type = data.get('item_type') or 'journalArticle'
+    if not isinstance(item_type, str):
+        raise ValueError("'item_type' deve ser um texto.")
+
+    metadata = {key: str(value) for key, value in metadata.items() if value is not None}
+    item_creators = []
+    for creator in creators:
+        fields = {key: creator.get(key) for key in ('first_name', 'last_name', 'creator_type')}
+        if not all(value is None or isinstance(value, str) for value in fields.values()):
+            raise ValueError("Os nomes dos criadores devem ser textos.")
+        item_creators.append(Creator(first_name=fields['first_name'], last_name=fields['last_name'],
+                                     creator_type=fields['creator_type'] or 'author'))
+    return Item(item_type=item_type, title=metadata.get('title'), creators=item_creators, metadata=metadata)
+
+def save_captured_items(captures: list[dict | Item]) -> list[dict]:
+    """
+    Salva um lote de capturas da extensão do navegador, descartando as que
+    já existem na biblioteca (ou que se repetem no próprio lote) pelo DOI ou
+    pela URL. As capturas podem vir já convertidas por `item_from_capture`.
+    Os novos itens são gravados com uma única chamada a `add_items`.
+    Retorna, na ordem das capturas, {'item_id', 'duplicate'}.
+    """
+    # Importado aqui para que carregar a API não pague o custo do requests
+    from ..metadata_resolver import normalize_doi
+
+    items = [capture if isinstance(capture, Item) else item_from_capture(capture) for capture in captures]
+    keys = []
+    for item in items:
+        doi = normalize_doi(item.metadata['doi']) if item.metadata.get('doi') else None
+        url = normalize_url(item.metadata['url']) if item.metadata.get('url') else None
+        keys.append((('doi', doi) if doi else None, ('url', url) if url else None))
+
+    known = item_repository.find_by_identifiers(
+        [doi_key[1] for doi_key, _ in keys if doi_key],
+        [url_key[1] for _, url_key in keys if url_key]
+    )
+
+    # Capturas repetidas no lote apontam para o primeiro item novo equivalente
+    new_items = []
+    owners = []
+    for item, item_keys in zip(items, keys):
+        owner = next((known[key] for key in item_keys if key in known), None)
+        if owner is None:
+            owner = item
+            new_items.append(item)
+            for key in item_keys:
+                if key:
+                    known[key] = item
+        owners.append(owner)
+
+    add_items(new_items)
+    results = []
+    for item, owner in zip(items, owners):
+        if owner is item:
+            results.append({'item_id': item.id, 'duplicate': False})
+        else:
+            results.append({'item_id': owner.id if isinstance(owner, Item) else owner, 'duplicate': True})
+    return results
+
 def get_item(item_id: int) -> Item | None:
-    """Recupera um item completo, convertendo dados brutos em um objeto de modelo."""
-    item_data = item_repository.get(item_id)
-    if not item_data:
-        return None
+    """Recupera um item completo, passando pelo cache de itens."""
+    items = item_cache.cache.get_many([item_id])
+    return items[0] if items else None
 
-    return Item(**item_data)
+def get_items(item_ids: list[int]) -> list[Item]:
+    """
+    Recupera vários itens completos; os ausentes do cache são buscados com
+    um número constante de consultas.
+    """
+    return item_cache.cache.get_many(item_ids)
+
+def prefetch_items(item_ids: list[int]) -> None:
+    """Carrega no cache, de uma vez, os itens que provavelmente serão lidos em seguida."""
+    item_cache.cache.prefetch(item_ids)
+
+def get_item_cache_stats() -> dict:
+    """Estatísticas do cache de itens."""
+    return item_cache.cache.stats()
 
 def delete_item(item_id: int) -> bool:
     """Deleta um item e chama o hook do plugin."""
+    content_hashes = attachment_repository.content_hashes_for_item(item_id)
     deleted = item_repository.delete(item_id)
+    item_cache.cache.invalidate([item_id])
     if deleted:
+        attachment_service.release_contents(content_hashes)
         plugin_manager.hook_item_deleted(item_id)
     return deleted
 
@@ -50,17 +213,105 @@ def update_item(item_id: int, update_data: dict) -> bool:
         return False
 
     item_repository.update(item_id, update_data)
+    item_cache.cache.invalidate([item_id])
     plugin_manager.hook_item_updated(item_id)
     return True
 
-def search_items(query: str) -> list[dict]:
-    """Busca itens."""
-    return item_repository.search(query)
+def get_metadata_fields(fields: list[str]) -> dict[int, dict]:
+    """Retorna os campos de metadados informados dos itens que possuem o primeiro deles."""
+    return item_repository.get_metadata_fields(fields)
+
+def search_items(query: str, limit: int | None = None, offset: int = 0, fulltext: bool = False) -> list[dict]:
+    """
+    Busca itens, ordenados por relevância. Com `fulltext`, também busca no
+    texto dos PDFs anexados: cada resultado ganha 'fulltext_hits' (anexos e
+    páginas em que a consulta aparece), e os itens que só casam pelo texto
+    dos anexos vêm depois dos que casam pelos próprios dados.
+    """
+    if not fulltext:
+        return item_repository.search(query, limit, offset)
+
+    results = item_repository.search(query)
+    hits = {result['id']: result for result in fulltext_service.search(query)}
+    for result in results:
+        result['fulltext_hits'] = hits.pop(result['id'], {}).get('fulltext_hits', [])
+    results.extend(hits.values())
+    return results[offset:offset + limit if limit is not None else None]
+
+def rebuild_search_index() -> None:
+    """Reconstrói o índice de busca textual."""
+    search_repository.rebuild()
+
+def rebuild_item_summary() -> None:
+    """Reconstrói o resumo materializado usado nas listagens."""
+    summary_repository.rebuild()
 
 def get_all_items_summary() -> list[dict]:
     """Retorna um resumo de todos os itens."""
     return item_repository.get_all_summary()
 
+# Ordenações cujo padrão é decrescente (as demais são crescentes)
+_DESCENDING_BY_DEFAULT = {'date_added', 'date_modified', 'year'}
+
+def _encode_cursor(sort: str, descending: bool, key, item_id: int) -> str:
+    if hasattr(key, 'isoformat'):
+        key = key.isoformat(sep=' ')
+    payload = json.dumps([sort, descending, key, item_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+def _decode_cursor(cursor: str, sort: str, descending: bool) -> tuple:
+    try:
+        cursor_sort, cursor_descending, key, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor!r}") from e
+    if cursor_sort != sort or cursor_descending != descending:
+        raise ValueError("O cursor pertence a uma ordenação diferente.")
+    return key, item_id
+
+def list_items(sort: str = 'date_added', descending: bool | None = None, after: str | None = None,
+               limit: int = 100, collection_id: int | None = None) -> dict:
+    """
+    Retorna uma página de resumos de itens, com paginação por cursor.
+    O resultado contém 'items' e 'next_cursor' (None na última página).
+    """
+    if sort not in item_repository.SORT_KEYS:
+        raise ValueError(f"Ordenação não suportada: {sort!r}")
+    if descending is None:
+        descending = sort in _DESCENDING_BY_DEFAULT
+
+    after_key = _decode_cursor(after, sort, descending) if after else None
+    rows = item_repository.list_summaries(sort, descending, limit, after_key, collection_id)
+
+    next_cursor = None
+    if rows and len(rows) == limit:
+        last_summary, last_key = rows[-1]
+        next_cursor = _encode_cursor(sort, descending, last_key, last_summary['id'])
+    return {'items': [summary for summary, _ in rows], 'next_cursor': next_cursor}
+
+def pdf_metadata_cache_dir() -> str:
+    """Diretório do cache de extração de PDFs, indexado pelo hash do conteúdo."""
+    return os.path.join(database.DATA_DIR, "cache", "pdf_metadata")
+
+def build_item_from_pdf(pdf_info: dict, crossref_data: dict | None = None) -> Item:
+    """Monta um item a partir dos dados extraídos de um PDF e, se houver, do Crossref."""
+    item = Item(title=pdf_info['title'], item_type='journalArticle')
+    item.metadata['source_file'] = Path(pdf_info['path']).name
+
+    if pdf_info['doi']:
+        item.metadata['doi'] = pdf_info['doi']
+    if pdf_info.get('arxiv_id'):
+        item.metadata['arxiv_id'] = pdf_info['arxiv_id']
+        if pdf_info.get('arxiv_version'):
+            item.metadata['version'] = str(pdf_info['arxiv_version'])
+    if pdf_info.get('isbn'):
+        item.metadata['isbn'] = pdf_info['isbn']
+    if crossref_data:
+        item.title = crossref_data.get('title', [item.title])[0]
+        item.metadata['title'] = item.title
+        if 'author' in crossref_data:
+            item.creators = [Creator(first_name=author.get('given'), last_name=author.get('family'), creator_type='author') for author in crossref_data['author']]
+    return item
+
 def create_item_from_pdf(file_path_str: str) -> Item | None:
     """
     Cria um item a partir de um PDF, extraindo metadados e anexando o arquivo.
@@ -69,37 +320,15 @@ def create_item_from_pdf(file_path_str: str) -> Item | None:
     if not file_path.exists():
         return None
 
+    # PyPDF2 e requests só são importados quando um PDF é de fato processado
+    from .. import metadata_resolver, pdf_metadata
+
     try:
-        reader = PdfReader(file_path)
-        pdf_meta = reader.metadata
-        title = pdf_meta.title or file_path.stem.replace('_', ' ').replace('-', ' ')
-
-        doi = None
-        for page in reader.pages:
-            text = page.extract_text()
-            match = re.search(r'10\.\d{4,9}/[-._;()/:A-Z0-9]+', text, re.IGNORECASE)
-            if match:
-                doi = match.group(0)
-                break
-
-        item = Item(title=title, item_type='journalArticle')
-        item.metadata['source_file'] = file_path.name
-
-        if doi:
-            item.metadata['doi'] = doi
-            try:
-                resp = requests.get(f"https://api.crossref.org/works/{doi}")
-                if resp.ok:
-                    crossref_data = resp.json()['message']
-                    item.title = crossref_data.get('title', [item.title])[0]
-                    item.metadata['title'] = item.title
-                    if 'author' in crossref_data:
-                        item.creators = [Creator(first_name=author.get('given'), last_name=author.get('family'), creator_type='author') for author in crossref_data['author']]
-            except requests.RequestException:
-                pass
-
-        new_item = add_item(item)
-        attachment_service.add_attachment(new_item.id, file_path_str)
+        # O texto lido na busca de identificadores vai direto para o índice de texto completo
+        pdf_info = pdf_metadata.extract(file_path_str, pdf_metadata_cache_dir(), full_text=True)
+        crossref_data = metadata_resolver.resolve(pdf_info['doi']) if pdf_info['doi'] else None
+        new_item = add_item(build_item_from_pdf(pdf_info, crossref_data))
+        attachment_service.add_attachments([(new_item.id, file_path_str, pdf_info['content_hash'], pdf_info['fulltext'])])
         return get_item(new_item.id)
 
     except Exception as e:
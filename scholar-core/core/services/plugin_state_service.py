@@ -0,0 +1,10 @@
+# core/services/plugin_state_service.py
+from ..data_access import plugin_state_repository
+
+def get_plugin_state(plugin: str) -> dict[str, tuple]:
+    """Retorna o estado persistido de um plugin como {chave: (valor, atualizado_em)}."""
+    return plugin_state_repository.get(plugin)
+
+def set_plugin_state(plugin: str, values: dict[str, str]) -> None:
+    """Persiste valores no estado de um plugin, substituindo chaves existentes."""
+    plugin_state_repository.set_many(plugin, {key: str(value) for key, value in values.items()})
@@ -1,11 +1,12 @@
 # core/services/tag_service.py
-import time
+from .. import id_allocator
 from ..data_access import tag_repository, item_repository
 from ..models import Tag
+from . import item_cache
 
 def add_tag(name: str) -> int:
     """Adiciona uma nova tag, gerando um ID se necessário."""
-    tag_id = int(time.time() * 1_000_000)
+    tag_id = id_allocator.next_id()
     return tag_repository.add(name, tag_id)
 
 def add_tag_to_item(item_id: int, tag_id: int) -> bool:
@@ -13,7 +14,9 @@ def add_tag_to_item(item_id: int, tag_id: int) -> bool:
     if not item_repository.item_exists(item_id) or not tag_repository.tag_exists(tag_id):
         return False
 
-    return tag_repository.add_to_item(item_id, tag_id)
+    added = tag_repository.add_to_item(item_id, tag_id)
+    item_cache.cache.invalidate([item_id])
+    return added
 
 def get_item_tags(item_id: int) -> list:
     """Retorna as tags de um item."""
@@ -0,0 +1,72 @@
+# core/tokenizer.py
+"""
+Tokenização e stemming leves usados pelo índice de busca textual.
+
+O mesmo pipeline é aplicado na indexação e na consulta: normalização Unicode
+(remoção de acentos), casefold, separação em palavras, remoção de stopwords
+(inglês e português) e um stemmer de sufixos simples.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were with
+ao aos as da das de do dos e em na nas no nos o os ou para pela pelas pelo pelos por que se um uma
+""".split())
+
+# (sufixo, substituição, tamanho mínimo do radical resultante)
+_SUFFIXES = (
+    ('coes', 'cao', 3),
+    ('ies', 'y', 3),
+    ('sses', 'ss', 3),
+    ('ness', '', 4),
+    ('ments', 'ment', 4),
+    ('ings', '', 4),
+    ('ing', '', 4),
+    ('edly', '', 4),
+    ('ed', '', 4),
+    ('ly', '', 4),
+    ('oes', 'ao', 3),
+    ('aes', 'ao', 3),
+    ('es', 'e', 4),
+    ('s', '', 3),
+)
+
+
+def normalize(text: str) -> str:
+    """Remove acentos e aplica casefold."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Reduz uma palavra normalizada ao seu radical aproximado."""
+    if word.isdigit():
+        return word
+    for suffix, replacement, min_stem in _SUFFIXES:
+        if suffix == 's' and word.endswith('ss'):
+            continue
+        if word.endswith(suffix):
+            base = word[:-len(suffix)]
+            if len(base) >= min_stem:
+                return base + replacement
+    return word
+
+
+def words(text: str | None) -> list[str]:
+    """Divide o texto em palavras normalizadas, sem stemming nem stopwords."""
+    if not text:
+        return []
+    return _WORD_RE.findall(normalize(text))
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Retorna os termos indexáveis de um texto."""
+    return [stem(word) for word in words(text) if word not in STOPWORDS]
@@ -0,0 +1,78 @@
+import queue
+import threading
+from kivy.clock import Clock
+from core import api
+
+class ItemListLoader:
+    """
+    Carrega a lista de itens em janelas, fora da thread principal do Kivy.
+
+    Cada janela é uma página de `api.list_items` (paginação por cursor, então
+    buscar a página seguinte custa o mesmo em qualquer profundidade). Uma
+    única thread de trabalho atende os pedidos em ordem; trocar de coleção
+    incrementa a geração, e pedidos ou resultados de gerações antigas são
+    descartados sem chegar à interface. Os resultados são entregues na thread
+    principal via `Clock`.
+    """
+
+    PAGE_SIZE = 200
+
+    def __init__(self, on_page, on_error):
+        # on_page(itens, reiniciar) e on_error(exceção) são chamados na thread principal
+        self._on_page = on_page
+        self._on_error = on_error
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._collection_id = None
+        self._next_cursor = None
+        self._loading = False
+        self._requests = queue.Queue()
+        threading.Thread(target=self._run, name="item-list-loader", daemon=True).start()
+
+    def load(self, collection_id=None):
+        """Começa a carregar a coleção (None = todos os itens), descartando cargas anteriores."""
+        with self._lock:
+            self._generation += 1
+            self._collection_id = collection_id
+            self._next_cursor = None
+            self._loading = True
+            self._requests.put((self._generation, collection_id, None))
+
+    def load_more(self):
+        """Pede a próxima janela, se houver uma e nenhuma estiver a caminho."""
+        with self._lock:
+            if self._loading or self._next_cursor is None:
+                return
+            self._loading = True
+            self._requests.put((self._generation, self._collection_id, self._next_cursor))
+
+    def _is_current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def _run(self):
+        while True:
+            generation, collection_id, cursor = self._requests.get()
+            if not self._is_current(generation):
+                continue
+            try:
+                page = api.list_items(after=cursor, limit=self.PAGE_SIZE, collection_id=collection_id)
+            except Exception as e:
+                Clock.schedule_once(lambda dt, g=generation, e=e: self._deliver_error(g, e))
+                continue
+            Clock.schedule_once(lambda dt, g=generation, p=page, reset=cursor is None: self._deliver(g, p, reset))
+
+    def _deliver(self, generation, page, reset):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._next_cursor = page['next_cursor']
+            self._loading = False
+        self._on_page(page['items'], reset)
+
+    def _deliver_error(self, generation, error):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._loading = False
+        self._on_error(error)
@@ -0,0 +1,89 @@
+from kivy.clock import Clock
+
+class ItemRows:
+    """
+    Índice de linhas da lista de itens: mapeia item_id para a posição em
+    `data` do RecycleView, para que mudanças pontuais (selo de atualização,
+    título editado, ...) custem O(k) em vez de percorrer a lista inteira.
+
+    As linhas alteradas são modificadas no próprio dicionário e acumuladas;
+    uma única atualização por quadro avisa o RecycleView apenas dos índices
+    modificados, e só as linhas visíveis são redesenhadas.
+
+    Marcadores booleanos (como `update_available`) são guardados por item,
+    então linhas carregadas depois (janelas seguintes da lista) já chegam
+    com o estado correto.
+    """
+
+    def __init__(self, recycle_view):
+        self.view = recycle_view
+        self._index = {}
+        self._flags = {}
+        self._dirty = set()
+        self._refresh_trigger = Clock.create_trigger(self._refresh)
+
+    def _apply_flags(self, rows):
+        for field, item_ids in self._flags.items():
+            for row in rows:
+                row[field] = row['item_id'] in item_ids
+
+    def reset(self, rows):
+        """Substitui todas as linhas."""
+        self._apply_flags(rows)
+        self._index = {row['item_id']: index for index, row in enumerate(rows)}
+        self._dirty.clear()
+        self.view.data = rows
+
+    def extend(self, rows):
+        """Acrescenta linhas ao fim da lista (a próxima janela carregada)."""
+        self._apply_flags(rows)
+        start = len(self.view.data)
+        self._index.update((row['item_id'], start + offset) for offset, row in enumerate(rows))
+        self.view.data.extend(rows)
+
+    def update(self, item_id, **changes) -> bool:
+        """Altera campos da linha de um item; retorna False se ele não estiver carregado."""
+        index = self._index.get(item_id)
+        if index is None:
+            return False
+        self.view.data[index].update(changes)
+        self._dirty.add(index)
+        self._refresh_trigger()
+        return True
+
+    def remove(self, item_id) -> bool:
+        """Remove a linha de um item, reindexando as linhas seguintes."""
+        index = self._index.pop(item_id, None)
+        if index is None:
+            return False
+        self._refresh()
+        del self.view.data[index]
+        for row in self.view.data[index:]:
+            self._index[row['item_id']] -= 1
+        return True
+
+    def neighbors(self, item_id, radius):
+        """IDs das linhas até `radius` posições antes e depois da linha do item."""
+        index = self._index.get(item_id)
+        if index is None:
+            return []
+        data = self.view.data
+        return [row['item_id'] for row in data[max(0, index - radius):index + radius + 1] if row['item_id'] != item_id]
+
+    def set_flag(self, field, item_ids):
+        """
+        Define o conjunto de itens com o marcador `field` ligado; os demais
+        ficam desligados. Só as linhas cujo estado muda são tocadas.
+        """
+        new_ids = set(item_ids)
+        old_ids = self._flags.get(field, set())
+        self._flags[field] = new_ids
+        for item_id in old_ids ^ new_ids:
+            self.update(item_id, **{field: item_id in new_ids})
+
+    def _refresh(self, dt=None):
+        # Cada índice vira um aviso de modificação; o RecycleView junta todos
+        # os avisos do quadro em uma única atualização
+        for index in sorted(self._dirty):
+            self.view.refresh_from_data(modified=slice(index, index + 1))
+        self._dirty.clear()
@@ -8,6 +8,8 @@ from .widgets.detailview import DetailView
 from .widgets.infopopup import InfoPopup
 from .widgets.collectionstree import CollectionsTree
 from .widgets.welcomepopup import WelcomePopup
+from .item_loader import ItemListLoader
+from .item_rows import ItemRows
 import traceback
 import threading
 import os
@@ -16,29 +18,54 @@ class ScholarCoreRoot(BoxLayout):
     item_list = ObjectProperty(None)
     detail_view = ObjectProperty(None)
 
+    # Distância do fim da lista (em fração da rolagem) que dispara a próxima janela
+    LOAD_MORE_THRESHOLD = 0.1
+    # Linhas vizinhas à seleção carregadas antecipadamente no cache de itens
+    PREFETCH_RADIUS = 5
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        Clock.schedule_once(self.load_items)
+        self.loader = ItemListLoader(self._on_items_page, self._on_items_error)
+        self.rows = None
+        self._background_checks_started = False
+        Clock.schedule_once(self._start)
+
+    def _start(self, dt=None):
+        self.rows = ItemRows(self.item_list)
+        self.item_list.bind(scroll_y=self._on_item_list_scroll)
+        from core.plugin_manager import manager as plugin_manager
+        plugin_manager.add_listener(self)
+        self.load_items()
 
     def load_items(self, dt=None, collection_id=None):
-        try:
-            if collection_id is None:
-                summaries = api.get_all_items_summary()
-            else:
-                summaries = api.get_items_in_collection(collection_id)
+        """
+        Mostra os itens de uma coleção (ou todos). A lista é esvaziada na hora
+        e preenchida em janelas pelo carregador em segundo plano.
+        """
+        self.rows.reset([])
+        self.loader.load(collection_id)
+
+    def _on_items_page(self, summaries, reset):
+        # Formatar dados para o RecycleView
+        rows = [{
+            'item_id': s['id'],
+            'title': s['title'] or "Sem título",
+            'author_text': s['author_text'],
+            'update_available': False # O estado inicial é sem atualização
+        } for s in summaries]
+        if reset:
+            self.rows.reset(rows)
+            self.item_list.scroll_y = 1
+            self.trigger_background_checks()
+        else:
+            self.rows.extend(rows)
 
-            # Formatar dados para o RecycleView
-            self.item_list.data = [{
-                'item_id': s['id'],
-                'title': s['title'] or "Sem título",
-                'author_text': s['author_text'],
-                'update_available': False # O estado inicial é sem atualização
-            } for s in summaries]
+    def _on_items_error(self, error):
+        self.show_popup(f"Falha ao carregar itens:\n{error}", "Erro de Banco de Dados")
 
-            self.item_list.refresh_from_data()
-            self.trigger_background_checks()
-        except Exception as e:
-            self.show_popup(f"Falha ao carregar itens:\n{e}", "Erro de Banco de Dados")
+    def _on_item_list_scroll(self, instance, scroll_y):
+        if scroll_y <= self.LOAD_MORE_THRESHOLD:
+            self.loader.load_more()
 
     def show_details_for_item(self, item_id):
         try:
@@ -61,25 +88,45 @@ class ScholarCoreRoot(BoxLayout):
 
             attachments_text = "\n".join([att.path for att in item.attachments])
             self.detail_view.attachments_text = attachments_text
+            self.prefetch_neighbors(item_id)
         except Exception as e:
             self.show_popup(f"Falha ao buscar detalhes do item:\n{e}", "Erro")
 
+    def prefetch_neighbors(self, item_id):
+        """Carrega em segundo plano os itens vizinhos, para que o próximo clique seja imediato."""
+        neighbor_ids = self.rows.neighbors(item_id, self.PREFETCH_RADIUS)
+        if neighbor_ids:
+            threading.Thread(target=api.prefetch_items, args=(neighbor_ids,), daemon=True).start()
+
     def trigger_background_checks(self):
+        """Inicia as verificações de fundo dos plugins uma única vez por sessão."""
+        if self._background_checks_started:
+            return
+        self._background_checks_started = True
         from core.plugin_manager import manager as plugin_manager
-        threading.Thread(target=plugin_manager.run_background_checks).start()
+        threading.Thread(target=plugin_manager.run_background_checks, daemon=True).start()
 
     def mark_items_as_updatable(self, item_ids: list):
-        """Atualiza a UI para marcar itens que têm uma atualização disponível."""
-        # A alteração precisa ser feita nos dados, não nos widgets filhos.
-        for item_data in self.item_list.data:
-            if item_data['item_id'] in item_ids:
-                item_data['update_available'] = True
-            else:
-                # Garantir que o estado seja resetado se não houver mais atualização
-                item_data['update_available'] = False
+        """
+        Marca os itens que têm uma atualização disponível (e desmarca os
+        demais). Pode ser chamado de qualquer thread; só as linhas cujo estado
+        muda são atualizadas, na thread principal.
+        """
+        item_ids = list(item_ids)
+        Clock.schedule_once(lambda dt: self.rows.set_flag('update_available', item_ids))
+
+    def on_item_updated(self, item_id):
+        """Evento de item alterado (thread do ouvinte): atualiza só a linha do item."""
+        item = api.get_item(item_id)
+        if item is None:
+            return
+        authors = [c.last_name for c in item.creators if c.creator_type == 'author']
+        changes = {'title': item.title or "Sem título", 'author_text': (authors[0] or '') if authors else ''}
+        Clock.schedule_once(lambda dt: self.rows.update(item_id, **changes))
 
-        # Forçar a atualização da view a partir dos dados modificados
-        self.item_list.refresh_from_data()
+    def on_item_deleted(self, item_id):
+        """Evento de item excluído (thread do ouvinte): remove a linha, se carregada."""
+        Clock.schedule_once(lambda dt: self.rows.remove(item_id))
 
     def show_popup(self, message, title="Aviso"):
         popup = InfoPopup(message=message, title=title)
@@ -96,7 +143,7 @@ class ScholarCoreRoot(BoxLayout):
                 self.detail_view.title = 'Selecione um item'
                 self.detail_view.authors = ''
                 self.detail_view.details = ''
-                self.load_items()
+                self.rows.remove(item_id_to_delete)
                 self.show_popup("Item excluído com sucesso.", "Sucesso")
             else:
                 self.show_popup("Não foi possível excluir o item.", "Erro")
@@ -124,6 +171,8 @@ class ScholarApp(App):
         root_widget = ScholarCoreRoot()
         from core.plugin_manager import manager as plugin_manager
         plugin_manager.initialize_gui(root_widget)
+        # Mantém a busca no texto dos anexos em dia, sem bloquear a interface
+        api.start_fulltext_indexing()
 
         self.root.add_widget(root_widget)
 
@@ -1,47 +1,165 @@
 from kivy.uix.treeview import TreeView, TreeViewLabel
-from kivy.properties import ObjectProperty
+from kivy.properties import ObjectProperty, StringProperty, NumericProperty, BooleanProperty
 from kivy.clock import Clock
 from kivy.app import App
 from core import api
+import threading
 
 class CollectionNode(TreeViewLabel):
     collection_id = ObjectProperty(None, allownone=True)
+    name = StringProperty('')
+    # Número de itens da coleção e de suas subcoleções
+    item_count = NumericProperty(0)
+    # Indica se as subcoleções já foram carregadas do banco
+    children_loaded = BooleanProperty(False)
+
+    def on_name(self, instance, value):
+        self._update_text()
+
+    def on_item_count(self, instance, value):
+        self._update_text()
+
+    def _update_text(self):
+        self.text = f"{self.name} ({self.item_count})" if self.item_count else self.name
 
 class CollectionsTree(TreeView):
+    """
+    Árvore de coleções carregada sob demanda: só as coleções raiz são lidas
+    na inicialização, e as subcoleções de um nó são lidas quando ele é
+    expandido. Alterações nas coleções chegam como eventos (o widget é
+    registrado como ouvinte no gerenciador de plugins) e são aplicadas nó a
+    nó, sem reconstruir a árvore. As contagens de itens vêm de uma única
+    consulta agregada, feita fora da thread principal.
+    """
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.size_hint_y = None
         self.bind(minimum_height=self.setter('height'))
         self.hide_root = True
         self.bind(selected_node=self.on_node_select)
+        self.bind(on_node_expand=self.on_node_expanded)
+        # Nós já criados, por ID de coleção
+        self._nodes = {}
+        self._counts = {}
+        self._refresh_counts_trigger = Clock.create_trigger(self.refresh_counts, 0.5)
         Clock.schedule_once(self.populate_tree)
 
+        from core.plugin_manager import manager as plugin_manager
+        plugin_manager.add_listener(self)
+
     def on_node_select(self, instance, value):
         """Chamado quando um nó da árvore é selecionado."""
         if value and hasattr(value, 'collection_id'):
             collection_id = value.collection_id
             App.get_running_app().root.load_items(collection_id=collection_id)
 
+    def on_node_expanded(self, instance, node):
+        """Carrega as subcoleções de um nó na primeira vez que ele é expandido."""
+        if not isinstance(node, CollectionNode) or node.collection_id is None or node.children_loaded:
+            return
+        node.children_loaded = True
+        for collection in api.get_child_collections(node.collection_id):
+            self._add_collection_node(collection, node)
+        self._sort_nodes(node)
+
     def populate_tree(self, dt=None):
+        """Monta a árvore com as coleções raiz; as demais são carregadas ao expandir."""
         for node in list(self.iterate_all_nodes()):
-            self.remove_node(node)
+            if node is not self.root:
+                self.remove_node(node)
+        self._nodes.clear()
 
         # Adicionar um nó "Todas as Publicações"
-        all_items_node = CollectionNode(text="Todas as Publicações", collection_id=None)
+        all_items_node = CollectionNode(name="Todas as Publicações", collection_id=None, children_loaded=True)
         self.add_node(all_items_node)
 
-        collections = api.get_all_collections()
-        nodes = {}
-
-        for collection in collections:
-            if collection.parent_id is None:
-                node = CollectionNode(text=collection.name, collection_id=collection.id)
-                self.add_node(node)
-                nodes[collection.id] = node
-
-        for collection in collections:
-            if collection.parent_id is not None and collection.parent_id in nodes:
-                parent_node = nodes[collection.parent_id]
-                node = CollectionNode(text=collection.name, collection_id=collection.id)
-                self.add_node(node, parent_node)
-                nodes[collection.id] = node
+        for collection in api.get_child_collections(None):
+            self._add_collection_node(collection, None)
+        self.refresh_counts()
+
+    def _add_collection_node(self, collection, parent_node):
+        node = CollectionNode(name=collection.name, collection_id=collection.id,
+                              item_count=self._counts.get(collection.id, 0))
+        self.add_node(node, parent_node)
+        # Mostra o controle de expansão antes de as subcoleções serem carregadas
+        node.is_leaf = collection.child_count == 0
+        self._nodes[collection.id] = node
+        return node
+
+    def _sort_nodes(self, parent_node):
+        """Mantém os filhos de um nó em ordem alfabética, com "Todas as Publicações" primeiro."""
+        parent_node = parent_node or self.root
+        parent_node.nodes.sort(key=lambda node: (node.collection_id is not None, node.name.lower()))
+        self._trigger_layout()
+
+    def _remove_collection_node(self, node):
+        removed_nodes = list(self.iterate_all_nodes(node))
+        for removed in removed_nodes:
+            self._nodes.pop(removed.collection_id, None)
+        was_selected = self.selected_node in removed_nodes
+        self.remove_node(node)
+        if was_selected:
+            # A coleção exibida deixou de estar na árvore: volta para todos os itens
+            App.get_running_app().root.load_items()
+
+    def _place_collection(self, collection_id):
+        """Insere, move ou renomeia o nó de uma coleção conforme o estado atual no banco."""
+        collection = api.get_collection(collection_id)
+        node = self._nodes.get(collection_id)
+        if collection is None:
+            if node is not None:
+                self._remove_collection_node(node)
+            return
+
+        parent_node = self._nodes.get(collection.parent_id) if collection.parent_id is not None else None
+        if node is not None:
+            node.name = collection.name
+            current_parent_id = getattr(node.parent_node, 'collection_id', None)
+            if current_parent_id == collection.parent_id:
+                node.is_leaf = collection.child_count == 0 and not node.nodes
+                self._sort_nodes(node.parent_node)
+                return
+            self._remove_collection_node(node)
+
+        if collection.parent_id is not None and (parent_node is None or not parent_node.children_loaded):
+            # O pai ainda não foi expandido: basta indicar que ele tem filhos
+            if parent_node is not None:
+                parent_node.is_leaf = False
+            return
+        self._add_collection_node(collection, parent_node)
+        self._sort_nodes(parent_node)
+
+    def _remove_collection(self, collection_id):
+        node = self._nodes.get(collection_id)
+        if node is not None:
+            self._remove_collection_node(node)
+
+    def refresh_counts(self, dt=None):
+        """Busca as contagens de itens em segundo plano e atualiza os nós criados."""
+        def fetch():
+            counts = api.get_collection_item_counts()
+            Clock.schedule_once(lambda dt: self._apply_counts(counts))
+        threading.Thread(target=fetch, daemon=True).start()
+
+    def _apply_counts(self, counts):
+        self._counts = {collection_id: count['recursive'] for collection_id, count in counts.items()}
+        for collection_id, node in self._nodes.items():
+            node.item_count = self._counts.get(collection_id, 0)
+
+    # Eventos do gerenciador de plugins, entregues na thread do ouvinte: o
+    # trabalho com os widgets é reagendado na thread principal do Kivy
+    def on_collection_added(self, collection_id):
+        Clock.schedule_once(lambda dt: self._place_collection(collection_id))
+        self._refresh_counts_trigger()
+
+    def on_collection_updated(self, collection_id):
+        Clock.schedule_once(lambda dt: self._place_collection(collection_id))
+        self._refresh_counts_trigger()
+
+    def on_collection_deleted(self, collection_id):
+        Clock.schedule_once(lambda dt: self._remove_collection(collection_id))
+        self._refresh_counts_trigger()
+
+    def on_item_deleted(self, item_id):
+        self._refresh_counts_trigger()
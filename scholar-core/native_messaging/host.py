@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
-import sys
+import contextlib
 import json
+import queue
 import struct
+import sys
+import threading
 from pathlib import Path
 
 # --- Adicionar o diretório do projeto ao sys.path ---
@@ -11,51 +14,161 @@ from pathlib import Path
 project_dir = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_dir))
 
-from core import api, database
+# O stdout é o canal do protocolo: as mensagens impressas pela aplicação
+# (e pelos plugins) durante a importação vão para o stderr.
+with contextlib.redirect_stdout(sys.stderr):
+    from core import api, database
+    from core.plugin_manager import manager as plugin_manager
+
+# Limite de mensagens processadas em uma única gravação
+MAX_BATCH_MESSAGES = 500
+_END_OF_INPUT = object()
+# Tempo máximo de espera pelos plugins antes de liberar o banco
+PLUGIN_FLUSH_TIMEOUT = 5.0
+_database_ready = False
 
 # --- Funções de Comunicação (Native Messaging) ---
 
-def get_message():
-    """Lê uma mensagem do stdin formatada para Native Messaging."""
-    raw_length = sys.stdin.buffer.read(4)
-    if not raw_length:
-        sys.exit(0)
+def get_message(stream):
+    """
+    Lê uma mensagem do stream formatada para Native Messaging. Retorna None
+    quando o navegador fecha a porta.
+    """
+    raw_length = stream.read(4)
+    if len(raw_length) < 4:
+        return None
     message_length = struct.unpack('@I', raw_length)[0]
-    message = sys.stdin.buffer.read(message_length).decode('utf-8')
+    message = stream.read(message_length).decode('utf-8')
     return json.loads(message)
 
-def send_message(message):
-    """Envia uma mensagem para o stdout formatada para Native Messaging."""
+def send_message(stream, message):
+    """Envia uma mensagem para o stream formatada para Native Messaging."""
     encoded_content = json.dumps(message).encode('utf-8')
     encoded_length = struct.pack('@I', len(encoded_content))
-    sys.stdout.buffer.write(encoded_length)
-    sys.stdout.buffer.write(encoded_content)
-    sys.stdout.buffer.flush()
+    stream.write(encoded_length)
+    stream.write(encoded_content)
+    stream.flush()
+
+def _read_messages(stream, inbox):
+    """Lê mensagens continuamente e as coloca na fila, para que cheguem enquanto um lote é gravado."""
+    try:
+        while True:
+            try:
+                message = get_message(stream)
+            except ValueError as e:
+                inbox.put(ValueError(f"Mensagem inválida: {e}"))
+                continue
+            if message is None:
+                break
+            inbox.put(message)
+    finally:
+        inbox.put(_END_OF_INPUT)
 
 # --- Lógica Principal ---
 
-def main():
-    # Inicializar o banco de dados se necessário (a primeira chamada fará isso)
-    database.initialize_database()
+def _captures_of(message):
+    """
+    Retorna os itens a salvar de uma mensagem, já convertidos, para que uma
+    captura malformada falhe só a própria requisição e não o lote inteiro.
+    Mensagens sem 'type' (o formato antigo, com os dados do item na própria
+    mensagem) valem como 'save'.
+    """
+    kind = message.get('type', 'save')
+    if kind == 'save':
+        captures = [message.get('item', message)]
+    elif kind == 'save_many':
+        captures = message.get('items')
+        if not isinstance(captures, list):
+            raise ValueError("'save_many' requer uma lista em 'items'.")
+    else:
+        raise ValueError(f"Tipo de mensagem desconhecido: {kind!r}")
+    return [api.item_from_capture(capture) for capture in captures]
+
+def _save(captures):
+    """
+    Grava as capturas abrindo o banco só durante o lote. A GUI e o host são
+    processos diferentes e o DuckDB só deixa um deles abrir o arquivo por
+    vez: com a biblioteca aberta em outro processo, a abertura falha e o
+    erro volta nas respostas do lote, e o host segue atendendo a porta.
+    """
+    global _database_ready
+    with database.session():
+        if not _database_ready:
+            database.initialize_database()
+            _database_ready = True
+        results = api.save_captured_items(captures)
+        # Os plugins notificados usam o banco: esperá-los antes de liberá-lo
+        plugin_manager.flush(PLUGIN_FLUSH_TIMEOUT)
+    return results
 
-    while True:
+def process_batch(messages):
+    """
+    Processa um lote de mensagens com uma única gravação no banco e retorna
+    uma resposta por mensagem, na mesma ordem, com o 'id' da requisição.
+    """
+    responses = [None] * len(messages)
+    saves = []
+    for index, message in enumerate(messages):
+        request_id = message.get('id') if isinstance(message, dict) else None
         try:
-            received_message = get_message()
-
-            # A mensagem recebida deve ser o item_data
-            item_id = api.add_item(received_message)
-
-            send_message({
-                "status": "success",
-                "item_id": item_id,
-                "message": f"Item '{received_message.get('metadata', {}).get('title')}' salvo com sucesso."
-            })
-
-        except Exception as e:
-            send_message({
-                "status": "error",
-                "message": str(e)
-            })
+            if isinstance(message, ValueError):
+                raise message
+            if not isinstance(message, dict):
+                raise ValueError("A mensagem deve ser um objeto JSON.")
+            if message.get('type') == 'ping':
+                responses[index] = {'id': request_id, 'status': 'success'}
+                continue
+            saves.append((index, _captures_of(message)))
+        except ValueError as e:
+            responses[index] = {'id': request_id, 'status': 'error', 'message': str(e)}
+
+    if not saves:
+        return responses
+
+    try:
+        results = _save([capture for _, captures in saves for capture in captures])
+    except Exception as e:
+        for index, _ in saves:
+            responses[index] = {'id': messages[index].get('id'), 'status': 'error', 'message': str(e)}
+        return responses
+
+    offset = 0
+    for index, captures in saves:
+        message = messages[index]
+        own_results = results[offset:offset + len(captures)]
+        offset += len(captures)
+        if message.get('type') == 'save_many':
+            responses[index] = {'id': message.get('id'), 'status': 'success', 'results': own_results}
+        else:
+            title = captures[0].title
+            text = "já existe na biblioteca" if own_results[0]['duplicate'] else "salvo com sucesso"
+            responses[index] = {'id': message.get('id'), 'status': 'success', **own_results[0],
+                                'message': f"Item '{title}' {text}."}
+    return responses
+
+def main():
+    output = sys.stdout.buffer
+    # A partir daqui, qualquer print da aplicação vai para o stderr
+    sys.stdout = sys.stderr
+
+    inbox = queue.Queue()
+    threading.Thread(target=_read_messages, args=(sys.stdin.buffer, inbox), daemon=True).start()
+
+    finished = False
+    while not finished:
+        # Espera a primeira mensagem e junta ao lote todas as que já chegaram
+        messages = [inbox.get()]
+        while len(messages) < MAX_BATCH_MESSAGES:
+            try:
+                messages.append(inbox.get_nowait())
+            except queue.Empty:
+                break
+        if _END_OF_INPUT in messages:
+            finished = True
+            messages = messages[:messages.index(_END_OF_INPUT)]
+
+        for response in process_batch(messages):
+            send_message(output, response)
 
 if __name__ == '__main__':
     main()
@@ -1,8 +1,54 @@
+import re
+import threading
+import time
 import requests
 import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
 from core import api
 
+# Extrai o identificador e a versão do <id> de uma entrada (ex: http://arxiv.org/abs/1234.5678v2)
+_ENTRY_ID_RE = re.compile(r'abs/(.+?)(?:v(\d+))?$')
+_VERSION_SUFFIX_RE = re.compile(r'v\d+$')
+# Versão local, como gravada nos metadados: "2" ou "v2"
+_LOCAL_VERSION_RE = re.compile(r'^v?(\d+)$', re.IGNORECASE)
+# Um identificador malformado faz a API rejeitar o lote inteiro, então só os válidos são enviados
+_VALID_ID_RE = re.compile(r'^(\d{4}\.\d{4,5}|[a-z][a-z\-]+(\.[A-Z]{2})?/\d{7})$')
+
+
+class _RateLimiter:
+    """Garante um intervalo mínimo entre o início de requisições, entre threads."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
 class ArxivVersionChecker:
+    API_URL = "http://export.arxiv.org/api/query"
+    STATE_NAME = "arxiv_version_checker"
+    # Identificadores por requisição ao `id_list` da API
+    API_BATCH_SIZE = 300
+    # Os termos de uso da API pedem uma requisição a cada 3 segundos, sem
+    # conexões simultâneas; os lotes grandes é que garantem a vazão
+    MIN_REQUEST_INTERVAL = 3.0  # segundos entre o início de duas requisições
+    REQUEST_TIMEOUT = 30
+    # Versões vistas há menos tempo que isto não são consultadas de novo
+    VERSION_TTL = timedelta(hours=24)
+
+    def __init__(self):
+        self.app_gui = None
+        self.session = requests.Session()
+        self._rate_limiter = _RateLimiter(self.MIN_REQUEST_INTERVAL)
+
     def get_name(self):
         return "arXiv Version Checker"
 
@@ -19,59 +65,125 @@ class ArxivVersionChecker:
         # Poderia também verificar a URL, etc.
         return False
 
-    def _get_latest_version_from_api(self, arxiv_id):
-        """Busca a versão mais recente de um artigo na API do arXiv."""
+    @staticmethod
+    def _base_id(arxiv_id):
+        """Remove um eventual sufixo de versão (ex: 1234.5678v2 -> 1234.5678)."""
+        return _VERSION_SUFFIX_RE.sub('', arxiv_id.strip())
+
+    @staticmethod
+    def _local_version(value):
+        """
+        Versão local de um item: 1 se ausente, ou None se o valor gravado não
+        for reconhecível (o item é ignorado em vez de interromper a verificação).
+        """
+        if value is None or str(value).strip() == '':
+            return 1
+        match = _LOCAL_VERSION_RE.match(str(value).strip())
+        return int(match.group(1)) if match else None
+
+    def _query_batch(self, arxiv_ids):
+        """Consulta um lote de identificadores na API e retorna {id: última versão}."""
+        self._rate_limiter.wait()
         try:
-            url = f"http://export.arxiv.org/api/query?id_list={arxiv_id}"
-            response = requests.get(url)
+            response = self.session.get(
+                self.API_URL,
+                params={'id_list': ",".join(arxiv_ids), 'max_results': len(arxiv_ids)},
+                timeout=self.REQUEST_TIMEOUT
+            )
             response.raise_for_status()
-
             root = ET.fromstring(response.content)
-            # Namespace da API do Atom
-            ns = {'atom': 'http://www.w3.org/2005/Atom'}
-            # O link do PDF contém o número da versão no final (ex: .../abs/1234.5678v2)
-            pdf_link = root.find('atom:entry/atom:id', ns).text
-
-            if 'v' in pdf_link:
-                version_str = pdf_link.split('v')[-1]
-                return int(version_str)
-            return 1 # Se não houver 'v', é a versão 1
-        except Exception:
-            return None # Falha na rede, parsing, etc.
+        except (requests.RequestException, ET.ParseError) as e:
+            print(f"Erro ao consultar a API do arXiv: {e}")
+            return {}
 
-    def check_for_update(self, item_id):
-        """Verifica se um único item tem uma atualização."""
-        item = api.get_item(item_id)
+        # Namespace da API do Atom
+        ns = {'atom': 'http://www.w3.org/2005/Atom'}
+        versions = {}
+        for entry in root.findall('atom:entry', ns):
+            entry_id = entry.findtext('atom:id', default='', namespaces=ns)
+            match = _ENTRY_ID_RE.search(entry_id)
+            if match:
+                # Se não houver 'v', é a versão 1
+                versions[match.group(1)] = int(match.group(2) or 1)
+        return versions
+
+    def _fetch_latest_versions(self, arxiv_ids):
+        """Consulta a API em lotes, um de cada vez, e retorna {id: versão}."""
+        arxiv_ids = [arxiv_id for arxiv_id in arxiv_ids if _VALID_ID_RE.match(arxiv_id)]
+        latest = {}
+        for start in range(0, len(arxiv_ids), self.API_BATCH_SIZE):
+            latest.update(self._query_batch(arxiv_ids[start:start + self.API_BATCH_SIZE]))
+        return latest
+
+    def _latest_versions(self, arxiv_ids):
+        """
+        Retorna {id: última versão conhecida}, consultando a API apenas para
+        os identificadores sem versão em cache ou com cache vencido.
+        """
+        state = api.get_plugin_state(self.STATE_NAME)
+        now = datetime.now()
+        known = {}
+        stale = []
+        for arxiv_id in dict.fromkeys(arxiv_ids):
+            cached = state.get(arxiv_id)
+            if cached and now - cached[1] < self.VERSION_TTL:
+                known[arxiv_id] = int(cached[0])
+            else:
+                stale.append(arxiv_id)
+
+        fetched = self._fetch_latest_versions(stale)
+        api.set_plugin_state(self.STATE_NAME, fetched)
+        known.update(fetched)
+        return known
+
+    def _get_latest_version_from_api(self, arxiv_id):
+        """Busca a versão mais recente de um artigo (usando o cache de versões)."""
+        arxiv_id = self._base_id(arxiv_id)
+        return self._latest_versions([arxiv_id]).get(arxiv_id)
+
+    def _check_item(self, item):
+        """Verifica se um item já carregado tem uma atualização."""
         if not item or not self._is_arxiv_item(item):
             return None
 
         arxiv_id = item.metadata.get('arxiv_id')
-        local_version = int(item.metadata.get('version', 1))
+        local_version = self._local_version(item.metadata.get('version'))
+        if local_version is None:
+            return None
 
         latest_version = self._get_latest_version_from_api(arxiv_id)
 
         if latest_version and latest_version > local_version:
-            return {'item_id': item_id, 'latest_version': latest_version}
+            return {'item_id': item.id, 'latest_version': latest_version}
         return None
 
+    def check_for_update(self, item_id):
+        """Verifica se um único item tem uma atualização."""
+        return self._check_item(api.get_item(item_id))
+
     def check_all_items(self):
         """
         Verifica todos os itens da biblioteca e retorna uma lista de IDs
         de itens que têm atualizações.
         """
-        updated_items = []
-        all_items = api.get_all_items_summary() # Usar summary para eficiência
-        for summary in all_items:
-            # Precisamos do item completo para checar os metadados
-            update_info = self.check_for_update(summary['id'])
-            if update_info:
-                updated_items.append(update_info['item_id'])
+        # Uma única consulta traz o identificador e a versão local de todos os itens do arXiv
+        arxiv_items = api.get_metadata_fields(['arxiv_id', 'version'])
+        local = {}
+        for item_id, fields in arxiv_items.items():
+            version = self._local_version(fields.get('version'))
+            if version is None:
+                print(f"Item {item_id}: versão do arXiv inválida ({fields['version']!r}), ignorado.")
+                continue
+            local[item_id] = (self._base_id(fields['arxiv_id']), version)
+        latest = self._latest_versions([arxiv_id for arxiv_id, _ in local.values()])
+
+        updated_items = [item_id for item_id, (arxiv_id, version) in local.items()
+                         if latest.get(arxiv_id, 0) > version]
 
         print(f"Verificação concluída. Itens com atualização: {updated_items}")
         # Notificar a GUI para atualizar a interface
         if hasattr(self.app_gui, 'mark_items_as_updatable'):
             self.app_gui.mark_items_as_updatable(updated_items)
-
         return updated_items
 
     def update_article_metadata(self, item_id):
@@ -1,6 +1,6 @@
 # plugins/check_for_updates/checker.py
-import requests
 from core import api # Plugins podem usar a API do core
+from core import metadata_resolver
 
 class PluginBase:
     """Uma classe base opcional para garantir a interface."""
@@ -22,8 +22,18 @@ class UpdateCheckerPlugin(PluginBase):
 
     def check_item_update(self, item_id: int):
         """A lógica principal do plugin."""
-        item_data = api.get_item(item_id) # Usa a API para pegar dados do item
-        doi = item_data.get('metadata', {}).get('doi')
+        item = api.get_item(item_id) # Usa a API para pegar dados do item
+        if item:
+            self._check_doi(item)
+
+    def check_items_update(self, item_ids: list[int]):
+        """Verifica vários itens, carregando-os todos de uma vez."""
+        for item in api.get_items(item_ids):
+            self._check_doi(item)
+
+    def _check_doi(self, item):
+        """Consulta o CrossRef pelo DOI de um item já carregado."""
+        doi = item.metadata.get('doi')
 
         if not doi:
             print("Item não possui DOI para verificação.")
@@ -31,22 +41,19 @@ class UpdateCheckerPlugin(PluginBase):
 
         print(f"Verificando atualizações para o DOI: {doi}...")
 
-        try:
-            # Usa a API do CrossRef como exemplo
-            response = requests.get(f"https://api.crossref.org/works/{doi}")
-            response.raise_for_status()
-            crossref_data = response.json()['message']
-
-            # 'indexed' é a data que o CrossRef processou o item
-            indexed_date = crossref_data.get('indexed', {}).get('date-time')
+        # Usa a API do CrossRef como exemplo, pelo resolvedor com cache do core
+        crossref_data = metadata_resolver.resolve(doi)
+        if crossref_data is None:
+            print(f"Não foi possível obter os dados do CrossRef para o DOI: {doi}")
+            return
 
-            # Compara com a data de modificação no banco local
-            # Se a data do CrossRef for mais recente, há uma possível atualização
-            # ... Lógica de comparação e notificação ao usuário ...
-            print(f"Data do CrossRef: {indexed_date}")
+        # 'indexed' é a data que o CrossRef processou o item
+        indexed_date = crossref_data.get('indexed', {}).get('date-time')
 
-        except requests.RequestException as e:
-            print(f"Erro ao contatar a API do CrossRef: {e}")
+        # Compara com a data de modificação no banco local
+        # Se a data do CrossRef for mais recente, há uma possível atualização
+        # ... Lógica de comparação e notificação ao usuário ...
+        print(f"Data do CrossRef: {indexed_date}")
 
     # --- Hook Implementations ---
     def on_item_added(self, item_id: int):
@@ -54,6 +61,9 @@ class UpdateCheckerPlugin(PluginBase):
         # Poderia, por exemplo, verificar automaticamente a atualização aqui
         # self.check_item_update(item_id)
 
+    def on_items_added(self, item_ids: list[int]):
+        print(f"Plugin '{self.get_name()}' foi notificado que {len(item_ids)} itens foram adicionados.")
+
     def on_item_updated(self, item_id: int):
         print(f"Plugin '{self.get_name()}' foi notificado que o item {item_id} foi atualizado.")
 
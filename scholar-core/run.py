@@ -1,11 +1,15 @@
 import sys
+import multiprocessing
 from pathlib import Path
 
 # Adiciona o diretório do projeto ao path para que os módulos possam ser encontrados
 project_dir = Path(__file__).parent
 sys.path.insert(0, str(project_dir))
 
-from gui.main import ScholarApp
-
 if __name__ == '__main__':
+    # Necessário para o pool de processos da importação de PDFs no executável
+    # do PyInstaller; a GUI só é importada no processo principal, para que os
+    # processos de trabalho não carreguem o Kivy.
+    multiprocessing.freeze_support()
+    from gui.main import ScholarApp
     ScholarApp().run()
@@ -1,10 +1,18 @@
 import pytest
-from core import api, database
+from core import api, database, id_allocator, metadata_resolver, pdf_metadata
 from core.models import Item, Creator, Collection
 import os
 import shutil
 import tempfile
 from pathlib import Path
+import io
+import json
+import runpy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
 from unittest.mock import patch, Mock
 
 TEST_DB_FILE = "test_library.db"
@@ -29,6 +37,7 @@ def setup_test_database():
     yield
 
     # Limpeza após o teste
+    database.close_connection()
     if os.path.exists(test_data_dir):
         shutil.rmtree(test_data_dir)
 
@@ -168,11 +177,13 @@ def test_linking_failures():
     assert not api.add_item_to_collection(item.id, 999)
     assert not api.add_tag_to_item(999, tag_id)
 
-@patch('core.services.item_service.requests.get')
-@patch('core.services.item_service.PdfReader')
+@patch('core.metadata_resolver.resolver.session.get')
+@patch('core.pdf_metadata.PdfReader')
 def test_create_item_from_pdf(MockPdfReader, mock_requests_get):
     mock_response = Mock()
     mock_response.ok = True
+    mock_response.status_code = 200
+    mock_response.headers = {}
     mock_response.json.return_value = {'message': {'title': ['Mocked PDF Title'], 'author': [{'given': 'John', 'family': 'Doe'}]}}
     mock_requests_get.return_value = mock_response
     mock_pdf_instance = MockPdfReader.return_value
@@ -216,10 +227,1005 @@ def test_add_duplicate_associations():
     assert api.add_item_to_collection(item.id, collection_id) is True
     assert api.add_tag_to_item(item.id, tag_id) is True
 
-@patch('core.services.item_service.PdfReader', side_effect=Exception("Corrupted PDF"))
+@patch('core.pdf_metadata.PdfReader', side_effect=Exception("Corrupted PDF"))
 def test_create_item_from_corrupted_pdf(MockPdfReader):
     """Testa a criação de item a partir de um PDF que gera erro."""
     with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
         # O conteúdo do arquivo não importa, pois PdfReader será mockado
         item = api.create_item_from_pdf(tmp.name)
         assert item is None
+
+def test_delete_item_with_associations():
+    """Testa a exclusão de um item com criadores, tags, coleções e anexos."""
+    item = api.add_item(Item(title="Linked Item", metadata={"doi": "10.1/x"}, creators=[Creator(first_name="A", last_name="B")]))
+    api.add_tag_to_item(item.id, api.add_tag("linked"))
+    api.add_item_to_collection(item.id, api.add_collection("Linked"))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dummy_file_path = os.path.join(temp_dir, "linked.pdf")
+        Path(dummy_file_path).write_text("pdf")
+        api.add_attachment(item.id, dummy_file_path)
+    assert api.delete_item(item.id) is True
+    assert api.get_item(item.id) is None
+
+def test_transaction_rollback():
+    """Testa se uma unidade de trabalho desfaz todas as escritas em caso de erro."""
+    with pytest.raises(RuntimeError):
+        with database.transaction() as con:
+            con.execute("INSERT INTO tags (id, name) VALUES (1, 'rolled-back')")
+            raise RuntimeError("abort")
+    con = database.get_connection()
+    assert con.execute("SELECT COUNT(*) FROM tags").fetchone()[0] == 0
+
+def test_connection_shared_across_threads():
+    """Testa se threads de fundo usam o mesmo banco com cursores próprios."""
+    import threading
+    api.add_item(Item(title="Main Thread Item"))
+    results = []
+    errors = []
+
+    def worker():
+        try:
+            api.add_item(Item(title="Worker Item"))
+            results.append(len(api.get_all_items_summary()))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(api.get_all_items_summary()) == 5
+
+def _open_in_other_process(path) -> bool:
+    """Indica se outro processo consegue abrir o arquivo da biblioteca."""
+    import subprocess, sys
+    result = subprocess.run([sys.executable, "-c", "import duckdb, sys; duckdb.connect(sys.argv[1]).close()", str(path)],
+                            capture_output=True)
+    return result.returncode == 0
+
+def test_connection_release_frees_the_library_file():
+    """Testa se release() libera a trava do arquivo, adiando o fechamento até o fim das transações."""
+    api.add_item(Item(title="Before release"))
+    assert not _open_in_other_process(database.DB_FILE)
+    generation = database.manager.generation
+
+    with database.transaction() as con:
+        database.release_connection()
+        # O fechamento espera a transação em andamento
+        con.execute("INSERT INTO tags (id, name) VALUES (1, 'kept')")
+    assert _open_in_other_process(database.DB_FILE)
+
+    # Reaberto sob demanda, em uma nova geração
+    assert len(api.get_all_items_summary()) == 1
+    assert database.manager.generation == generation + 1
+    assert database.get_connection().execute("SELECT name FROM tags").fetchall() == [('kept',)]
+
+    with database.session():
+        with database.session():
+            api.add_item(Item(title="Inside session"))
+        assert not _open_in_other_process(database.DB_FILE)
+    assert _open_in_other_process(database.DB_FILE)
+    assert len(api.get_all_items_summary()) == 2
+
+def test_add_items_bulk():
+    """Testa a inserção em lote com resolução de criadores em conjunto."""
+    api.add_item(Item(title="Existing", creators=[Creator(first_name="Ada", last_name="Lovelace")]))
+    items = [
+        Item(title=f"Bulk {i}", metadata={"doi": f"10.1/{i}"},
+             creators=[Creator(first_name="Ada", last_name="Lovelace"), Creator(first_name="Alan", last_name=f"Turing{i % 2}")])
+        for i in range(10)
+    ]
+    with patch('core.services.item_service.plugin_manager') as mock_manager:
+        added = api.add_items(items)
+        mock_manager.hook_items_added.assert_called_once_with([item.id for item in added])
+
+    assert len({item.id for item in added}) == 10
+    con = database.get_connection()
+    assert con.execute("SELECT COUNT(*) FROM creators").fetchone()[0] == 3
+    retrieved = api.get_item(added[3].id)
+    assert retrieved.title == "Bulk 3"
+    assert retrieved.metadata == {"doi": "10.1/3", "title": "Bulk 3"}
+    assert [c.last_name for c in retrieved.creators] == ["Lovelace", "Turing1"]
+    assert retrieved.creators[0].id == added[3].creators[0].id
+    assert api.add_items([]) == []
+
+def test_search_index_ranking_and_maintenance():
+    """Testa ranqueamento, stemming, prefixo, paginação e manutenção do índice."""
+    strong = api.add_item(Item(title="Graph Neural Networks", metadata={"abstract": "networks of networks"}))
+    weak = api.add_item(Item(title="Social Studies", metadata={"abstract": "a survey of social networks"}))
+    author = api.add_item(Item(title="Untitled", creators=[Creator(first_name="Grace", last_name="Hopper")]))
+
+    assert [r['id'] for r in api.search_items("network")] == [strong.id, weak.id]
+    assert [r['id'] for r in api.search_items("studies")] == [weak.id]
+    assert [r['id'] for r in api.search_items("hopp")] == [author.id]
+    assert api.search_items("social graph ") == []
+    assert [r['id'] for r in api.search_items("network", limit=1, offset=1)] == [weak.id]
+    assert set(api.search_items("network")[0]) == {'id', 'item_type', 'title'}
+
+    api.update_item(author.id, {"metadata": {"title": "Compilers"}})
+    assert [r['id'] for r in api.search_items("compiler")] == [author.id]
+    api.delete_item(strong.id)
+    assert [r['id'] for r in api.search_items("network")] == [weak.id]
+
+def test_search_index_rebuild():
+    """Testa a reconstrução do índice para bibliotecas existentes."""
+    item = api.add_item(Item(title="Indexed Later"))
+    con = database.get_connection()
+    for table in ("search_postings", "search_postings_delta", "search_documents"):
+        con.execute(f"DELETE FROM {table}")
+    assert api.search_items("indexed") == []
+    database.initialize_database()
+    assert [r['id'] for r in api.search_items("indexed")] == [item.id]
+
+def test_get_items_batch():
+    """Testa a hidratação em lote, preservando a ordem e ignorando IDs inexistentes."""
+    first = api.add_item(Item(title="First", metadata={"year": "2020"},
+                              creators=[Creator(first_name="A", last_name="One"), Creator(first_name="B", last_name="Two")]))
+    second = api.add_item(Item(title="Second"))
+    api.add_tag_to_item(first.id, api.add_tag("zeta"))
+    api.add_tag_to_item(first.id, api.add_tag("alpha"))
+
+    items = api.get_items([second.id, 999999, first.id])
+    assert [item.id for item in items] == [second.id, first.id]
+    assert items[0].creators == [] and items[0].tags == []
+    assert [c.last_name for c in items[1].creators] == ["One", "Two"]
+    assert [t.name for t in items[1].tags] == ["alpha", "zeta"]
+    assert items[1].metadata["year"] == "2020"
+    assert api.get_items([]) == []
+
+    # Conjuntos grandes de IDs passam por uma tabela temporária
+    bulk = api.add_items([Item(title=f"Bulk {i}") for i in range(database.INLINE_ID_LIMIT + 5)])
+    ids = [item.id for item in bulk]
+    assert [item.id for item in api.get_items(ids)] == ids
+
+def test_list_items_keyset_pagination():
+    """Testa a paginação por cursor em várias ordenações e dentro de coleções."""
+    specs = [("Gamma", "Zed", "2001"), ("alpha", "Young", "1999"), ("Beta", None, "2010"), ("Delta", "Adams", None)]
+    items = [api.add_item(Item(title=title,
+                               creators=[Creator(first_name="X", last_name=last)] if last else [],
+                               metadata={"year": year} if year else {}))
+             for title, last, year in specs]
+
+    def collect(**kwargs):
+        ids, cursor = [], None
+        while True:
+            page = api.list_items(limit=3, after=cursor, **kwargs)
+            ids += [summary['title'] for summary in page['items']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                return ids
+
+    assert collect(sort="title") == ["alpha", "Beta", "Delta", "Gamma"]
+    assert collect(sort="title", descending=True) == ["Gamma", "Delta", "Beta", "alpha"]
+    assert collect(sort="author") == ["Beta", "Delta", "alpha", "Gamma"]
+    assert collect(sort="year") == ["Beta", "Gamma", "alpha", "Delta"]
+    assert collect(sort="date_added") == ["Delta", "Beta", "alpha", "Gamma"]
+
+    first_page = api.list_items(sort="title", limit=1)
+    assert first_page['items'][0] == {'id': items[1].id, 'item_type': 'journalArticle', 'title': 'alpha',
+                                      'author_text': 'Young', 'year': 1999}
+
+    collection_id = api.add_collection("Paged")
+    for item in items[:3]:
+        api.add_item_to_collection(item.id, collection_id)
+    assert collect(sort="title", collection_id=collection_id) == ["alpha", "Beta", "Gamma"]
+
+    with pytest.raises(ValueError):
+        api.list_items(sort="title", after=first_page['next_cursor'], descending=True)
+    with pytest.raises(ValueError):
+        api.list_items(sort="publisher")
+
+def test_item_summary_kept_in_sync():
+    """Testa a manutenção e a reconstrução do resumo materializado dos itens."""
+    con = database.get_connection()
+    summary_sql = "SELECT display_title, first_author, author_count, year FROM item_summary WHERE item_id = ?"
+
+    item = api.add_item(Item(title="Ângulo", metadata={"date": "2015-03-01"},
+                             creators=[Creator(first_name="A", last_name="Érdős"),
+                                       Creator(first_name="B", last_name="Bell"),
+                                       Creator(first_name="C", last_name="Ed", creator_type="editor")]))
+    assert con.execute(summary_sql, (item.id,)).fetchone() == ("Ângulo", "Érdős", 2, 2015)
+    bulk = api.add_items([Item(title="Bulk", creators=[Creator(first_name="D", last_name="Cole")])])[0]
+    assert con.execute(summary_sql, (bulk.id,)).fetchone() == ("Bulk", "Cole", 1, None)
+    assert [s['title'] for s in api.list_items(sort="author")['items']] == ["Bulk", "Ângulo"]
+
+    api.update_item(item.id, {"metadata": {"title": "Renamed", "year": "1990"}})
+    assert con.execute(summary_sql, (item.id,)).fetchone() == ("Renamed", "Érdős", 2, 1990)
+
+    api.delete_item(bulk.id)
+    assert con.execute(summary_sql, (bulk.id,)).fetchone() is None
+
+    con.execute("DELETE FROM item_summary")
+    database.initialize_database()
+    assert api.get_all_items_summary()[0]['author_text'] == "Érdős"
+    con = database.get_connection()
+    con.execute("UPDATE item_summary SET first_author = NULL")
+    api.rebuild_item_summary()
+    assert con.execute(summary_sql, (item.id,)).fetchone() == ("Renamed", "Érdős", 2, 1990)
+
+def _write_pdf(path, *page_texts, subject=None):
+    """Grava um PDF mínimo com uma página por texto e, opcionalmente, um /Subject."""
+    page_numbers = [4 + 2 * index for index in range(len(page_texts))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % n for n in page_numbers), len(page_texts)),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for number, text in zip(page_numbers, page_texts):
+        content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode('latin-1')
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R /Resources << /Font << /F1 3 0 R >> >> >>" % (number + 1))
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    trailer_extra = b""
+    if subject is not None:
+        objects.append(b"<< /Subject (%s) >>" % subject.encode('latin-1'))
+        trailer_extra = b" /Info %d 0 R" % len(objects)
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R%s >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, trailer_extra, xref)
+    Path(path).write_bytes(data)
+
+class _CrossrefStandIn(BaseHTTPRequestHandler):
+    """Servidor local que imita `/works/{doi}` do Crossref, com ETag."""
+
+    def do_GET(self):
+        doi = unquote(self.path[len('/works/'):])
+        self.server.hits.append((doi, self.headers.get('If-None-Match')))
+        time.sleep(self.server.delay)
+        message = self.server.works.get(doi)
+        etag = f'"{doi}"'
+        if message is None:
+            self.send_response(404)
+            self.end_headers()
+        elif self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+        else:
+            body = json.dumps({'message': message}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def crossref_server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _CrossrefStandIn)
+    server.works, server.hits, server.delay = {}, [], 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(metadata_resolver.resolver, 'base_url', f"http://127.0.0.1:{server.server_port}")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_import_pdfs_pipeline(crossref_server):
+    """Testa a importação paralela de um diretório, com progresso e falhas por arquivo."""
+    crossref_server.works['10.1234/abc.def'] = {'title': ['Resolved Title'], 'author': [{'given': 'Ada', 'family': 'Lovelace'}]}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.makedirs(os.path.join(temp_dir, "nested"))
+        _write_pdf(os.path.join(temp_dir, "with_doi.pdf"), "See doi 10.1234/abc.def for details")
+        _write_pdf(os.path.join(temp_dir, "nested", "plain_paper.pdf"), "No identifier here")
+        Path(temp_dir, "broken.pdf").write_bytes(b"not a pdf")
+        Path(temp_dir, "notes.txt").write_text("ignored")
+
+        events = []
+        result = api.import_pdfs(temp_dir, workers=2, batch_size=1,
+                                 progress=lambda done, total, path, error: events.append((done, total, os.path.basename(path), error)))
+
+    assert sorted(e[2] for e in events) == ["broken.pdf", "plain_paper.pdf", "with_doi.pdf"]
+    assert [e[0] for e in events] == [1, 2, 3] and all(e[1] == 3 for e in events)
+    assert [os.path.basename(path) for path, _ in result['failed']] == ["broken.pdf"]
+
+    titles = sorted(item.title for item in result['items'])
+    assert titles == ["Resolved Title", "plain paper"]
+    assert crossref_server.hits == [("10.1234/abc.def", None)]
+
+    resolved = next(item for item in result['items'] if item.title == "Resolved Title")
+    stored = api.get_item(resolved.id)
+    assert stored.metadata['doi'] == "10.1234/abc.def"
+    assert [c.last_name for c in stored.creators] == ["Lovelace"]
+    assert [os.path.basename(a.path) for a in stored.attachments] == ["with_doi.pdf"]
+    assert os.path.exists(os.path.join(database.DATA_DIR, "storage", stored.attachments[0].path))
+
+def test_find_identifiers():
+    """Testa a detecção de DOI, arXiv e ISBN (com dígito verificador) em texto."""
+    found = pdf_metadata.find_identifiers("(doi: 10.1000/xyz(1)2) arXiv:2101.00001v3 ISBN 978-0-306-40615-7.")
+    assert found == {'doi': '10.1000/xyz(1)2', 'arxiv_id': '2101.00001', 'arxiv_version': 3, 'isbn': '9780306406157'}
+    assert pdf_metadata.find_identifiers("see https://arxiv.org/abs/hep-th/9901001") == {'arxiv_id': 'hep-th/9901001'}
+    assert pdf_metadata.find_identifiers("ISBN 0-306-40615-2") == {'isbn': '0306406152'}
+    assert pdf_metadata.find_identifiers("ISBN 978-0-306-40615-8 and 10.1234/end.") == {'doi': '10.1234/end'}
+
+def test_pdf_extraction_window_and_cache():
+    """Testa a janela limitada de páginas, a prioridade dos metadados e o cache por conteúdo."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        middle = os.path.join(temp_dir, "middle.pdf")
+        _write_pdf(middle, *["filler"] * 4, "10.1234/hidden", *["filler"] * 4)
+        assert pdf_metadata.extract(middle)['doi'] is None
+
+        tail = os.path.join(temp_dir, "tail.pdf")
+        _write_pdf(tail, *["filler"] * 8, "Available as arXiv:1706.03762v5")
+        info = pdf_metadata.extract(tail)
+        assert (info['arxiv_id'], info['arxiv_version'], info['title']) == ("1706.03762", 5, "tail")
+
+        described = os.path.join(temp_dir, "described.pdf")
+        _write_pdf(described, "page DOI 10.9999/page", subject="doi:10.5555/meta")
+        assert pdf_metadata.extract(described)['doi'] == "10.5555/meta"
+
+        cache_dir = os.path.join(temp_dir, "cache")
+        first = pdf_metadata.extract(tail, cache_dir)
+        copy = os.path.join(temp_dir, "renamed_copy.pdf")
+        shutil.copy(tail, copy)
+        with patch('core.pdf_metadata.PdfReader', side_effect=AssertionError("não deveria ler o PDF")):
+            cached = pdf_metadata.extract(copy, cache_dir)
+        assert cached['arxiv_id'] == first['arxiv_id'] and cached['title'] == "renamed copy"
+
+def test_crossref_resolver_cache(crossref_server):
+    """Testa o cache persistente, a revalidação condicional e a deduplicação de consultas ao Crossref."""
+    from plugins.check_for_updates.checker import UpdateCheckerPlugin
+    crossref_server.works['10.1/a'] = {'title': ['A'], 'indexed': {'date-time': '2024-01-01T00:00:00Z'}}
+    crossref_server.works['10.1/b'] = {'title': ['B']}
+
+    assert metadata_resolver.resolve("10.1/A")['title'] == ['A']
+    assert metadata_resolver.resolve("https://doi.org/10.1/a")['title'] == ['A']
+    UpdateCheckerPlugin()._check_doi(Item(metadata={'doi': '10.1/a'}))
+    assert metadata_resolver.resolve("10.1/missing") is None
+    assert metadata_resolver.resolve("10.1/missing") is None
+    assert crossref_server.hits == [("10.1/a", None), ("10.1/missing", None)]
+
+    # Entradas vencidas são revalidadas com If-None-Match e mantidas no 304
+    database.get_connection().execute("UPDATE crossref_cache SET fetched_at = fetched_at - INTERVAL 60 DAY")
+    assert metadata_resolver.resolve("10.1/a")['title'] == ['A']
+    assert crossref_server.hits[-1] == ("10.1/a", '"10.1/a"')
+
+    crossref_server.delay = 0.2
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(metadata_resolver.resolve, ["10.1/b"] * 8))
+    assert all(r == {'title': ['B']} for r in results)
+    assert [doi for doi, _ in crossref_server.hits].count("10.1/b") == 1
+
+class _ArxivStandIn(BaseHTTPRequestHandler):
+    """Servidor local que imita a consulta `id_list` da API do arXiv."""
+
+    def do_GET(self):
+        ids = parse_qs(urlparse(self.path).query)['id_list'][0].split(',')
+        self.server.requests.append(ids)
+        entries = "".join(
+            f"<entry><id>http://arxiv.org/abs/{arxiv_id}v{self.server.versions[arxiv_id]}</id></entry>"
+            for arxiv_id in ids if arxiv_id in self.server.versions
+        )
+        body = f'<feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_arxiv_checker_batches_and_caches_versions():
+    """Testa a verificação do arXiv em lotes, com cache de versões por TTL."""
+    from plugins.arxiv_version_checker.checker import ArxivVersionChecker
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ArxivStandIn)
+    server.requests = []
+    server.versions = {"2101.00001": 3, "2101.00002": 1, "2101.00003": 4, "hep-th/9901001": 2,
+                       "2101.00004": 2, "2101.00005": 9, "2101.00006": 1}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    outdated, current, inline_version, old_style = api.add_items([
+        Item(title="Outdated", metadata={"arxiv_id": "2101.00001", "version": "1"}),
+        Item(title="Current", metadata={"arxiv_id": "2101.00002"}),
+        Item(title="Inline", metadata={"arxiv_id": "2101.00003v2", "version": "2"}),
+        Item(title="Old style", metadata={"arxiv_id": "hep-th/9901001", "version": "2"}),
+        Item(title="Malformed", metadata={"arxiv_id": "not an id"}),
+        Item(title="Not arXiv"),
+        Item(title="Prefixed version", metadata={"arxiv_id": "2101.00004", "version": "v2"}),
+        Item(title="Bad version", metadata={"arxiv_id": "2101.00005", "version": "latest"}),
+        Item(title="Empty version", metadata={"arxiv_id": "2101.00006", "version": ""}),
+    ])[:4]
+
+    checker = ArxivVersionChecker()
+    checker.API_URL = f"http://127.0.0.1:{server.server_port}/api/query"
+    checker.API_BATCH_SIZE = 3
+    checker._rate_limiter.min_interval = 0
+    try:
+        assert sorted(checker.check_all_items()) == sorted([outdated.id, inline_version.id])
+        assert sorted(len(ids) for ids in server.requests) == [3, 3]
+
+        # Dentro do TTL, nenhuma nova requisição é feita
+        assert sorted(checker.check_all_items()) == sorted([outdated.id, inline_version.id])
+        assert checker.check_for_update(outdated.id) == {'item_id': outdated.id, 'latest_version': 3}
+        assert checker.check_for_update(current.id) is None
+        assert len(server.requests) == 2
+
+        database.get_connection().execute("UPDATE plugin_state SET updated_at = updated_at - INTERVAL 2 DAY")
+        server.versions["hep-th/9901001"] = 3
+        assert old_style.id in checker.check_all_items()
+        assert len(server.requests) == 4
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_save_captured_items_deduplicates():
+    """Testa se capturas com DOI ou URL já conhecidos (na biblioteca ou no lote) não são duplicadas."""
+    existing = api.add_item(Item(title="Existente", metadata={'doi': '10.1000/ABC'}))
+    results = api.save_captured_items([
+        {'metadata': {'title': "Mesmo DOI", 'doi': 'https://doi.org/10.1000/abc'}},
+        {'metadata': {'title': "Página", 'url': 'https://example.org/paper/'},
+         'creators': [{'first_name': 'Ada', 'last_name': 'Lovelace'}]},
+        {'metadata': {'title': "Página de novo", 'url': 'https://example.org/paper#abstract'}},
+        {'metadata': {'title': "Sem identificador"}},
+    ])
+
+    assert results[0] == {'item_id': existing.id, 'duplicate': True}
+    assert results[1]['duplicate'] is False
+    assert results[2] == {'item_id': results[1]['item_id'], 'duplicate': True}
+    assert results[3]['duplicate'] is False
+    assert api.get_item(results[1]['item_id']).creators[0].last_name == 'Lovelace'
+    assert len(api.get_all_items_summary()) == 3
+
+
+def _load_native_host():
+    return runpy.run_path(str(Path(__file__).resolve().parent.parent / 'native_messaging' / 'host.py'), run_name='host')
+
+
+def test_native_host_batches_pipelined_requests():
+    """Testa se o host responde a cada requisição pelo id e grava o lote com uma única chamada."""
+    host = _load_native_host()
+    messages = [
+        {'id': 1, 'type': 'save', 'item': {'metadata': {'title': "Um", 'doi': '10.1/one'}}},
+        {'id': 2, 'type': 'save_many', 'items': [
+            {'metadata': {'title': "Dois", 'doi': '10.1/two'}},
+            {'metadata': {'title': "Um de novo", 'doi': '10.1/ONE'}},
+        ]},
+        {'id': 3, 'type': 'unknown'},
+        {'id': 4, 'type': 'ping'},
+        {'metadata': {'title': "Formato antigo"}},
+    ]
+    with patch.object(api, 'save_captured_items', wraps=api.save_captured_items) as save:
+        responses = host['process_batch'](messages)
+    save.assert_called_once()
+
+    assert [response['id'] for response in responses] == [1, 2, 3, 4, None]
+    assert responses[0]['duplicate'] is False
+    assert [result['duplicate'] for result in responses[1]['results']] == [False, True]
+    assert responses[1]['results'][1]['item_id'] == responses[0]['item_id']
+    assert responses[2]['status'] == 'error'
+    assert responses[3]['status'] == 'success'
+    assert responses[4]['status'] == 'success'
+    assert len(api.get_all_items_summary()) == 3
+
+
+def test_native_host_malformed_capture_fails_only_its_request():
+    """Testa se uma captura malformada em um lote falha só a própria requisição."""
+    host = _load_native_host()
+    messages = [
+        {'id': 1, 'type': 'save', 'item': {'metadata': {'title': "Válido"}}},
+        {'id': 2, 'type': 'save', 'item': {'metadata': ['x']}},
+        {'id': 3, 'type': 'save_many', 'items': [{'metadata': {'title': "Outro"}, 'creators': ["Fulano"]}]},
+        {'id': 4, 'type': 'save', 'item': {'metadata': {'title': "Também válido"},
+                                           'creators': [{'first_name': "Ana", 'last_name': "Silva"}]}},
+    ]
+    responses = host['process_batch'](messages)
+    assert [response['id'] for response in responses] == [1, 2, 3, 4]
+    assert [response['status'] for response in responses] == ['success', 'error', 'error', 'success']
+    assert 'metadata' in responses[1]['message']
+    assert 'creators' in responses[2]['message']
+    assert sorted(item['title'] for item in api.get_all_items_summary()) == ["Também válido", "Válido"]
+
+
+def test_native_host_long_lived_port():
+    """Testa o host de ponta a ponta: várias mensagens na mesma porta, até o fim da entrada."""
+    host = _load_native_host()
+    input_stream = io.BytesIO()
+    for index in range(5):
+        host['send_message'](input_stream, {'id': index, 'type': 'save', 'item': {'metadata': {'title': f"Item {index}"}}})
+    input_stream.seek(0)
+    output_stream = io.BytesIO()
+    # Mantém as referências: um TextIOWrapper coletado fecha o stream que envolve
+    stdin, stdout = io.TextIOWrapper(input_stream), io.TextIOWrapper(output_stream)
+
+    with patch('sys.stdin', stdin), patch('sys.stdout', stdout):
+        host['main']()
+    database.get_connection()
+
+    output_stream.seek(0)
+    responses = []
+    while (response := host['get_message'](output_stream)) is not None:
+        responses.append(response)
+    assert sorted(response['id'] for response in responses) == list(range(5))
+    assert all(response['status'] == 'success' for response in responses)
+    assert len(api.get_all_items_summary()) == 5
+
+
+def test_native_host_yields_the_library_to_other_processes():
+    """Testa se o host responde com erro enquanto outro processo usa a biblioteca e a libera após cada lote."""
+    import subprocess, sys
+    host = _load_native_host()
+    messages = [{'id': 1, 'type': 'ping'}, {'id': 2, 'type': 'save', 'item': {'metadata': {'title': "Capturado"}}}]
+    database.release_connection()
+
+    holder = subprocess.Popen([sys.executable, "-c",
+                               "import duckdb, sys; con = duckdb.connect(sys.argv[1]); print('ok', flush=True); sys.stdin.read()",
+                               str(database.DB_FILE)], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        assert holder.stdout.readline().strip() == b'ok'
+        responses = host['process_batch'](messages)
+        assert responses[0]['status'] == 'success'
+        assert responses[1]['status'] == 'error' and 'lock' in responses[1]['message'].lower()
+    finally:
+        holder.communicate(b'')
+
+    responses = host['process_batch'](messages)
+    assert [response['status'] for response in responses] == ['success', 'success']
+    assert _open_in_other_process(database.DB_FILE)
+    assert [item['title'] for item in api.get_all_items_summary()] == ["Capturado"]
+
+
+def test_id_allocator_is_unique_monotonic_and_seeded():
+    """Testa se o alocador entrega IDs únicos e crescentes entre threads e reserva intervalos."""
+    allocator = id_allocator.IdAllocator(lambda: 10 ** 16)
+    first = allocator.reserve(1000)
+    assert first > 10 ** 16
+    assert allocator.next_id() == first + 1000
+
+    def allocate(_):
+        ids = [allocator.next_id() for _ in range(2000)]
+        assert ids == sorted(ids)
+        return ids
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        allocated = [item_id for ids in pool.map(allocate, range(8)) for item_id in ids]
+    assert len(set(allocated)) == len(allocated)
+
+    # A sequência global parte do maior ID já gravado
+    high = api.add_item(Item(title="Alto", creators=[Creator(first_name="A", last_name="B")]))
+    assert id_allocator.stored_high_water_mark() == high.creators[0].id == high.id + 1
+
+
+def test_id_allocator_reseeds_after_reopen():
+    """Testa se o piso é relido quando outro processo grava na biblioteca e se uma leitura que falhou é repetida."""
+    import subprocess, sys
+    api.add_item(Item(title="Antes"))
+    database.release_connection()
+    future_id = 10 ** 17
+    subprocess.run([sys.executable, "-c",
+                    "import duckdb, sys; duckdb.connect(sys.argv[1]).execute(\"INSERT INTO tags VALUES (?, 'futuro')\", [int(sys.argv[2])])",
+                    str(database.DB_FILE), str(future_id)], check=True)
+    assert api.add_item(Item(title="Depois")).id > future_id
+
+    calls = []
+    def flaky_floor():
+        calls.append(None)
+        if len(calls) == 1:
+            raise OSError("banco indisponível")
+        return 10 ** 16
+
+    allocator = id_allocator.IdAllocator(flaky_floor)
+    with pytest.raises(OSError):
+        allocator.next_id()
+    assert allocator.next_id() > 10 ** 16
+    allocator.next_id()
+    assert len(calls) == 2
+
+
+def test_concurrent_writes_do_not_collide():
+    """Testa se escritas simultâneas de várias threads não geram chaves repetidas."""
+    def write(index):
+        items = api.add_items([Item(title=f"Lote {index}-{n}", creators=[Creator(last_name="X")]) for n in range(20)])
+        item = api.add_item(Item(title=f"Avulso {index}"))
+        tag_id = api.add_tag(f"tag {index}")
+        collection_id = api.add_collection(f"coleção {index}")
+        return [i.id for i in items] + [item.id, tag_id, collection_id]
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        ids = [item_id for batch in pool.map(write, range(12)) for item_id in batch]
+    assert len(set(ids)) == len(ids)
+    assert len(api.get_all_items_summary()) == 12 * 21
+
+
+def test_attachments_are_content_addressed_and_reference_counted(tmp_path):
+    """Testa se conteúdos iguais são guardados uma vez e removidos só quando nenhum anexo os usa."""
+    original = tmp_path / "artigo.pdf"
+    original.write_bytes(b"%PDF-1.4 mesmo conteudo")
+    renamed = tmp_path / "copia.pdf"
+    renamed.write_bytes(original.read_bytes())
+
+    first_item = api.add_item(Item(title="Primeiro"))
+    second_item = api.add_item(Item(title="Segundo"))
+    first = api.add_attachment(first_item.id, str(original))
+    second = api.add_attachment(second_item.id, str(renamed))
+    again = api.add_attachment(second_item.id, str(original))
+
+    storage_dir = Path(database.DATA_DIR) / "storage"
+    first_path, second_path = storage_dir / first.path, storage_dir / second.path
+    assert os.path.basename(second.path) == "copia.pdf"
+    assert again.path == first.path
+    assert first_path.parent == second_path.parent
+    # Os nomes do mesmo conteúdo compartilham o arquivo; a origem nunca é ligada
+    assert os.path.samefile(first_path, second_path)
+    assert not os.path.samefile(first_path, original)
+    assert len(list((storage_dir / "blobs").rglob("*.pdf"))) == 2
+
+    api.delete_item(first_item.id)
+    assert second_path.exists()
+    api.delete_item(second_item.id)
+    assert not second_path.parent.exists()
+
+
+def test_attachment_fulltext_indexing_and_search(tmp_path):
+    """Testa a extração incremental do texto dos anexos e a busca com acertos por página."""
+    _write_pdf(tmp_path / "graphene.pdf", "Introduction to carbon", "Graphene lattice vibrations", "Graphene summary")
+    _write_pdf(tmp_path / "other.pdf", "Unrelated protein folding")
+    (tmp_path / "broken.pdf").write_bytes(b"%PDF-1.4 truncated")
+
+    lattice = api.add_item(Item(title="Lattice dynamics"))
+    folding = api.add_item(Item(title="Graphene folding"))
+    attachment = api.add_attachment(lattice.id, str(tmp_path / "graphene.pdf"))
+    api.add_attachment(folding.id, str(tmp_path / "other.pdf"))
+    api.add_attachment(folding.id, str(tmp_path / "broken.pdf"))
+
+    assert api.search_items("vibrations", fulltext=True) == []
+    progress = []
+    result = api.index_attachment_texts(workers=0, progress=lambda done, total: progress.append((done, total)))
+    assert result['indexed'] == 2 and len(result['failed']) == 1
+    assert progress[-1] == (3, 3)
+    # Execuções seguintes só processam conteúdos novos (falhas não são repetidas)
+    assert api.index_attachment_texts(workers=0) == {'indexed': 0, 'failed': []}
+
+    assert api.get_attachment_text(attachment.id)[1] == "Graphene lattice vibrations"
+    assert [r['id'] for r in api.search_items("graphene")] == [folding.id]
+    results = api.search_items("graphene", fulltext=True)
+    assert [r['id'] for r in results] == [folding.id, lattice.id]
+    assert results[0]['fulltext_hits'] == []
+    assert results[1]['fulltext_hits'] == [{'attachment_id': attachment.id, 'pages': [2, 3]}]
+    assert [r['id'] for r in api.search_items("graphene vibr", fulltext=True)] == [lattice.id]
+
+    # O mesmo conteúdo anexado a outro item usa a extração existente
+    copy_item = api.add_item(Item(title="Cópia"))
+    api.add_attachment(copy_item.id, str(tmp_path / "graphene.pdf"))
+    assert api.index_attachment_texts(workers=0)['indexed'] == 0
+    assert {r['id'] for r in api.search_items("vibrations", fulltext=True)} == {lattice.id, copy_item.id}
+
+    api.delete_item(lattice.id)
+    api.delete_item(copy_item.id)
+    assert api.search_items("vibrations", fulltext=True) == []
+    con = database.get_connection()
+    assert con.execute("SELECT count(*) FROM attachment_texts").fetchone()[0] == 2
+
+
+def test_attachment_fulltext_indexing_in_worker_processes(tmp_path):
+    """Testa a extração do texto dos anexos em processos de trabalho."""
+    item = api.add_item(Item(title="Processos"))
+    for index in range(3):
+        _write_pdf(tmp_path / f"doc{index}.pdf", f"Document number{index} body")
+        api.add_attachment(item.id, str(tmp_path / f"doc{index}.pdf"))
+
+    result = api.index_attachment_texts(workers=2)
+    assert result == {'indexed': 3, 'failed': []}
+    assert api.search_items("number2", fulltext=True)[0]['fulltext_hits'][0]['pages'] == [1]
+
+
+def test_pdf_text_read_for_identifiers_is_indexed_without_reextraction(tmp_path):
+    """Testa se a criação de itens a partir de PDFs grava o texto já lido, sem nova extração na indexação."""
+    _write_pdf(tmp_path / "single.pdf", "Spectral entropy", "Quantum lattice appendix")
+    (tmp_path / "batch").mkdir()
+    _write_pdf(tmp_path / "batch" / "first.pdf", "Membrane transport")
+    _write_pdf(tmp_path / "batch" / "second.pdf", "Galaxy dark matter")
+
+    item = api.create_item_from_pdf(str(tmp_path / "single.pdf"))
+    result = api.import_pdfs(str(tmp_path / "batch"), workers=0)
+    assert result['failed'] == []
+
+    with patch('core.pdf_text.extract', side_effect=AssertionError("não deveria reler o PDF")):
+        assert api.index_attachment_texts(workers=0) == {'indexed': 0, 'failed': []}
+    hits = api.search_items("lattice", fulltext=True)
+    assert [(r['id'], r['fulltext_hits'][0]['pages']) for r in hits] == [(item.id, [2])]
+    assert [r['title'] for r in api.search_items("galaxy", fulltext=True)] == ["second"]
+
+
+def test_attachments_added_later_are_indexed_in_background(tmp_path, monkeypatch):
+    """Testa se, com a indexação em segundo plano ligada, novos anexos são indexados sem reiniciar."""
+    from core.services import fulltext_service
+    monkeypatch.setattr(fulltext_service, '_auto_indexing', True)
+    item = api.add_item(Item(title="Depois da inicialização"))
+    _write_pdf(tmp_path / "late.pdf", "Polymer synthesis notes")
+    _write_pdf(tmp_path / "later.pdf", "Catalysis results")
+
+    api.add_attachment(item.id, str(tmp_path / "late.pdf"))
+    api.add_attachment(item.id, str(tmp_path / "later.pdf"))
+    assert fulltext_service.wait_for_indexing(timeout=60)
+    assert [r['id'] for r in api.search_items("polymer", fulltext=True)] == [item.id]
+    assert [r['id'] for r in api.search_items("catalysis", fulltext=True)] == [item.id]
+
+
+def test_find_and_merge_duplicates(tmp_path):
+    """Testa a detecção de duplicatas (identificadores e título/autor) e a fusão dos itens."""
+    ada = [Creator(first_name="Ada", last_name="Lovelace")]
+    original = api.add_item(Item(title="Notes on the Analytical Engine", creators=list(ada),
+                                 metadata={'doi': '10.1000/AE', 'year': '1843'}))
+    by_doi = api.add_item(Item(title="Analytical engine notes", metadata={'doi': 'https://doi.org/10.1000/ae', 'url': 'https://example.org/ae'}))
+    by_title = api.add_item(Item(title="Notes on the analytical engine.", creators=[Creator(first_name="A.", last_name="Lovelace")]))
+    other_author = api.add_item(Item(title="Notes on the Analytical Engine", creators=[Creator(last_name="Babbage")]))
+    arxiv = [api.add_item(Item(title=f"Preprint {n}", metadata={'arxiv_id': f'2101.00001v{n}'})) for n in (1, 2)]
+    api.add_item(Item(title="Unrelated work"))
+
+    clusters = api.find_duplicates()
+    assert {'item_ids': sorted([original.id, by_doi.id, by_title.id]), 'reasons': ['doi', 'title_author']} in clusters
+    assert {'item_ids': sorted(a.id for a in arxiv), 'reasons': ['arxiv_id']} in clusters
+    assert all(other_author.id not in c['item_ids'] for c in clusters)
+    assert len(clusters) == 2
+    assert len(api.find_duplicates(near_duplicates=False)[0]['item_ids']) == 2
+
+    pdf = tmp_path / "engine.pdf"
+    pdf.write_bytes(b"%PDF-1.4 engine")
+    api.add_attachment(original.id, str(pdf))
+    api.add_attachment(by_doi.id, str(pdf))
+    tag_id = api.add_tag("history")
+    api.add_tag_to_item(by_title.id, tag_id)
+    collection_id = api.add_collection("Computing")
+    api.add_item_to_collection(by_doi.id, collection_id)
+
+    assert api.merge_items(original.id, [by_doi.id, by_title.id])
+    merged = api.get_item(original.id)
+    assert merged.metadata['url'] == 'https://example.org/ae'
+    assert merged.metadata['doi'] == '10.1000/AE'
+    assert [c.last_name for c in merged.creators] == ['Lovelace']
+    assert [t.name for t in merged.tags] == ['history']
+    assert len(merged.attachments) == 1
+    assert [s['id'] for s in api.get_items_in_collection(collection_id)] == [original.id]
+    assert api.get_item(by_doi.id) is None and api.get_item(by_title.id) is None
+    assert sorted(r['id'] for r in api.search_items("analytical")) == sorted([original.id, other_author.id])
+    assert api.find_duplicates(near_duplicates=False) == [{'item_ids': sorted(a.id for a in arxiv), 'reasons': ['arxiv_id']}]
+    assert not api.merge_items(original.id, [by_doi.id])
+
+def test_creator_resolution_normalizes_names(monkeypatch):
+    """Testa a resolução de criadores por nome normalizado, em lote e com cache."""
+    from core.data_access import creator_repository
+    variants = [("Ada", "Lovelace"), ("ADA", "LOVELACE"), ("Àda", "Lovelace "), ("J. R. R.", "Tolkien"), ("J.R.R.", "Tolkien"), ("J R R", "Tolkien")]
+    item = api.add_item(Item(title="Variants", creators=[Creator(first_name=f, last_name=l) for f, l in variants]))
+    ids = [c.id for c in api.get_item(item.id).creators]
+    assert len(ids) == 2
+    assert api.get_item(item.id).creators[0].first_name == "Ada"
+
+    # Inicial sozinha não é unificada com o prenome completo
+    initial = api.add_item(Item(title="Initial", creators=[Creator(first_name="A.", last_name="Lovelace")]))
+    assert api.get_item(initial.id).creators[0].id not in ids
+
+    # Artigos com centenas de autores resolvem o lote inteiro, inclusive pela tabela temporária
+    monkeypatch.setattr(creator_repository, 'INDEX_LOOKUP_LIMIT', 10)
+    creator_repository.clear_cache()
+    authors = [Creator(first_name=f"Author{n}", last_name="Physicist") for n in range(500)]
+    big = api.add_item(Item(title="Large collaboration", creators=authors + [Creator(first_name="ada", last_name="lovelace")]))
+    stored = api.get_item(big.id).creators
+    assert len(stored) == 501 and stored[-1].id == ids[0]
+    again = api.add_items([Item(title="Follow-up", creators=[Creator(first_name=f"AUTHOR{n}", last_name="Physicist") for n in range(500)])])
+    assert [c.id for c in again[0].creators] == [c.id for c in stored[:500]]
+    con = database.get_connection()
+    assert con.execute("SELECT count(*) FROM creators").fetchone()[0] == 503
+
+    # Criadores gravados antes da chave normalizada são preenchidos na inicialização
+    con.execute("INSERT INTO creators (id, first_name, last_name) VALUES (1, 'Grace', 'Hopper')")
+    database.initialize_database()
+    con = database.get_connection()
+    assert con.execute("SELECT name_key FROM creators WHERE id = 1").fetchone()[0] == "hopper|grace"
+    hopper = api.add_item(Item(title="Compilers", creators=[Creator(first_name="GRACE", last_name="Hopper")]))
+    assert api.get_item(hopper.id).creators[0].id == 1
+
+def test_collection_hierarchy():
+    """Testa subárvores, ancestrais, movimentação e contagens de coleções aninhadas."""
+    root = api.add_collection("Science")
+    physics = api.add_collection("Physics", root)
+    quantum = api.add_collection("Quantum", physics)
+    biology = api.add_collection("Biology", root)
+    other = api.add_collection("Other")
+
+    items = [api.add_item(Item(title=f"Paper {n}")) for n in range(4)]
+    api.add_item_to_collection(items[0].id, root)
+    api.add_item_to_collection(items[1].id, physics)
+    api.add_item_to_collection(items[2].id, quantum)
+    api.add_item_to_collection(items[1].id, quantum)
+    api.add_item_to_collection(items[3].id, biology)
+
+    assert [i['id'] for i in api.get_items_in_collection(root)] == [items[0].id]
+    assert sorted(i['id'] for i in api.get_items_in_collection(root, recursive=True)) == sorted(i.id for i in items)
+    assert sorted(i['id'] for i in api.get_items_in_collection(physics, recursive=True)) == [items[1].id, items[2].id]
+    assert [c.id for c in api.get_collection_ancestors(quantum)] == [root, physics]
+    assert [c.id for c in api.get_collection_descendants(root)] == [biology, physics, quantum]
+    counts = api.get_collection_item_counts()
+    assert counts[root] == {'direct': 1, 'recursive': 4}
+    assert counts[physics] == {'direct': 1, 'recursive': 2}
+    assert counts[other] == {'direct': 0, 'recursive': 0}
+
+    # Mover uma subárvore com filhos; ciclos são recusados
+    assert not api.move_collection(root, quantum)
+    assert not api.move_collection(physics, physics)
+    assert api.move_collection(physics, other)
+    assert [c.id for c in api.get_collection_ancestors(quantum)] == [other, physics]
+    assert {c.id: c.parent_id for c in api.get_all_collections()}[physics] == other
+    counts = api.get_collection_item_counts()
+    assert counts[root]['recursive'] == 2 and counts[other]['recursive'] == 2
+    assert api.move_collection(physics, None)
+    assert api.get_collection_ancestors(quantum)[0].id == physics
+
+    # Coleções de bibliotecas anteriores à tabela de fechamento entram pela
+    # reconstrução, que preserva as movimentações já feitas
+    con = database.get_connection()
+    con.execute("INSERT INTO collections (id, name, parent_id) VALUES (1, 'Legacy', ?)", (quantum,))
+    database.initialize_database()
+    assert [c.id for c in api.get_collection_ancestors(1)] == [physics, quantum]
+    assert [c.id for c in api.get_collection_descendants(root)] == [biology]
+
+def test_collection_changes_reach_listeners():
+    """Testa o carregamento por nível, renomeação, exclusão e os eventos de coleções."""
+    from core.plugin_manager import manager as plugin_manager
+
+    class Listener:
+        def __init__(self):
+            self.events = []
+        def on_collection_added(self, collection_id):
+            self.events.append(('added', collection_id))
+        def on_collection_updated(self, collection_id):
+            self.events.append(('updated', collection_id))
+        def on_collection_deleted(self, collection_id):
+            self.events.append(('deleted', collection_id))
+
+    listener = Listener()
+    plugin_manager.add_listener(listener)
+    try:
+        root = api.add_collection("Root")
+        child = api.add_collection("Child", root)
+        grandchild = api.add_collection("Grandchild", child)
+        item = api.add_item(Item(title="Member"))
+        api.add_item_to_collection(item.id, grandchild)
+        with pytest.raises(ValueError):
+            api.add_collection("Orphan", 12345)
+
+        assert [(c.id, c.child_count) for c in api.get_child_collections()] == [(root, 1)]
+        assert [(c.id, c.parent_id, c.child_count) for c in api.get_child_collections(root)] == [(child, root, 1)]
+
+        assert api.rename_collection(child, "Renamed")
+        assert api.get_collection(child).name == "Renamed"
+        assert api.delete_collection(child)
+        assert api.get_collection(grandchild) is None
+        assert api.get_child_collections(root) == []
+        assert api.get_item(item.id) is not None
+        assert not api.delete_collection(child)
+
+        plugin_manager.flush()
+        assert listener.events == [('added', root), ('added', child), ('added', grandchild), ('updated', grandchild),
+                                   ('updated', child), ('deleted', child), ('deleted', grandchild)]
+    finally:
+        plugin_manager.remove_listener(listener)
+
+def test_item_cache_read_through_and_invalidation(tmp_path):
+    """Testa o cache de itens: acertos, cópias isoladas, pré-carga e invalidação pelas escritas."""
+    from core.services.item_cache import cache
+    cache.clear()
+    first = api.add_item(Item(title="Cached", metadata={'year': '2020'}))
+    second = api.add_item(Item(title="Neighbour"))
+
+    assert api.get_item(first.id).title == "Cached"
+    api.get_item(first.id).metadata['year'] = 'changed'
+    assert api.get_item(first.id).metadata['year'] == '2020'
+    api.prefetch_items([second.id])
+    assert api.get_item(second.id).title == "Neighbour"
+    assert api.get_item_cache_stats()['hits'] == 3
+    assert api.get_item_cache_stats()['misses'] == 1
+    # IDs repetidos em um pedido contam uma vez
+    assert [item.id for item in api.get_items([second.id, first.id, second.id])] == [second.id, first.id, second.id]
+    assert api.get_item_cache_stats()['hits'] == 5
+
+    api.update_item(first.id, {'metadata': {'title': "Edited"}})
+    assert api.get_item(first.id).title == "Edited"
+    tag_id = api.add_tag("cached")
+    api.add_tag_to_item(first.id, tag_id)
+    assert [t.name for t in api.get_item(first.id).tags] == ["cached"]
+    pdf = tmp_path / "cached.pdf"
+    pdf.write_bytes(b"%PDF-1.4 cached")
+    api.add_attachment(first.id, str(pdf))
+    assert len(api.get_item(first.id).attachments) == 1
+    api.merge_items(first.id, [second.id])
+    assert api.get_item(second.id) is None
+    api.delete_item(first.id)
+    assert api.get_item(first.id) is None
+
+    stats = api.get_item_cache_stats()
+    assert stats['size'] == 0 and stats['capacity'] == cache.capacity
+
+def test_query_tracing_and_slow_query_log(capsys):
+    """Testa o rastreamento de SQL: função de origem, linhas, agregação por forma, parâmetros ocultos e log de lentas."""
+    tracer = database.tracer
+    tracer.reset()
+    tracer.configure(enabled=True, slow_query_ms=1e9, redact_parameters=True, explain_slow=False)
+    try:
+        items = api.add_items([Item(title=f"Traced {index}") for index in range(3)])
+        for item in items:
+            assert api.get_item(item.id).title.startswith("Traced")
+        assert api.delete_item(items[0].id)
+
+        stats = tracer.stats()
+        assert stats == sorted(stats, key=lambda entry: entry['total_ms'], reverse=True)
+        deletes = [entry for entry in stats if entry['query'] == "DELETE FROM items WHERE id = ?"]
+        assert deletes[0]['calls'] == 1 and deletes[0]['rows'] == 1
+        assert deletes[0]['functions'] == ['item_repository.delete']
+        # Consultas com listas de IDs diferentes caem na mesma entrada
+        fetches = [entry for entry in stats if entry["query"].startswith("SELECT id, item_type, title, date_added, date_modified FROM items WHERE id IN")]
+        assert len(fetches) == 1 and fetches[0]['calls'] >= 3
+        assert any('COMMIT' == entry['query'] for entry in stats)
+        record = [r for r in tracer.recent if r['query'] == "DELETE FROM items WHERE id = ?"][0]
+        assert record['parameters'] == ['int'] and record['ms'] >= 0
+        assert not tracer.slow_queries
+
+        tracer.configure(slow_query_ms=0, explain_slow=True, redact_parameters=False)
+        assert api.search_items("traced")
+        slow = [r for r in tracer.slow_queries if r['function'] == 'search_repository.search']
+        assert slow and slow[0]['rows'] == 2 and 'traced' in slow[0]['parameters']
+        assert slow[0]['plan']
+        assert "SQL lento" in capsys.readouterr().out
+
+        # Sem `explain_slow`, o resultado é lido do cursor pelo chamador e as linhas contadas à medida que chegam
+        tracer.configure(slow_query_ms=1e9, explain_slow=False)
+        result = database.get_connection().execute("SELECT id FROM items ORDER BY id")
+        record = tracer.recent[-1]
+        assert record['rows'] == 0
+        assert result.fetchone() is not None and record['rows'] == 1
+        assert len(result.fetchall()) == 1 and record['rows'] == 2
+
+        # Uma escrita que começa com WITH não é repetida com EXPLAIN ANALYZE
+        for name in ("primeira", "segunda"):
+            api.add_tag(name)
+        tracer.configure(slow_query_ms=0, explain_slow=True)
+        con = database.get_connection()
+        deleted = con.execute("WITH oldest AS (SELECT min(id) AS id FROM tags) DELETE FROM tags WHERE id IN (SELECT id FROM oldest)")
+        assert deleted.fetchall() == [(1,)]
+        assert tracer.recent[-1]['rows'] == 1
+        assert con.execute("SELECT count(*) FROM tags").fetchone()[0] == 1
+    finally:
+        tracer.configure(enabled=False, slow_query_ms=database.SLOW_QUERY_MS,
+                         redact_parameters=database.SQL_REDACT, explain_slow=database.SQL_EXPLAIN)
+        tracer.reset()
+    assert api.get_items([items[1].id])
+    assert not tracer.recent
+
+def test_import_batch_isolates_failed_files(tmp_path, monkeypatch):
+    """Testa se um arquivo que não pode ser guardado falha sozinho e se uma gravação que falha não deixa itens sem PDF."""
+    from core import file_store
+    from core.data_access import attachment_repository
+    for name in ("good_one.pdf", "bad.pdf", "good_two.pdf"):
+        _write_pdf(tmp_path / name, f"Contents of {name}")
+
+    original_store = file_store.store
+    def store(storage_dir, source_path_str, digest=None, name=None):
+        if source_path_str.endswith("bad.pdf"):
+            raise OSError("disco cheio")
+        return original_store(storage_dir, source_path_str, digest, name)
+    monkeypatch.setattr(file_store, 'store', store)
+
+    result = api.import_pdfs(tmp_path, workers=0, batch_size=10)
+    assert [(os.path.basename(path), error) for path, error in result['failed']] == [("bad.pdf", "Erro ao gravar: disco cheio")]
+    assert sorted(item.title for item in result['items']) == ["good one", "good two"]
+    for item in result['items']:
+        assert len(api.get_item(item.id).attachments) == 1
+    assert len(api.get_all_items_summary()) == 2
+
+    # Uma falha na transação não grava nenhum item e remove os conteúdos novos
+    monkeypatch.setattr(file_store, 'store', original_store)
+    monkeypatch.setattr(attachment_repository, 'add_many', Mock(side_effect=RuntimeError("falha no banco")))
+    result = api.import_pdfs(tmp_path / "bad.pdf", workers=0)
+    assert result['items'] == [] and result['failed'][0][1] == "Erro ao gravar: falha no banco"
+    assert len(api.get_all_items_summary()) == 2
+    blobs = list(Path(database.DATA_DIR, "storage").rglob("bad.pdf"))
+    assert blobs == []
@@ -0,0 +1,39 @@
+import copy
+import json
+
+from benchmarks import data, suite
+from benchmarks.__main__ import main
+from core import database
+
+
+def test_generators_are_deterministic_and_varied():
+    """Testa se os geradores repetem os mesmos dados para a mesma semente e incluem listas enormes de autores."""
+    first = list(data.items(1000, seed=3))
+    second = list(data.items(1000, seed=3))
+    assert [item.title for item in first] == [item.title for item in second]
+    assert max(len(item.creators) for item in first) >= data.HUGE_AUTHOR_MIN
+
+    tree = data.collection_tree(50, seed=3)
+    assert all(parent is None or parent < index for index, (_, parent) in enumerate(tree))
+    assert any(parent is not None for _, parent in tree)
+
+
+def test_benchmark_run_and_comparison(tmp_path):
+    """Testa uma execução pequena em biblioteca temporária, a gravação em JSON e a detecção de regressões."""
+    original_db_file = database.DB_FILE
+    output = tmp_path / "results.json"
+    assert main(['--items', '60', '--import-workers', '0', '--output', str(output)]) == 0
+    assert database.DB_FILE == original_db_file
+
+    results = json.loads(output.read_text(encoding='utf-8'))
+    assert results['sizes']['items'] == 60
+    assert results['import_failures'] == 0
+    for operation in ('add_items_bulk', 'add_item', 'get_item', 'search_items', 'list_items',
+                      'get_child_collections', 'delete_item', 'import_pdfs'):
+        assert results['operations'][operation]['calls'] > 0
+
+    assert not any(row['regressed'] for row in suite.compare(results, results))
+    slower = copy.deepcopy(results)
+    slower['operations']['get_item']['median_ms'] = results['operations']['get_item']['median_ms'] * 2 + 1
+    regressed = [row['operation'] for row in suite.compare(results, slower) if row['regressed']]
+    assert regressed == ['get_item']
@@ -1,3 +1,6 @@
+import json
+import threading
+import time
 import pytest
 from unittest.mock import patch, MagicMock, call
 from core.plugin_manager import PluginManager
@@ -54,13 +57,15 @@ def mock_importlib():
 
 def test_plugin_discovery(mock_pkgutil, mock_importlib):
     """
-    Test that the PluginManager correctly discovers and loads plugins,
-    and handles failures gracefully.
+    Test that the PluginManager discovers plugins without importing them,
+    loads them on first use, and handles failures gracefully.
     """
     manager = PluginManager()
 
     mock_pkgutil.assert_called_once()
+    mock_importlib.assert_not_called()
 
+    assert len(manager.plugins) == 1
     assert mock_importlib.call_count == 3
     mock_importlib.assert_has_calls([
         call('plugins.good'),
@@ -81,14 +86,64 @@ def test_hooks_are_called(mock_pkgutil, mock_importlib):
     plugin.on_item_deleted = MagicMock()
 
     manager.hook_item_added(10)
+    manager.flush()
     plugin.on_item_added.assert_called_once_with(10)
 
     manager.hook_item_updated(20)
+    manager.flush()
     plugin.on_item_updated.assert_called_once_with(20)
 
     manager.hook_item_deleted(30)
+    manager.flush()
     plugin.on_item_deleted.assert_called_once_with(30)
 
+def test_batch_hook_falls_back_to_single_item_hook(mock_pkgutil, mock_importlib):
+    """Test that hook_items_added delivers the batch or falls back per item."""
+    manager = PluginManager()
+    plugin = manager.plugins[0]
+
+    plugin.on_item_added = MagicMock()
+    manager.hook_items_added([1, 2])
+    manager.flush()
+    plugin.on_item_added.assert_has_calls([call(1), call(2)])
+
+    plugin.on_items_added = MagicMock()
+    plugin.on_item_added.reset_mock()
+    manager.hook_items_added([3, 4])
+    manager.flush()
+    plugin.on_items_added.assert_called_once_with([3, 4])
+    plugin.on_item_added.assert_not_called()
+
+def test_events_are_asynchronous_coalesced_and_isolated(mock_pkgutil, mock_importlib):
+    """Test that slow or failing plugins do not block publishers and that bursts are batched."""
+    manager = PluginManager()
+    plugin = manager.plugins[0]
+
+    entered, release = threading.Event(), threading.Event()
+    batches = []
+    plugin.on_item_added = MagicMock(side_effect=lambda item_id: (entered.set(), release.wait(5)))
+    plugin.on_items_added = MagicMock(side_effect=lambda item_ids: batches.append(list(item_ids)))
+    plugin.on_item_updated = MagicMock(side_effect=RuntimeError("plugin bug"))
+    plugin.on_item_deleted = MagicMock()
+
+    manager.hook_item_added(1)  # Ocupa a thread do plugin até `release`
+    assert entered.wait(5)
+    started = time.monotonic()
+    for item_id in range(2, 1002):
+        manager.hook_item_added(item_id)
+    manager.hook_item_updated(5)
+    manager.hook_item_updated(5)
+    manager.hook_item_deleted(7)
+    assert time.monotonic() - started < 1
+    assert not manager.flush(timeout=0.05)
+
+    release.set()
+    assert manager.flush(timeout=5)
+    plugin.on_item_added.assert_called_once_with(1)
+    assert batches == [list(range(2, 1002))]
+    plugin.on_item_updated.assert_called_once_with(5)
+    plugin.on_item_deleted.assert_called_once_with(7)
+
 def test_gui_and_background_hooks(mock_pkgutil, mock_importlib):
     """Test the setup and check_all_items hooks."""
     manager = PluginManager()
@@ -128,3 +183,33 @@ def test_plugin_directory_not_found(mock_print):
 
         assert len(manager.plugins) == 0
         mock_print.assert_any_call("Diretório de plugins não encontrado.")
+
+def test_manifest_limits_which_plugins_are_imported(tmp_path):
+    """Plugins are only imported for the hooks their manifest declares."""
+    for name, hooks in (('listener', ['on_item_added']), ('checker', ['check_all_items'])):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'manifest.json').write_text(json.dumps({'name': name, 'hooks': hooks}))
+    finder = MagicMock(path=str(tmp_path))
+    modules = [(finder, 'plugins.listener', True), (finder, 'plugins.checker', True)]
+    plugins = {'plugins.listener': MagicMock(spec=['on_item_added']),
+               'plugins.checker': MagicMock(spec=['check_all_items'])}
+
+    def import_side_effect(module_name):
+        module = MagicMock()
+        module.register.return_value = plugins[module_name]
+        return module
+
+    with patch('core.plugin_manager.pkgutil.iter_modules', return_value=modules), \
+         patch('core.plugin_manager.importlib.import_module', side_effect=import_side_effect) as mock_import:
+        manager = PluginManager()
+        mock_import.assert_not_called()
+
+        manager.hook_item_added(1)
+        manager.flush()
+        mock_import.assert_called_once_with('plugins.listener')
+        plugins['plugins.listener'].on_item_added.assert_called_once_with(1)
+
+        manager.run_background_checks()
+        assert mock_import.call_count == 2
+        plugins['plugins.checker'].check_all_items.assert_called_once()
+        manager.shutdown()
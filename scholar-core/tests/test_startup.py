@@ -0,0 +1,43 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Orçamento de tempo de inicialização, em segundos. Medido localmente em
+# ~0,1 s para ambos; a folga cobre máquinas de CI mais lentas.
+STARTUP_BUDGET_SECONDS = 1.0
+
+# Módulos pesados que só devem ser importados quando realmente usados
+LAZY_MODULE_PREFIXES = ('requests', 'PyPDF2', 'plugins.')
+
+_MEASURE = """
+import json, runpy, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+loaded = sorted(m for m in sys.modules if m.startswith({prefixes!r}))
+print(json.dumps({{'elapsed': elapsed, 'loaded': loaded}}))
+"""
+
+
+def _measure(statement):
+    """Executa `statement` em um interpretador novo e retorna o tempo e os módulos pesados carregados."""
+    code = _MEASURE.format(statement=statement, prefixes=LAZY_MODULE_PREFIXES)
+    completed = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_DIR, capture_output=True, text=True, check=True)
+    # A última linha é a medição; as anteriores são mensagens de inicialização
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('statement', [
+    'import core.api',
+    # Carrega o host sem executar main(), que ficaria lendo o stdin
+    "runpy.run_path('native_messaging/host.py', run_name='host')",
+])
+def test_startup_budget(statement):
+    measurement = _measure(statement)
+    assert measurement['loaded'] == []
+    assert measurement['elapsed'] < STARTUP_BUDGET_SECONDS, measurement